@@ -0,0 +1,166 @@
+"""
+Load test for the ASGI entry point (papi.asgi) with slow clients.
+
+Clients arrive at `rate` per second, every one opens a connection, sends
+its request and reads the response. One in `slow_every` clients is slow:
+it sends its request in two parts, waiting `delay` seconds in between (as
+a slow network would), which a blocking server waits for while the clients
+after it queue up. Compares a uvicorn process serving papi.asgi with a blocking
+WSGI server process (wsgiref, one connection at a time like a sync worker)
+serving papi.wsgi. Needs uvicorn (pip install uvicorn).
+
+Usage:
+
+    python -m benchmarks.asgi [clients] [rate] [delay] [slow_every] [path]
+
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from typing import List
+
+
+SERVERS = ("asgi", "wsgi")
+HOST = "127.0.0.1"
+
+
+def serve(server: str, port: int) -> None:
+    """ Serve papi with server ("asgi" or "wsgi") until killed. """
+    # pylint: disable=import-outside-toplevel
+    if server == "asgi":
+        import uvicorn
+
+        uvicorn.run(
+            "papi.asgi:application", host=HOST, port=port,
+            log_level="warning")
+        return
+
+    from wsgiref.simple_server import (
+        make_server,
+        WSGIRequestHandler,
+        WSGIServer,
+        )
+
+    from papi.wsgi import application
+
+    class QuietHandler(WSGIRequestHandler):
+        """ Don't log requests. """
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    class QueueingServer(WSGIServer):
+        """ Queue every client (default backlog is 5). """
+        request_queue_size = 1024
+
+    make_server(
+        HOST, port, application, server_class=QueueingServer,
+        handler_class=QuietHandler).serve_forever()
+
+
+def free_port() -> int:
+    """ Get an unused local port. """
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return int(sock.getsockname()[1])
+
+
+def wait_for(port: int, timeout: float = 30) -> None:
+    """ Wait until server accepts connections. """
+    limit = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection((HOST, port), 1).close()
+            return
+        except OSError:
+            if time.monotonic() > limit:
+                raise
+            time.sleep(0.1)
+
+
+async def client(port: int, path: str, delay: float, wait: float) -> float:
+    """ Make a request after wait (slow when delay), get seconds taken. """
+    await asyncio.sleep(wait)
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: localhost\r\n".encode("latin-1"))
+    await writer.drain()
+    await asyncio.sleep(delay)
+    writer.write(
+        b"Accept: application/json\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    assert response.startswith(b"HTTP/1.") and b" 200 " in response[:16], (
+        f"Request failed: {response[:80]!r}")
+    return time.perf_counter() - start
+
+
+async def load(  # pylint: disable=too-many-arguments
+        port: int, clients: int, rate: float, path: str, delay: float,
+        slow_every: int) -> List[float]:
+    """ Run clients arriving at rate, get seconds taken per fast client. """
+    latencies = await asyncio.gather(*(
+        client(port, path, 0 if index % slow_every else delay, index / rate)
+        for index in range(clients)))
+    return [
+        latency for index, latency in enumerate(latencies)
+        if index % slow_every]
+
+
+def run(  # pylint: disable=too-many-arguments
+        server: str, clients: int, rate: float, delay: float,
+        slow_every: int, path: str) -> None:
+    """ Start server process, load it and print results. """
+    port = free_port()
+    with subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.asgi"],
+            env=dict(
+                os.environ, PAPI_BENCHMARK_SERVER=server,
+                PAPI_BENCHMARK_PORT=str(port))) as process:
+        try:
+            wait_for(port)
+            asyncio.run(load(port, 2, 1, path, 0, 2))  # Warm up
+            start = time.perf_counter()
+            latencies = sorted(asyncio.run(
+                load(port, clients, rate, path, delay, slow_every)))
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+
+    median = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"  {server:<6}{clients / elapsed:>10.1f} requests/s"
+        f"{median * 1000:>10.1f}ms p50{p99 * 1000:>10.1f}ms p99")
+
+
+def main() -> None:
+    """ Run load test for every server and print results. """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "papi.settings")
+    if os.environ.get("PAPI_BENCHMARK_SERVER"):
+        serve(
+            os.environ["PAPI_BENCHMARK_SERVER"],
+            int(os.environ["PAPI_BENCHMARK_PORT"]))
+        return
+
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 100
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    slow_every = int(sys.argv[4]) if len(sys.argv) > 4 else 10
+    path = sys.argv[5] if len(sys.argv) > 5 else "/api/"
+
+    print(
+        f"{clients} clients ({rate}/s), 1 in {slow_every} with {delay}s send "
+        f"delay, GET {path} (latency of fast clients)")
+    for server in SERVERS:
+        run(server, clients, rate, delay, slow_every, path)
+
+
+if __name__ == "__main__":
+    main()
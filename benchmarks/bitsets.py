@@ -0,0 +1,96 @@
+"""
+Benchmark for units.bitsets.
+
+Compares filtering with the database, the in-memory catalog scanning
+columns, and the catalog combining bitset indexes.
+
+Uses a throwaway test database.
+
+Usage:
+
+    python -m benchmarks.bitsets [rows]
+
+"""
+import os
+import sys
+import timeit
+
+from functools import partial
+
+import django
+
+
+QUERIES = (
+    "fl=1,bl=0",
+    "fl=1,bl=0,g>=1,su<5",
+    "g=3,e>=1,!a:gain",
+    "su>2,hp<=4,at!=1",
+    )
+
+
+def main() -> None:
+    """ Run benchmark and print results. """
+    # pylint: disable=import-outside-toplevel,too-many-locals
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "papi.settings")
+    django.setup()
+
+    from django.db import connection
+    from django.test import override_settings
+
+    from units.catalog import UnitCatalog
+    from units.models import LatestUnitVersionSnapshot
+    from units.tests.fixtures import unit_rows
+    from units.utils import compile_query
+    from units.views import UNIT_FIELDS
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = unit_rows(count)
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        # pylint: disable=no-member
+        LatestUnitVersionSnapshot.objects.bulk_create(
+            (LatestUnitVersionSnapshot(**row) for row in rows),
+            batch_size=500)
+        queryset = LatestUnitVersionSnapshot.objects.order_by("id")
+        indexed = UnitCatalog.load(queryset)
+        scanning = UnitCatalog.load(queryset)
+        with override_settings(UNITS_BITSET_MAX_VALUES=0):
+            # Columns without bitset are remembered by the catalog
+            for name in scanning.names:
+                scanning._bitset(name)  # pylint: disable=protected-access
+
+        def database(plan):
+            return list(
+                queryset.filter(**plan.includes).exclude(**plan.excludes)
+                .values_list("id", flat=True))
+
+        def catalog(instance, plan):
+            ids = instance.columns["id"]
+            return [
+                ids[position] for position
+                in instance.filter(plan.includes, plan.excludes)]
+
+        print(f"{count} rows")
+        for raw_query in QUERIES:
+            plan = compile_query(raw_query, allowed=UNIT_FIELDS)
+            cases = [
+                ("ORM", partial(database, plan)),
+                ("catalog scan", partial(catalog, scanning, plan)),
+                ("catalog bitsets", partial(catalog, indexed, plan)),
+                ]
+            expected_result = cases[1][1]()
+            assert cases[0][1]() == expected_result, "ORM results differ"
+            assert cases[2][1]() == expected_result, "bitset results differ"
+
+            print(f"{raw_query} ({len(expected_result)} matches)")
+            for name, run in cases:
+                elapsed = min(timeit.repeat(run, number=1, repeat=5))
+                print(f"  {name:<38}{elapsed * 1000:>10.2f}ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Microbenchmark for units.utils.parse_query.
+
+Compares the single pass scanner with the pyparsing reference.
+
+Usage:
+
+    python -m benchmarks.parse_query
+
+"""
+import os
+import timeit
+import warnings
+
+import django
+
+
+QUERIES = {
+    "short": "gold=5",
+    "typical": "gold>3,frontline=1,a=gain XXXX,name!=head",
+    "long": ", ".join(
+        ["au>=1", "g<2", "b<>3", "r:0", "e=1", "x>2", "h<=4", "su=1",
+         "n=drone", "a=gain XXXX", "pos=middle", "bt<3"] * 5),
+    "invalid": "5, gold=5",
+    }
+
+
+def main() -> None:
+    """ Run benchmark and print results. """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "papi.settings")
+    django.setup()
+    warnings.simplefilter("ignore")  # pyparsing deprecation warnings
+
+    # pylint: disable=import-outside-toplevel
+    from units.utils import parse_query, parse_query_reference
+
+    number = 2000
+    print(f"{'query':<10}{'pyparsing':>14}{'scanner':>14}{'speedup':>10}")
+    for name, query in QUERIES.items():
+        reference = min(timeit.repeat(
+            lambda: list(parse_query_reference(query)),
+            number=number, repeat=3)) / number
+        current = min(timeit.repeat(
+            lambda: list(parse_query(query)),
+            number=number, repeat=3)) / number
+        print(
+            f"{name:<10}{reference * 1e6:>12.1f}us{current * 1e6:>12.1f}us"
+            f"{reference / current:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
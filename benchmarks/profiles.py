@@ -0,0 +1,63 @@
+"""
+Benchmark for settings profiles (PAPI_PROFILE).
+
+Measures per request overhead (middleware, authentication, throttling,
+renderer negotiation) of the "full" and "api" profiles with a request that
+doesn't touch the database (API root). Settings are read at startup, so
+every profile runs in its own process.
+
+Usage:
+
+    python -m benchmarks.profiles [requests]
+
+"""
+import os
+import subprocess
+import sys
+import timeit
+
+import django
+
+
+PROFILES = ("full", "api")
+
+
+def run(count: int) -> None:
+    """ Time requests with the current profile and print per request time. """
+    # pylint: disable=import-outside-toplevel
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "papi.settings")
+    django.setup()
+
+    from django.conf import settings
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    client = Client(HTTP_ACCEPT="application/json")
+    assert client.get("/api/").status_code == 200, "Request failed"
+
+    elapsed = min(timeit.repeat(
+        lambda: client.get("/api/"), number=count, repeat=5))
+    print(
+        f"  {settings.PAPI_PROFILE:<8}{len(settings.MIDDLEWARE):>3} "
+        f"middleware{elapsed / count * 1e6:>12.1f}us/request")
+
+
+def main() -> None:
+    """ Run benchmark for every profile and print results. """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    if os.environ.get("PAPI_BENCHMARK_CHILD"):
+        run(count)
+        return
+
+    print(f"{count} requests to /api/ (best of 5)")
+    for profile in PROFILES:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.profiles", str(count)],
+            check=True,
+            env=dict(
+                os.environ, PAPI_PROFILE=profile, PAPI_BENCHMARK_CHILD="1"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark for units.serializers.
+
+Compares LatestUnitVersionViewSerializer (DRF) with
+LatestUnitVersionViewFastSerializer, serializing and rendering synthetic
+rows to JSON.
+
+Usage:
+
+    python -m benchmarks.serializers [rows]
+
+"""
+import os
+import sys
+import timeit
+
+import django
+
+
+def main() -> None:
+    """ Run benchmark and print results. """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "papi.settings")
+    django.setup()
+
+    # pylint: disable=import-outside-toplevel
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from units.models import LatestUnitVersionView
+    from units.serializers import (
+        LatestUnitVersionViewFastSerializer,
+        LatestUnitVersionViewSerializer,
+        )
+    from units.tests.fixtures import unit_rows
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    objects = [LatestUnitVersionView(**row) for row in unit_rows(count)]
+    request = Request(
+        APIRequestFactory().get("/api/latest/units/", HTTP_HOST="localhost"))
+    context = {"request": request, "format": None}
+    renderer = JSONRenderer()
+
+    def run(serializer_class):
+        return renderer.render(
+            serializer_class(objects, many=True, context=context).data)
+
+    assert run(LatestUnitVersionViewSerializer) == run(
+        LatestUnitVersionViewFastSerializer), "output differs"
+
+    print(f"{count} rows")
+    results = []
+    for serializer_class in [
+            LatestUnitVersionViewSerializer,
+            LatestUnitVersionViewFastSerializer]:
+        elapsed = min(timeit.repeat(
+            lambda: run(serializer_class),  # noqa pylint: disable=cell-var-from-loop
+            number=1, repeat=5))
+        results.append(elapsed)
+        print(f"{serializer_class.__name__:<40}{elapsed * 1000:>10.1f}ms")
+    print(f"{'speedup':<40}{results[0] / results[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
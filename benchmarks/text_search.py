@@ -0,0 +1,95 @@
+"""
+Benchmark for units.search.
+
+Compares scanning text columns (LIKE / substring) with the text indexes:
+SQLite FTS5 trigram table for the snapshot table and the in-memory trigram
+index used by units.catalog.
+
+Uses a throwaway test database.
+
+Usage:
+
+    python -m benchmarks.text_search [rows]
+
+"""
+import os
+import sys
+import timeit
+
+from functools import partial
+
+import django
+
+
+def main() -> None:
+    """ Run benchmark and print results. """
+    # pylint: disable=import-outside-toplevel,too-many-locals
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "papi.settings")
+    django.setup()
+
+    from django.db import connection
+    from django.db.models import Q
+
+    from units.models import LatestUnitVersionSnapshot
+    from units.search import (
+        rebuild_text_index,
+        text_search_q,
+        TrigramIndex,
+        )
+    from units.tests.fixtures import unit_rows
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = unit_rows(count)
+    for row in rows:
+        # More distinct texts than the fixture's few abilities
+        row["abilities"] = f"{row['abilities']} ref{row['id']}"
+    needles = {"common": "gain XXXX", "rare": f"ref{count // 2}"}
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        # pylint: disable=no-member
+        LatestUnitVersionSnapshot.objects.bulk_create(
+            (LatestUnitVersionSnapshot(**row) for row in rows),
+            batch_size=500)
+        rebuild_text_index()
+        queryset = LatestUnitVersionSnapshot.objects.order_by("id")
+        texts = [row["abilities"].lower() for row in rows]
+
+        elapsed = min(timeit.repeat(
+            lambda: TrigramIndex(texts), number=1, repeat=3))
+        print(f"{count} rows, trigram index built in {elapsed * 1000:.1f}ms")
+        index = TrigramIndex(texts)
+
+        def database(query):
+            return list(queryset.filter(query).values_list("id", flat=True))
+
+        def scan(needle):
+            return [
+                position for position, text in enumerate(texts)
+                if needle in text]
+
+        def search(needle):
+            return sorted(index.search(needle))
+
+        for label, value in needles.items():
+            lookups = {"abilities__icontains": value}
+            cases = [
+                ("LIKE scan", partial(database, Q(**lookups))),
+                ("FTS5 trigram", partial(database, text_search_q(lookups))),
+                ("catalog scan", partial(scan, value.lower())),
+                ("catalog trigram", partial(search, value.lower())),
+                ]
+            assert cases[0][1]() == cases[1][1](), "FTS results differ"
+            assert cases[2][1]() == cases[3][1](), "trigram results differ"
+
+            print(f"{label} ({value!r}, {len(cases[0][1]())} matches)")
+            for name, run in cases:
+                elapsed = min(timeit.repeat(run, number=1, repeat=5))
+                print(f"  {name:<38}{elapsed * 1000:>10.2f}ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
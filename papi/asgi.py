@@ -0,0 +1,314 @@
+"""
+ASGI config for papi project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI support, so the WSGI handler is adapted: the event
+loop reads request bodies and sends responses (slow clients don't hold a
+thread), while Django (middleware, views, ORM queries) runs in a pool of
+PAPI_ASGI_THREADS threads. Bodies over DATA_UPLOAD_MAX_MEMORY_SIZE are
+refused (413) before they are read. Run with any ASGI server, ie:
+
+    uvicorn papi.asgi:application
+"""
+import asyncio
+import itertools
+import os
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    )
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Coroutine[Any, Any, None]]
+# Status, headers and body of a (not streamed) response
+Result = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+class RequestTooLarge(Exception):
+    """ Request body is longer than allowed. """
+
+
+def get_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """
+    Get WSGI environ for an ASGI HTTP request.
+
+    Headers with "_" in their name are dropped (as gunicorn, uWSGI and
+    runserver do): "X_Foo" would otherwise spoof "X-Foo" (HTTP_X_FOO).
+
+    Parameters
+    ----------
+    scope : dict
+        ASGI HTTP connection scope.
+    body : bytes
+        Request body.
+
+    Returns
+    -------
+    dict
+
+    Examples
+    --------
+    input:
+        {"method": "GET", "path": "/api/", "query_string": b"format=json",
+         "headers": [(b"accept", b"application/json")], ...}, b""
+
+    output:
+        {"REQUEST_METHOD": "GET", "PATH_INFO": "/api/",
+         "QUERY_STRING": "format=json", "HTTP_ACCEPT": "application/json",
+         ...}
+
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        # WSGI strings are bytes decoded as latin-1
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        }
+    for name, value in scope.get("headers", []):
+        if b"_" in name:
+            continue
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = f"HTTP_{key}"
+        text = value.decode("latin-1")
+        if key in environ:
+            # Cookie pairs are separated by "; " (RFC 6265)
+            separator = "; " if key == "HTTP_COOKIE" else ","
+            text = f"{environ[key]}{separator}{text}"
+        environ[key] = text
+    return environ
+
+
+def get_content_length(scope: Dict[str, Any]) -> Optional[int]:
+    """ Get Content-Length header of an ASGI HTTP scope, None if invalid. """
+    for name, value in scope.get("headers", []):
+        if name.lower() == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class ASGIHandler:
+    """
+    ASGI application running a WSGI application in a thread pool.
+
+    Request bodies are read before the WSGI application is called, and
+    responses are sent from the event loop, so a thread is only used while
+    the response is produced. Streamed responses are produced (and sent) a
+    chunk at a time from the same thread, which keeps its database
+    connection until the stream ends.
+
+    Parameters
+    ----------
+    wsgi_application : callable
+        WSGI application (Django's WSGIHandler).
+    max_workers : int, optional
+        Threads in the pool (ThreadPoolExecutor's default when None).
+
+    """
+
+    def __init__(
+            self, wsgi_application: Callable[..., Iterable[bytes]],
+            max_workers: Optional[int] = None) -> None:
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="papi-asgi")
+
+    async def __call__(
+            self, scope: Dict[str, Any], receive: Receive, send: Send
+            ) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported scope type: {scope['type']}")
+
+        max_size = getattr(settings, "DATA_UPLOAD_MAX_MEMORY_SIZE", None)
+        try:
+            length = get_content_length(scope)
+            if max_size is not None and (length or 0) > max_size:
+                raise RequestTooLarge
+            body = await self.read_body(receive, max_size)
+        except RequestTooLarge:
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"text/plain")],
+                })
+            await send({
+                "type": "http.response.body",
+                "body": b"Request body too large",
+                })
+            return
+        if body is None:
+            return  # Client disconnected
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self.executor, self.run, get_environ(scope, body), send, loop)
+        if result is not None:
+            status, headers, content = result
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+                })
+            await send({"type": "http.response.body", "body": content})
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        """ Handle lifespan events (thread pool is shut down at exit). """
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def read_body(
+            receive: Receive, max_size: Optional[int] = None
+            ) -> Optional[bytes]:
+        """
+        Get request body, None if the client disconnected.
+
+        Parameters
+        ----------
+        receive : callable
+            ASGI receive.
+        max_size : int, optional
+            Maximum body length in bytes (no limit when None).
+
+        Returns
+        -------
+        bytes or None
+
+        Raises
+        ------
+        RequestTooLarge
+            As soon as more than max_size bytes are received.
+
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise RequestTooLarge
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    def run(
+            self, environ: Dict[str, Any], send: Send,
+            loop: asyncio.AbstractEventLoop) -> Optional[Result]:
+        """
+        Call WSGI application (in a pool thread).
+
+        Parameters
+        ----------
+        environ : dict
+            WSGI environ.
+        send : callable
+            ASGI send, used (through the event loop) for streamed responses.
+        loop : AbstractEventLoop
+            Event loop of the request.
+
+        Returns
+        -------
+        tuple(int, list, bytes) or None
+            Status, headers and body, None when streamed (already sent).
+
+        """
+        started: List[Any] = []
+        # Body given to write() (PEP 3333), sent before the iterable's
+        written: List[bytes] = []
+
+        def start_response(
+                status: str, headers: List[Tuple[str, str]],
+                exc_info: Any = None) -> Callable[[bytes], None]:
+            # pylint: disable=unused-argument
+            started[:] = [int(status.split(" ", 1)[0]), [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers]]
+            return written.append
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            if not getattr(response, "streaming", False):
+                # close() (below) ends the request before the body is sent
+                content = b"".join(written) + b"".join(response)
+                return started[0], started[1], content
+
+            def sync_send(message: Message) -> None:
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            sync_send({
+                "type": "http.response.start",
+                "status": started[0],
+                "headers": started[1],
+                })
+            for chunk in itertools.chain(written, response):
+                if chunk:
+                    sync_send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": True,
+                        })
+            sync_send({"type": "http.response.body", "body": b""})
+            return None
+        finally:
+            # Sends request_finished (closes database connections)
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'papi.settings')
+
+application = ASGIHandler(  # pylint: disable=invalid-name
+    get_wsgi_application(), getattr(settings, "PAPI_ASGI_THREADS", None))
+
+# Before the first request (see UNITS_WARMUP_ENABLED)
+# pylint: disable=wrong-import-position
+from units.warmup import warm_up  # noqa: E402
+
+warm_up()
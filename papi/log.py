@@ -0,0 +1,351 @@
+"""
+Non blocking logging for papi.
+
+Handlers configured in LOGGING (console, file, mail_admins...) are moved
+to a background thread: loggers get a QueueHandler per handler instead,
+which only puts records in a bounded queue, and a single QueueListener
+thread passes them to the real handlers. A slow disk or SMTP server never
+adds request latency, when the queue is full records are dropped
+(PAPI_LOG_DROP_POLICY). Forked processes (ie: preforking servers) get
+their own queue and listener thread.
+
+Handlers get a copy of each record, with the message already formatted.
+The request of a record (ie: from django.request) is over by the time
+handlers run, so only AdminEmailHandler gets it, detached (see
+detach_request).
+"""
+import atexit
+import copy
+import logging
+import logging.config
+import os
+import queue
+
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    )
+from threading import Lock
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    )
+
+from django.conf import settings
+from django.http import (
+    HttpRequest,
+    QueryDict,
+    )
+from django.utils.datastructures import MultiValueDict
+from django.utils.log import AdminEmailHandler
+
+
+DROP_POLICIES = ("drop_new", "drop_old")
+
+LOGGER = logging.getLogger("papi.log")
+
+
+class LogQueue(queue.Queue):  # type: ignore
+    """
+    Bounded queue of (handler, record) which drops items when full.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum amount of queued records.
+    policy : str, optional
+        "drop_new" discards records that don't fit, "drop_old" discards
+        the oldest queued record to make room.
+
+    """
+
+    def __init__(self, maxsize: int, policy: str = "drop_new") -> None:
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Invalid drop policy: {policy}")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self._drop_lock = Lock()
+
+    def offer(self, item: Any) -> bool:
+        """
+        Add item without blocking, dropping one (per policy) when full.
+
+        Once closed (see close) items are never dropped to make room, so
+        the listener's sentinel can't be.
+
+        Parameters
+        ----------
+        item : any
+            Item to add.
+
+        Returns
+        -------
+        bool
+            Whether the item was added.
+
+        """
+        try:
+            self.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        with self._drop_lock:
+            self.dropped += 1
+            if self.policy == "drop_new" or self.closed:
+                return False
+            try:
+                self.get_nowait()
+                self.task_done()
+            except queue.Empty:
+                pass
+            try:
+                self.put_nowait(item)
+                return True
+            except queue.Full:
+                return False
+
+    def close(self) -> None:
+        """ Stop dropping queued items to make room (see offer). """
+        with self._drop_lock:
+            self.closed = True
+
+
+def detach_request(request: HttpRequest) -> HttpRequest:
+    """
+    Copy request with what error reports read from it (body, cookies,
+    user...) evaluated now.
+
+    Once the request is over its body can't be read, and the user must not
+    be loaded from another thread.
+
+    Parameters
+    ----------
+    request : HttpRequest
+        Request being handled.
+
+    Returns
+    -------
+    HttpRequest
+
+    """
+    for name in ("GET", "COOKIES"):
+        getattr(request, name)
+    try:
+        getattr(request, "POST")
+        getattr(request, "FILES")
+    except Exception:  # pylint: disable=broad-except
+        # ie: invalid or too big body, reports show none
+        # pylint: disable=protected-access
+        request._post, request._files = QueryDict(), MultiValueDict()
+    detached = copy.copy(request)
+    if hasattr(request, "user"):
+        try:
+            detached.user = str(request.user)
+        except Exception:  # pylint: disable=broad-except
+            del detached.user
+    return detached
+
+
+class QueuedHandler(QueueHandler):
+    """
+    Stand in for a handler, queues its records for the listener thread.
+
+    Level is the same as the handler, so records it would ignore are not
+    queued.
+
+    Parameters
+    ----------
+    target : Handler
+        Handler records are for.
+    log_queue : LogQueue
+        Queue shared with the listener.
+
+    """
+
+    def __init__(self, target: logging.Handler, log_queue: LogQueue) -> None:
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.target = target
+        self.setLevel(target.level)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Copy record with args merged into message, so later changes to them
+        don't matter.
+
+        Exception text is formatted now with the handler's formatter, as
+        QueueHandler does. AdminEmailHandler also gets exc_info (for its
+        report) and the record's request, detached (see detach_request).
+
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        request = getattr(record, "request", None)
+        if isinstance(self.target, AdminEmailHandler):
+            if isinstance(request, HttpRequest):
+                setattr(record, "request", detach_request(request))
+            return record
+
+        if request is not None:
+            delattr(record, "request")
+        if record.exc_info:
+            if not record.exc_text:
+                formatter = self.target.formatter or logging.Formatter()
+                record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.log_queue.offer((self.target, record))
+
+
+class DispatchingListener(QueueListener):
+    """
+    Listener passing each queued record to the handler it's for.
+
+    Parameters
+    ----------
+    log_queue : LogQueue
+        Queue shared with the queued handlers.
+    queued : list(QueuedHandler), optional
+        Handlers putting records in log_queue.
+
+    """
+
+    def __init__(
+            self, log_queue: LogQueue,
+            queued: Sequence[QueuedHandler] = ()) -> None:
+        super().__init__(log_queue)
+        self.log_queue = log_queue
+        self.queued = list(queued)
+        self._reported = 0
+
+    def handle(self, record: Any) -> None:
+        """ Handle (handler, record) item. """
+        handler, record = record
+        try:
+            handler.handle(record)
+        except Exception:  # pylint: disable=broad-except
+            handler.handleError(record)
+        dropped = self.log_queue.dropped
+        if dropped != self._reported:
+            LOGGER.warning(
+                "%s log records dropped (queue full)",
+                dropped - self._reported)
+            self._reported = dropped
+
+    def enqueue_sentinel(self) -> None:
+        """
+        Wait for room, so stopping never drops the sentinel, with the queue
+        closed so records logged meanwhile can't drop it either.
+
+        """
+        self.log_queue.close()
+        self.log_queue.put(self._sentinel)  # type: ignore
+
+
+def queue_handlers(
+        loggers: Iterable[logging.Logger], maxsize: int,
+        policy: str = "drop_new") -> DispatchingListener:
+    """
+    Replace handlers of loggers by queued ones, and start the listener.
+
+    Parameters
+    ----------
+    loggers : list(Logger)
+        Loggers to change.
+    maxsize : int
+        Maximum amount of queued records.
+    policy : str, optional
+        What to drop when the queue is full (see LogQueue).
+
+    Returns
+    -------
+    DispatchingListener
+        Listener thread, stop it to handle queued records.
+
+    """
+    log_queue = LogQueue(maxsize, policy)
+    queued: Dict[int, QueuedHandler] = {}
+    for logger in loggers:
+        handlers: List[logging.Handler] = []
+        for handler in logger.handlers:
+            if not isinstance(handler, QueuedHandler):
+                if id(handler) not in queued:
+                    queued[id(handler)] = QueuedHandler(handler, log_queue)
+                handler = queued[id(handler)]
+            handlers.append(handler)
+        logger.handlers = handlers
+    listener = DispatchingListener(log_queue, list(queued.values()))
+    listener.start()
+    return listener
+
+
+_LISTENER: Optional[DispatchingListener] = None
+
+
+def configure_logging(config: Dict[str, Any]) -> None:
+    """
+    Configure logging from LOGGING, with handlers on a background thread.
+
+    Used as LOGGING_CONFIG. With PAPI_LOG_QUEUE_SIZE = 0 handlers run on
+    the logging thread, as with Django's default.
+
+    Parameters
+    ----------
+    config : dict
+        dictConfig configuration (LOGGING setting).
+
+    """
+    global _LISTENER  # pylint: disable=global-statement
+    stop_logging()
+    logging.config.dictConfig(config)
+    maxsize = getattr(settings, "PAPI_LOG_QUEUE_SIZE", 0)
+    if not maxsize:
+        return
+
+    names: Tuple[str, ...] = ("", *config.get("loggers", {}))
+    _LISTENER = queue_handlers(
+        (logging.getLogger(name) for name in names),
+        maxsize,
+        getattr(settings, "PAPI_LOG_DROP_POLICY", "drop_new"))
+
+
+@atexit.register
+def stop_logging() -> None:
+    """ Handle queued records and stop the listener thread (if running). """
+    global _LISTENER  # pylint: disable=global-statement
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+def restart_logging() -> None:
+    """
+    Start a new queue and listener thread (if running), in forked processes.
+
+    Threads are not copied on fork, records still queued are the parent's.
+
+    """
+    global _LISTENER  # pylint: disable=global-statement
+    listener = _LISTENER
+    if listener is None:
+        return
+    log_queue = LogQueue(
+        listener.log_queue.maxsize, listener.log_queue.policy)
+    for handler in listener.queued:
+        handler.queue = handler.log_queue = log_queue
+    _LISTENER = DispatchingListener(log_queue, listener.queued)
+    _LISTENER.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=restart_logging)
@@ -0,0 +1,28 @@
+""" Command to write the OpenAPI schema to a static file (ie: on build). """
+from typing import Any
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandParser,
+    )
+
+from papi.schema import render_schema
+
+
+class Command(BaseCommand):  # type: ignore
+    """ Write OpenAPI schema, as YAML for .yaml/.yml paths, JSON otherwise. """
+    help = __doc__
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("path", help="File to write.")
+        parser.add_argument(
+            "--url", default="",
+            help="API base URL for host and scheme (ie: https://example.com).")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        path = options["path"]
+        format_ = "yaml" if path.endswith((".yaml", ".yml")) else "json"
+        content = render_schema(options["url"], format_)
+        with open(path, "wb") as handle:
+            handle.write(content)
+        self.stdout.write(f"Schema written to {path} ({len(content)} bytes).")
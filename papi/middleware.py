@@ -0,0 +1,310 @@
+""" Middleware for papi """
+import hashlib
+import zlib
+
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    )
+
+from django.conf import settings
+from django.db import connection
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    )
+from django.utils.cache import patch_vary_headers
+
+from units.cache import LRUCache
+from units.metrics import (
+    inc,
+    metrics_enabled,
+    observe,
+    )
+
+try:
+    import brotli
+except ImportError:  # Optional, "br" encoding is not available
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # Optional, "zstd" encoding is not available
+    zstandard = None
+
+
+# Used when client accepts more than one (with the same quality).
+ENCODING_PREFERENCE = ("br", "zstd", "gzip")
+
+
+class BrotliCompressor:
+    """ Brotli compressor with the same interface as zlib's. """
+
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        """ Compress data, may keep some of it buffered. """
+        return self._compressor.process(data)  # type: ignore
+
+    def flush(self) -> bytes:
+        """ Get remaining compressed data. """
+        return self._compressor.finish()  # type: ignore
+
+
+def get_compressor(encoding: str, level: int) -> Any:
+    """
+    Get compressor object (`compress` and `flush` methods) for encoding.
+
+    Parameters
+    ----------
+    encoding : str
+        Content coding (gzip, br or zstd).
+    level : int
+        Compression level (quality for br).
+
+    Returns
+    -------
+    compressor
+
+    """
+    if encoding == "br":
+        return BrotliCompressor(level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    # wbits=31 adds gzip header and trailer
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def available_encodings() -> Dict[str, int]:
+    """
+    Get installed encodings enabled in PAPI_COMPRESSION_LEVELS, with level.
+
+    Returns
+    -------
+    dict(str, int)
+
+    Examples
+    --------
+    output:
+        {"gzip": 6}
+
+    """
+    levels = getattr(settings, "PAPI_COMPRESSION_LEVELS", {"gzip": 6})
+    installed = {"br": brotli, "zstd": zstandard, "gzip": zlib}
+    return {
+        encoding: levels[encoding] for encoding in ENCODING_PREFERENCE
+        if encoding in levels and installed[encoding] is not None}
+
+
+def negotiate_encoding(
+        accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """
+    Get best available encoding for an Accept-Encoding header.
+
+    Highest quality wins, ties are broken by the order of available.
+
+    Parameters
+    ----------
+    accept_encoding : str
+        Accept-Encoding header value.
+    available : iterable(str)
+        Encodings that can be used, in order of preference.
+
+    Returns
+    -------
+    str or None
+
+    Examples
+    --------
+    input:
+        "gzip, br;q=0.5", ["br", "gzip"]
+
+    output:
+        "gzip"
+
+    """
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with gzip (and br/zstd when brotli/zstandard are
+    installed), as negotiated with Accept-Encoding.
+
+    Responses smaller than PAPI_COMPRESSION_MIN_SIZE bytes are left alone.
+    Compressed bodies are kept in a per process LRU cache (keyed by
+    encoding and digest of the body, PAPI_COMPRESSION_CACHE_SIZE entries),
+    so the same payload (ie: a cached unit list) is compressed once.
+
+    Parameters
+    ----------
+    get_response : callable
+        Next middleware or view.
+
+    """
+
+    def __init__(
+            self, get_response: Callable[[HttpRequest], HttpResponse]
+            ) -> None:
+        self.get_response = get_response
+        self.cache = LRUCache(
+            getattr(settings, "PAPI_COMPRESSION_CACHE_SIZE", 64))
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response = self.get_response(request)
+        if response.has_header("Content-Encoding"):
+            return response
+        min_size = getattr(settings, "PAPI_COMPRESSION_MIN_SIZE", 512)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        available = available_encodings()
+        encoding = negotiate_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""), available)
+        if encoding is None:
+            return response
+        level = available[encoding]
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                response.streaming_content, encoding, level)
+            del response["Content-Length"]
+        else:
+            content = self.compress(response.content, encoding, level)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response["Content-Length"] = str(len(content))
+
+        # Body differs from the uncompressed one, same as GZipMiddleware
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def compress(self, content: bytes, encoding: str, level: int) -> bytes:
+        """
+        Get compressed content, from cache when already compressed.
+
+        Parameters
+        ----------
+        content : bytes
+            Response body.
+        encoding : str
+            Content coding.
+        level : int
+            Compression level.
+
+        Returns
+        -------
+        bytes
+
+        """
+        key = (encoding, level, hashlib.sha1(content).digest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressor = get_compressor(encoding, level)
+            compressed = compressor.compress(content) + compressor.flush()
+            self.cache.set(key, compressed)
+        return compressed  # type: ignore
+
+    @staticmethod
+    def compress_stream(
+            chunks: Iterable[bytes], encoding: str, level: int
+            ) -> Iterator[bytes]:
+        """
+        Compress streamed content (not cached).
+
+        Parameters
+        ----------
+        chunks : iterable(bytes)
+            Response body chunks.
+        encoding : str
+            Content coding.
+        level : int
+            Compression level.
+
+        Returns
+        -------
+        iterator(bytes)
+
+        """
+        compressor = get_compressor(encoding, level)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class MetricsMiddleware:  # pylint: disable=too-few-public-methods
+    """
+    Count requests (by route, method and status), database queries, and
+    observe latency per route (see units.metrics).
+
+    Routes are URL names (ie: "latestunitversionview-list"), "unmatched"
+    for unknown URLs. Streamed bodies are not included in latency.
+
+    Parameters
+    ----------
+    get_response : callable
+        Next middleware or view.
+
+    """
+
+    def __init__(
+            self, get_response: Callable[[HttpRequest], HttpResponse]
+            ) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not metrics_enabled():
+            return self.get_response(request)
+
+        queries = 0
+
+        def count(
+                execute: Callable[..., Any], sql: str, params: Any,
+                many: bool, context: Dict[str, Any]) -> Any:
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = perf_counter()
+        with connection.execute_wrapper(count):
+            response = self.get_response(request)
+        elapsed = perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        route = (match.view_name if match else "") or "unmatched"
+        inc("papi_requests_total", labels=(
+            route, request.method or "", str(response.status_code)))
+        observe("papi_request_duration_seconds", elapsed, (route,))
+        if queries:
+            inc("papi_db_queries_total", queries, (route,))
+        return response
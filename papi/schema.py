@@ -0,0 +1,127 @@
+"""
+OpenAPI schema (drf-yasg) for papi, generated once per process.
+
+Generating the schema introspects every view and serializer, so rendered
+schemas are kept in memory and served with an ETag (304 when unchanged).
+They only change with the code, ie: on deploy. Also see the write_schema
+command, for a static file.
+"""
+import hashlib
+
+from typing import (
+    Any,
+    Optional,
+    Tuple,
+    )
+
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import (
+    get_conditional_response,
+    quote_etag,
+    )
+from drf_yasg import openapi
+from drf_yasg.codecs import (
+    OpenAPICodecJson,
+    OpenAPICodecYaml,
+    )
+from drf_yasg.views import (
+    get_schema_view,
+    SPEC_RENDERERS,
+    )
+from rest_framework import permissions
+from rest_framework.request import Request
+
+from units.cache import LRUCache
+
+
+INFO = openapi.Info(
+    title="Prismata API",
+    default_version='v1',
+    description="REST API for Prismata related data.",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="info@ancobl.in"),
+    license=openapi.License(name="AGPLv3+ License"),
+    )
+
+BaseSchemaView = get_schema_view(
+    INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+    )
+
+
+class SchemaView(BaseSchemaView):  # type: ignore
+    """
+    Schema view serving rendered schemas (JSON/YAML) from a per process
+    cache.
+
+    Schemas include host and scheme, so they are kept per renderer,
+    version and base URL (`cache_size` entries). The schema is public, it
+    doesn't depend on the user. Docs pages (swagger, redoc) are not cached,
+    they are cheap (schema is loaded separately) and show the user.
+
+    """
+    cache_size = 32
+    cache = LRUCache(cache_size)
+
+    def get(
+            self, request: Request, version: str = "",
+            format: Optional[str] = None) -> HttpResponse:
+        # pylint: disable=redefined-builtin
+        if not isinstance(request.accepted_renderer, SPEC_RENDERERS):
+            return super().get(request, version, format)
+
+        key = (
+            request.accepted_media_type,
+            request.version or version or "",
+            request.build_absolute_uri("/"))
+        cached: Optional[Tuple[bytes, str, str]] = self.cache.get(key)
+        if cached is None:
+            response = self.finalize_response(
+                request, super().get(request, version, format))
+            response.render()
+            cached = (
+                response.content,
+                response["Content-Type"],
+                quote_etag(hashlib.sha1(response.content).hexdigest()))
+            self.cache.set(key, cached)
+
+        content, content_type, etag = cached
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = etag
+        return response
+
+
+def render_schema(url: str = "", format: str = "json") -> bytes:
+    """
+    Generate and render schema, outside of a request (ie: on build).
+
+    Parameters
+    ----------
+    url : str, optional
+        API base URL (ie: "https://example.com"), for host and scheme.
+        Without it they are left out (same as the docs' host).
+    format : str, optional
+        "json" or "yaml".
+
+    Returns
+    -------
+    bytes
+
+    """
+    # pylint: disable=redefined-builtin,import-outside-toplevel
+    from rest_framework.test import APIRequestFactory
+    from rest_framework.views import APIView
+
+    # Views expect a request (ie: get_queryset reads query params)
+    request = APIView().initialize_request(APIRequestFactory().get(
+        reverse("schema-json", kwargs={"format": f".{format}"})))
+    generator = SchemaView.generator_class(INFO, url=url)
+    schema = generator.get_schema(request=request, public=True)
+    codec: Any = (
+        OpenAPICodecYaml(validators=[]) if format == "yaml"
+        else OpenAPICodecJson(validators=[], pretty=True))
+    return codec.encode(schema)  # type: ignore
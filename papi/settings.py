@@ -34,10 +34,16 @@ ADMINS = [
     ]
 
 
+# Profile, "full" (browsable API, docs, admin) or "api" (JSON API only, with
+# a lean middleware stack, see end of file). Also set in settings_local.
+PAPI_PROFILE = os.environ.get("PAPI_PROFILE", "full")
+
+
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # Admin site isn't routed, don't import every app's admin at startup
+    "django.contrib.admin.apps.SimpleAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -46,11 +52,14 @@ INSTALLED_APPS = [
     "rest_framework",
     "drf_yasg",
     "corsheaders",
-    "units",
+    "units.apps.UnitsConfig",
+    "papi",
 ]
 
 MIDDLEWARE = [
+    "papi.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "papi.middleware.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -92,6 +101,24 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Rendered unit responses, for a cache shared between workers use:
+    # "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+    # "LOCATION": "/var/tmp/papi_units",
+    "units": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "units",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -144,6 +171,13 @@ EMAIL_HOST_USER = "info_ancoblin"
 EMAIL_HOST_PASSWORD = ""
 SERVER_EMAIL = "papi@ancobl.in"
 
+# Handlers run on a background thread (see papi.log), with a queue of up to
+# N records (0 to handle records on the logging thread). When the queue is
+# full "drop_new" drops new records, "drop_old" the oldest queued one.
+LOGGING_CONFIG = "papi.log.configure_logging"
+PAPI_LOG_QUEUE_SIZE = 10000
+PAPI_LOG_DROP_POLICY = "drop_new"
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -186,6 +220,18 @@ LOGGING = {
             "level": "ERROR",
             "propagate": True,
             },
+        # Startup warm-up (see UNITS_WARMUP_ENABLED)
+        "units.warmup": {
+            "handlers": ["console", "file"],
+            "level": "INFO",
+            "propagate": False,
+            },
+        # Sampled request timings (see UNITS_TIMING_SAMPLE_RATE)
+        "units.timing": {
+            "handlers": ["file"],
+            "level": "INFO",
+            "propagate": False,
+            },
         }
     }
 
@@ -285,5 +331,102 @@ REST_FRAMEWORK = {
         },
     }
 
+# Compression (see papi.middleware.CompressionMiddleware)
+# Level per encoding, only these are used (br/zstd need brotli/zstandard).
+PAPI_COMPRESSION_LEVELS = {"br": 5, "zstd": 3, "gzip": 6}
+# Smaller responses (bytes) are not compressed.
+PAPI_COMPRESSION_MIN_SIZE = 512
+# Compressed bodies kept per process (for identical responses).
+PAPI_COMPRESSION_CACHE_SIZE = 64
+
+# Metrics (see units.metrics, exposed at /metrics)
+PAPI_METRICS_ENABLED = True
+# Shared directory for many worker processes (each writes its own file, at
+# most every N seconds), None for a single process.
+PAPI_METRICS_DIR = None
+PAPI_METRICS_FLUSH_INTERVAL = 5
+# Clients (addresses or networks) allowed to read /metrics, None for anyone.
+PAPI_METRICS_ALLOWED_NETWORKS = ["127.0.0.0/8", "::1"]
+
+# ASGI (see papi.asgi)
+# Threads running requests per process (each one keeps its own database
+# connection), None for ThreadPoolExecutor's default.
+PAPI_ASGI_THREADS = 10
+
+# Units
+# Compiled query plans cache (see units.utils.compile_query).
+UNITS_QUERY_CACHE_ENABLED = True
+UNITS_QUERY_CACHE_SIZE = 256
+# Data version (see units.versions) is checked at most every N seconds.
+UNITS_DATA_VERSION_TTL = 60
+# Where units are read from: "view" (live) or "snapshot" (materialized table,
+# see refresh_units_snapshot command).
+UNITS_SOURCE = "view"
+# Where filters are evaluated: "orm" (database) or "catalog" (in-memory).
+UNITS_BACKEND = "orm"
+# CACHES alias for rendered responses (None to disable) and TTL in seconds.
+UNITS_RESPONSE_CACHE = "units"
+UNITS_RESPONSE_CACHE_TTL = 300
+# Serialize unit rows without DRF fields (also "?serializer=fast").
+UNITS_FAST_SERIALIZER = False
+# Rows per database fetch and per chunk for streamed (NDJSON) lists.
+UNITS_STREAM_CHUNK_SIZE = 500
+# ETag/Last-Modified headers and 304 responses for unit endpoints.
+UNITS_CONDITIONAL_GET = True
+# Cursor pagination ("?page_size=N" or "?cursor=..."), default and max size.
+UNITS_PAGE_SIZE = 100
+UNITS_MAX_PAGE_SIZE = 1000
+# Maximum amount of queries per batch request (POST latest/units/batch/).
+UNITS_BATCH_MAX_QUERIES = 100
+# Catalog columns (boolean/integer) with up to N distinct values are indexed
+# as bitmaps, 0 to always scan.
+UNITS_BITSET_MAX_VALUES = 64
+# Fraction of unit requests timed per stage ("units.timing" log), 0 to
+# disable, 1 for every request.
+UNITS_TIMING_SAMPLE_RATE = 0.0
+# Send timings of sampled requests to clients (Server-Timing header, always
+# with DEBUG): exposes query counts and durations.
+UNITS_SERVER_TIMING = False
+# Warm up per process caches when papi.wsgi/papi.asgi are loaded (see
+# units.warmup): data version and catalog (UNITS_WARMUP_PRELOAD), run
+# popular queries (UNITS_WARMUP_QUERIES, ie: ["gold<=3", "name=drone"]) and
+# build the OpenAPI schema. Requests are made with UNITS_WARMUP_HOST
+# (cached responses are per host, must be allowed by ALLOWED_HOSTS).
+UNITS_WARMUP_ENABLED = False
+UNITS_WARMUP_PRELOAD = True
+UNITS_WARMUP_QUERIES: List[str] = []
+UNITS_WARMUP_SCHEMA = True
+UNITS_WARMUP_HOST = "localhost"
+
 # pylint: disable=wildcard-import,wrong-import-position
 from papi.settings_local import *  # noqa
+
+if PAPI_PROFILE == "api":
+    # Anonymous, read only, API: no admin, docs, sessions, CSRF, messages...
+    # Auth app stays for AnonymousUser (request.user, throttling).
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS if app not in (
+            "django.contrib.admin.apps.SimpleAdminConfig",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "django.contrib.staticfiles",
+            "drf_yasg",
+            )]
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE if middleware in (
+            "papi.middleware.MetricsMiddleware",
+            "django.middleware.security.SecurityMiddleware",
+            "papi.middleware.CompressionMiddleware",
+            "corsheaders.middleware.CorsMiddleware",
+            "django.middleware.common.CommonMiddleware",
+            )]
+    REST_FRAMEWORK.update({
+        "DEFAULT_RENDERER_CLASSES": [
+            "rest_framework.renderers.JSONRenderer",
+            ],
+        "DEFAULT_AUTHENTICATION_CLASSES": [],
+        # Everyone is anonymous
+        "DEFAULT_THROTTLE_CLASSES": [
+            "rest_framework.throttling.AnonRateThrottle",
+            ],
+        })
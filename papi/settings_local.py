@@ -5,6 +5,8 @@
 
 # ALLOWED_HOSTS = []
 
+# PAPI_PROFILE = "api"
+
 # STATIC_ROOT = os.path.join(BASE_DIR, "static/")
 
 # DATABASES = {
@@ -0,0 +1,306 @@
+""" Tests for papi.asgi """
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+
+from papi.asgi import (
+    application,
+    ASGIHandler,
+    get_environ,
+    )
+
+
+def scope_for(path="/", method="GET", query_string=b"", headers=()):
+    """ Get ASGI HTTP scope. """
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query_string,
+        "headers": list(headers),
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 5000),
+        }
+
+
+def call(app, scope, messages=None):
+    """ Run app for scope, get messages sent. """
+    incoming = list(messages or [{"type": "http.request", "body": b""}])
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+class GetEnvironTests(unittest.TestCase):
+    """ Tests all cases for papi.asgi.get_environ """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        scope = scope_for(
+            "/api/café/", "POST", b"q=gold%3D3",
+            [
+                (b"content-type", b"application/json"),
+                (b"content-length", b"2"),
+                (b"accept-encoding", b"gzip"),
+                (b"x-many", b"a"),
+                (b"x-many", b"b"),
+                (b"x_many", b"spoofed"),
+                (b"cookie", b"a=1"),
+                (b"cookie", b"b=2"),
+                ])
+        expected_result = {
+            "REQUEST_METHOD": "POST",
+            "SCRIPT_NAME": "",
+            "PATH_INFO": "/api/cafÃ©/",
+            "QUERY_STRING": "q=gold%3D3",
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": "2",
+            "HTTP_ACCEPT_ENCODING": "gzip",
+            "HTTP_X_MANY": "a,b",
+            "HTTP_COOKIE": "a=1; b=2",
+            "wsgi.url_scheme": "http",
+            }
+
+        # When
+        result = get_environ(scope, b"{}")
+
+        # Then
+        self.assertEqual(
+            {key: result[key] for key in expected_result}, expected_result)
+        self.assertEqual(result["wsgi.input"].read(), b"{}")
+
+
+class ASGIHandlerTests(unittest.TestCase):
+    """ Tests all cases for papi.asgi.ASGIHandler """
+
+    def test_body(self):
+        """ Test body received in many messages. """
+        # Given
+        def echo(environ, start_response):
+            start_response("201 Created", [("Content-Type", "text/plain")])
+            return [environ["wsgi.input"].read()]
+
+        messages = [
+            {"type": "http.request", "body": b"ab", "more_body": True},
+            {"type": "http.request", "body": b"cd"},
+            ]
+        expected_result = [
+            {
+                "type": "http.response.start",
+                "status": 201,
+                "headers": [(b"content-type", b"text/plain")],
+                },
+            {"type": "http.response.body", "body": b"abcd"},
+            ]
+
+        # When
+        result = call(ASGIHandler(echo), scope_for(method="POST"), messages)
+
+        # Then
+        self.assertEqual(result, expected_result)
+
+    def test_write(self):
+        """ Test body given to write() is sent before the iterable's. """
+        # Given
+        def app(environ, start_response):
+            # pylint: disable=unused-argument
+            write = start_response("200 OK", [])
+            write(b"ab")
+            write(b"cd")
+            return [b"ef"]
+
+        # When
+        result = call(ASGIHandler(app), scope_for())
+
+        # Then
+        self.assertEqual(
+            result[-1], {"type": "http.response.body", "body": b"abcdef"})
+
+    def test_disconnect(self):
+        """ Test client gone before the body was received. """
+        # Given
+        calls = []
+
+        def app(environ, start_response):
+            calls.append(environ)
+            start_response("200 OK", [])
+            return [b""]
+
+        messages = [
+            {"type": "http.request", "body": b"ab", "more_body": True},
+            {"type": "http.disconnect"},
+            ]
+
+        # When
+        result = call(ASGIHandler(app), scope_for(method="POST"), messages)
+
+        # Then
+        self.assertEqual(result, [])
+        self.assertEqual(calls, [])
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=3)
+    def test_too_large(self):
+        """ Test 413 for bodies over DATA_UPLOAD_MAX_MEMORY_SIZE. """
+        # Given
+        calls = []
+
+        def app(environ, start_response):
+            calls.append(environ)
+            start_response("200 OK", [])
+            return [b""]
+
+        data = {
+            "content_length": (
+                [(b"content-length", b"4")],
+                [{"type": "http.request", "body": b"abcd"}]),
+            "received": (
+                [],
+                [
+                    {"type": "http.request", "body": b"ab", "more_body": True},
+                    {"type": "http.request", "body": b"cd", "more_body": True},
+                    ]),
+            }
+
+        # When/Then
+        for name, (headers, messages) in data.items():
+            with self.subTest(name):
+                result = call(
+                    ASGIHandler(app),
+                    scope_for(method="POST", headers=headers), messages)
+                self.assertEqual(result[0]["status"], 413)
+                self.assertEqual(calls, [])
+
+        # When
+        result = call(
+            ASGIHandler(app), scope_for(method="POST"),
+            [{"type": "http.request", "body": b"abc"}])
+
+        # Then
+        self.assertEqual(result[0]["status"], 200)
+
+    def test_streaming(self):
+        """ Test chunks sent from the request thread, closed after. """
+        # Given
+        threads = set()
+
+        def chunks():
+            for chunk in (b"a", b"", b"b"):
+                threads.add(threading.current_thread())
+                yield chunk
+
+        response = StreamingHttpResponse(chunks(), content_type="text/plain")
+        closed = []
+        response.close = lambda: closed.append(threading.current_thread())
+
+        def app(environ, start_response):
+            # pylint: disable=unused-argument
+            start_response("200 OK", list(response.items()))
+            return response
+
+        # When
+        result = call(ASGIHandler(app), scope_for())
+
+        # Then
+        self.assertEqual(
+            [message.get("body") for message in result],
+            [None, b"a", b"b", b""])
+        self.assertEqual(
+            [message.get("more_body") for message in result[1:]],
+            [True, True, None])
+        self.assertEqual(len(threads), 1)
+        self.assertEqual(closed, list(threads))
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_concurrent(self):
+        """ Test loop is free while requests run in threads. """
+        # Given
+        def slow(environ, start_response):
+            # pylint: disable=unused-argument
+            time.sleep(0.2)
+            start_response("200 OK", [])
+            return [b"done"]
+
+        handler = ASGIHandler(slow, max_workers=5)
+        ticks = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):  # pylint: disable=unused-argument
+            pass
+
+        async def tick():
+            for _ in range(10):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(
+                tick(),
+                *(handler(scope_for(), receive, send) for _ in range(5)))
+
+        # When
+        start = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - start
+
+        # Then
+        self.assertLess(elapsed, 0.5)
+        self.assertLess(ticks[-1] - start, 0.2)
+
+    def test_lifespan(self):
+        """ Test startup and shutdown. """
+        # Given
+        handler = ASGIHandler(lambda environ, start_response: [])
+        messages = [
+            {"type": "lifespan.startup"},
+            {"type": "lifespan.shutdown"},
+            ]
+        expected_result = [
+            {"type": "lifespan.startup.complete"},
+            {"type": "lifespan.shutdown.complete"},
+            ]
+
+        # When
+        result = call(handler, {"type": "lifespan"}, messages)
+
+        # Then
+        self.assertEqual(result, expected_result)
+
+    def test_unsupported(self):
+        """ Test websocket scope. """
+        # When/Then
+        with self.assertRaises(ValueError):
+            call(ASGIHandler(lambda *args: []), {"type": "websocket"})
+
+    def test_application(self):
+        """ Test Django application. """
+        # When
+        result = call(application, scope_for(
+            "/api/", headers=[(b"accept", b"application/json")]))
+
+        # Then
+        self.assertEqual(result[0]["status"], 200)
+        self.assertIn(
+            (b"content-type", b"application/json"), result[0]["headers"])
+        self.assertIn("latest/units", json.loads(result[1]["body"]))
@@ -0,0 +1,312 @@
+""" Tests for papi.log """
+import logging
+import sys
+import threading
+import time
+import unittest
+from mock import patch
+
+from django.test import RequestFactory
+from django.utils.functional import SimpleLazyObject
+from django.utils.log import AdminEmailHandler
+
+from papi import log
+from papi.log import (
+    detach_request,
+    LogQueue,
+    queue_handlers,
+    QueuedHandler,
+    restart_logging,
+    )
+
+
+class SlowHandler(logging.Handler):
+    """ Handler taking `delay` seconds per record, or until released. """
+
+    def __init__(self, delay=0.0, level=logging.NOTSET):
+        super().__init__(level)
+        self.delay = delay
+        self.started = threading.Event()
+        self.resume = threading.Event()
+        self.resume.set()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.started.set()
+        self.resume.wait(5)
+        time.sleep(self.delay)
+        self.records.append(record.getMessage())
+        self.threads.add(threading.current_thread())
+
+
+class LogQueueTests(unittest.TestCase):
+    """ Tests all cases for papi.log.LogQueue """
+
+    def test_policies(self):
+        """ Test items kept when full. """
+        # Given
+        data = {
+            "drop_new": [0, 1],
+            "drop_old": [3, 4],
+            }
+
+        # When/Then
+        for policy, expected_result in data.items():
+            with self.subTest(policy):
+                log_queue = LogQueue(2, policy)
+                for item in range(5):
+                    log_queue.offer(item)
+                self.assertEqual(
+                    [log_queue.get_nowait() for _ in range(2)],
+                    expected_result)
+                self.assertEqual(log_queue.dropped, 3)
+
+    def test_invalid_policy(self):
+        """ Test unknown policy. """
+        # When/Then
+        with self.assertRaises(ValueError):
+            LogQueue(2, "block")
+
+    def test_closed(self):
+        """ Test nothing is dropped to make room once closed. """
+        # Given
+        log_queue = LogQueue(1, "drop_old")
+        log_queue.offer("sentinel")
+
+        # When
+        log_queue.close()
+        result = log_queue.offer("record")
+
+        # Then
+        self.assertFalse(result)
+        self.assertEqual(log_queue.get_nowait(), "sentinel")
+
+
+def make_record(**extra):
+    """ Get ERROR record with args, exception info and extra attributes. """
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        return logging.getLogger("papi.tests.log").makeRecord(
+            "papi.tests.log", logging.ERROR, __file__, 1, "error %s",
+            ("args",), sys.exc_info(), extra=extra)
+
+
+class QueuedHandlerTests(unittest.TestCase):
+    """ Tests all cases for papi.log.QueuedHandler.prepare """
+
+    def setUp(self):
+        self.request = RequestFactory().post(
+            "/api/", {"name": "drone"}, HTTP_COOKIE="a=b")
+        self.request.user = SimpleLazyObject(lambda: "alice")
+
+    def test_copy(self):
+        """ Test handlers get a copy, without exc_info nor request. """
+        # Given
+        record = make_record(request=self.request)
+        handler = QueuedHandler(logging.StreamHandler(), LogQueue(10))
+
+        # When
+        result = handler.prepare(record)
+
+        # Then
+        self.assertIsNot(result, record)
+        self.assertEqual((record.msg, record.args), ("error %s", ("args",)))
+        self.assertEqual((result.msg, result.args), ("error args", None))
+        self.assertIsNone(result.exc_info)
+        self.assertIn("ValueError: boom", result.exc_text)
+        self.assertFalse(hasattr(result, "request"))
+        self.assertIs(record.request, self.request)
+
+    def test_admin_email(self):
+        """ Test AdminEmailHandler gets exc_info and a detached request. """
+        # Given
+        record = make_record(request=self.request)
+        handler = QueuedHandler(AdminEmailHandler(), LogQueue(10))
+
+        # When
+        result = handler.prepare(record)
+
+        # Then
+        self.assertIsNotNone(result.exc_info)
+        self.assertIsNot(result.request, self.request)
+        self.assertEqual(result.request.user, "alice")
+        self.assertEqual(result.request.POST["name"], "drone")
+        self.assertEqual(result.request.COOKIES, {"a": "b"})
+
+
+class DetachRequestTests(unittest.TestCase):
+    """ Tests all cases for papi.log.detach_request """
+
+    def test_invalid_body(self):
+        """ Test body that can't be parsed is left out. """
+        # Given
+        request = RequestFactory().post(
+            "/api/", b"--x\r\nbroken", content_type="multipart/form-data")
+
+        # When
+        result = detach_request(request)
+
+        # Then
+        self.assertEqual(dict(result.POST), {})
+        self.assertEqual(dict(result.FILES), {})
+        self.assertFalse(hasattr(result, "user"))
+
+
+class QueueHandlersTests(unittest.TestCase):
+    """ Tests all cases for papi.log.queue_handlers """
+
+    def setUp(self):
+        self.logger = logging.getLogger("papi.tests.log")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.addCleanup(setattr, self.logger, "handlers", [])
+
+    def test_slow_handler(self):
+        """ Test logging doesn't wait for a slow handler. """
+        # Given
+        handler = SlowHandler(delay=0.1)
+        self.logger.handlers = [handler]
+        listener = queue_handlers([self.logger], 100)
+
+        # When
+        start = time.perf_counter()
+        for index in range(5):
+            self.logger.info("record %s", index)
+        elapsed = time.perf_counter() - start
+        listener.stop()
+
+        # Then
+        self.assertLess(elapsed, 0.1)
+        self.assertEqual(
+            handler.records, [f"record {index}" for index in range(5)])
+        self.assertNotIn(threading.current_thread(), handler.threads)
+
+    def test_level(self):
+        """ Test records below handler level are not queued. """
+        # Given
+        handler = SlowHandler(level=logging.ERROR)
+        self.logger.handlers = [handler]
+        listener = queue_handlers([self.logger], 100)
+
+        # When
+        self.logger.info("ignored")
+        self.logger.error("handled")
+        listener.stop()
+
+        # Then
+        self.assertIsInstance(self.logger.handlers[0], QueuedHandler)
+        self.assertEqual(handler.records, ["handled"])
+
+    def test_full(self):
+        """ Test records dropped when handler can't keep up. """
+        # Given
+        data = {
+            "drop_new": ["record 0", "record 1", "record 2"],
+            "drop_old": ["record 0", "record 8", "record 9"],
+            }
+
+        # When/Then
+        for policy, expected_result in data.items():
+            with self.subTest(policy):
+                handler = SlowHandler()
+                handler.resume.clear()
+                self.logger.handlers = [handler]
+                listener = queue_handlers([self.logger], 2, policy)
+                self.logger.info("record 0")
+                handler.started.wait(5)  # Listener busy with first record
+                with self.assertLogs("papi.log", "WARNING") as logs:
+                    for index in range(1, 10):
+                        self.logger.info("record %s", index)
+                    handler.resume.set()
+                    listener.stop()
+                self.assertEqual(handler.records, expected_result)
+                self.assertEqual(
+                    logs.output,
+                    ["WARNING:papi.log:7 log records dropped (queue full)"])
+
+    def test_stop_while_logging(self):
+        """ Test records logged while stopping never drop the sentinel. """
+        # Given
+        handler = SlowHandler(delay=0.2)
+        handler.resume.clear()
+        self.logger.handlers = [handler]
+        listener = queue_handlers([self.logger], 2, "drop_old")
+        self.logger.info("record 0")
+        handler.started.wait(5)
+        self.logger.info("record 1")
+        self.logger.info("record 2")  # Queue full
+        stopping = threading.Thread(target=listener.stop)
+        stopping.start()  # Waits for room
+        handler.resume.set()
+        for _ in range(100):
+            if None in list(listener.log_queue.queue):  # Sentinel queued
+                break
+            time.sleep(0.01)
+
+        # When
+        with self.assertLogs("papi.log", "WARNING"):
+            for index in range(3, 10):
+                self.logger.info("record %s", index)
+            stopping.join(5)
+
+        # Then
+        self.assertFalse(stopping.is_alive())
+        self.assertEqual(handler.records, ["record 0", "record 1", "record 2"])
+
+
+class RestartLoggingTests(unittest.TestCase):
+    """ Tests all cases for papi.log.restart_logging """
+
+    def test_restart(self):
+        """ Test handlers use a new queue and listener (as after fork). """
+        # Given
+        logger = logging.getLogger("papi.tests.log")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        self.addCleanup(setattr, logger, "handlers", [])
+        handler = SlowHandler()
+        logger.handlers = [handler]
+        listener = queue_handlers([logger], 10, "drop_old")
+        listener.stop()
+
+        # When
+        with patch.object(log, "_LISTENER", listener):
+            restart_logging()
+            result = log._LISTENER  # pylint: disable=protected-access
+            logger.info("restarted")
+            result.stop()
+
+        # Then
+        self.assertIsNot(result, listener)
+        self.assertIsNot(result.log_queue, listener.log_queue)
+        self.assertEqual(
+            (result.log_queue.maxsize, result.log_queue.policy),
+            (10, "drop_old"))
+        self.assertIs(logger.handlers[0].log_queue, result.log_queue)
+        self.assertEqual(handler.records, ["restarted"])
+
+    def test_not_running(self):
+        """ Test nothing to restart. """
+        # When
+        with patch.object(log, "_LISTENER", None):
+            restart_logging()
+            result = log._LISTENER  # pylint: disable=protected-access
+
+        # Then
+        self.assertIsNone(result)
+
+
+class ConfigureLoggingTests(unittest.TestCase):
+    """ Tests papi.log.configure_logging (LOGGING_CONFIG) setup. """
+
+    def test_configured(self):
+        """ Test configured loggers use queued handlers. """
+        # When/Then
+        for name in ("django", "django.request", "units.timing"):
+            with self.subTest(name):
+                handlers = logging.getLogger(name).handlers
+                self.assertTrue(handlers)
+                for handler in handlers:
+                    self.assertIsInstance(handler, QueuedHandler)
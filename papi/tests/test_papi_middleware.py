@@ -0,0 +1,215 @@
+""" Tests for papi.middleware """
+import gzip
+import unittest
+from mock import patch
+
+from django.db import connection
+from django.http import (
+    HttpResponse,
+    StreamingHttpResponse,
+    )
+from django.test import (
+    override_settings,
+    RequestFactory,
+    )
+from django.urls import reverse
+
+from papi.middleware import (
+    available_encodings,
+    CompressionMiddleware,
+    negotiate_encoding,
+    )
+from units.metrics import get_registry
+from units.tests.fixtures import UnitTableTestCase
+
+
+CONTENT = b'{"name":"Drone","gold":3}' * 100
+
+
+class NegotiateEncodingTests(unittest.TestCase):
+    """ Tests all cases for papi.middleware.negotiate_encoding """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        available = ["br", "zstd", "gzip"]
+        data = {
+            "preference": ("gzip, br", "br"),
+            "quality": ("gzip, br;q=0.5", "gzip"),
+            "not_available": ("deflate", None),
+            "rejected": ("gzip;q=0", None),
+            "any": ("*", "br"),
+            "any_but": ("*, br;q=0", "zstd"),
+            "spaces_case": (" GZIP ; q=0.8 ", "gzip"),
+            "invalid_quality": ("br;q=x, gzip", "gzip"),
+            "empty": ("", None),
+            }
+
+        # When/Then
+        for name, (header, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    negotiate_encoding(header, available), expected_result)
+
+
+class AvailableEncodingsTests(unittest.TestCase):
+    """ Tests all cases for papi.middleware.available_encodings """
+
+    @override_settings(PAPI_COMPRESSION_LEVELS={"gzip": 9, "br": 4})
+    def test_not_installed(self):
+        """ Test encodings without their module are skipped. """
+        # When
+        with patch("papi.middleware.brotli", None):
+            result = available_encodings()
+
+        # Then
+        self.assertEqual(result, {"gzip": 9})
+
+    @override_settings(PAPI_COMPRESSION_LEVELS={"br": 4, "gzip": 1})
+    def test_installed(self):
+        """ Test encodings in preference order. """
+        # When
+        with patch("papi.middleware.brotli", object()):
+            result = available_encodings()
+
+        # Then
+        self.assertEqual(list(result.items()), [("br", 4), ("gzip", 1)])
+
+
+class CompressionMiddlewareTests(unittest.TestCase):
+    """ Tests all cases for papi.middleware.CompressionMiddleware """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        overrides = override_settings(
+            PAPI_COMPRESSION_LEVELS={"gzip": 6},
+            PAPI_COMPRESSION_MIN_SIZE=200, PAPI_COMPRESSION_CACHE_SIZE=4)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def get(self, response, accept_encoding="gzip"):
+        """ Get response through middleware. """
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(
+            self.factory.get("/", HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_gzip(self):
+        """ Test body compressed and headers. """
+        # Given
+        response = HttpResponse(CONTENT)
+        response["ETag"] = '"abc"'
+
+        # When
+        result = self.get(response)
+
+        # Then
+        self.assertEqual(gzip.decompress(result.content), CONTENT)
+        self.assertEqual(result["Content-Encoding"], "gzip")
+        self.assertEqual(result["Content-Length"], str(len(result.content)))
+        self.assertEqual(result["Vary"], "Accept-Encoding")
+        self.assertEqual(result["ETag"], 'W/"abc"')
+
+    def test_not_compressed(self):
+        """ Test responses left as they are. """
+        # Given
+        encoded = HttpResponse(CONTENT)
+        encoded["Content-Encoding"] = "br"
+        data = {
+            "small": (HttpResponse(b"x" * 199), "gzip"),
+            "not_accepted": (HttpResponse(CONTENT), "identity"),
+            "already_encoded": (encoded, "gzip"),
+            "incompressible": (HttpResponse(bytes(range(256))), "gzip"),
+            }
+
+        # When/Then
+        for name, (response, accept_encoding) in data.items():
+            with self.subTest(name):
+                content = response.content
+                result = self.get(response, accept_encoding)
+                self.assertEqual(result.content, content)
+                self.assertNotEqual(result.get("Content-Encoding"), "gzip")
+
+    def test_cache(self):
+        """ Test identical bodies are compressed once. """
+        # Given
+        middleware = CompressionMiddleware(
+            lambda request: HttpResponse(CONTENT))
+        request = self.factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+        # When
+        with patch("papi.middleware.get_compressor") as get_compressor:
+            get_compressor.return_value.compress.return_value = b"x"
+            get_compressor.return_value.flush.return_value = b"y"
+            results = [middleware(request).content for _ in range(3)]
+
+        # Then
+        self.assertEqual(results, [b"xy"] * 3)
+        get_compressor.assert_called_once_with("gzip", 6)
+        self.assertEqual(middleware.cache.stats()["hits"], 2)
+
+    def test_streaming(self):
+        """ Test streamed body compressed as a whole. """
+        # Given
+        response = StreamingHttpResponse(iter([CONTENT, b"", CONTENT]))
+
+        # When
+        result = self.get(response)
+
+        # Then
+        self.assertEqual(
+            gzip.decompress(b"".join(result.streaming_content)),
+            CONTENT * 2)
+        self.assertEqual(result["Content-Encoding"], "gzip")
+        self.assertFalse(result.has_header("Content-Length"))
+
+
+class MetricsMiddlewareTests(UnitTableTestCase):
+    """ Tests all cases for papi.middleware.MetricsMiddleware """
+
+    def test_request(self):
+        """ Test request, latency and query counts per route. """
+        # Given
+        registry = get_registry()
+        route = "latestunitversionview-list"
+        requests = registry.metrics["papi_requests_total"]
+        latency = registry.metrics["papi_request_duration_seconds"]
+        queries = registry.metrics["papi_db_queries_total"]
+        before = (
+            requests.values.get((route, "GET", "200"), 0),
+            sum(latency.values.get((route,), [0])[:-1]),
+            queries.values.get((route,), 0),
+            requests.values.get(("unmatched", "GET", "404"), 0))
+
+        # When
+        captured = []
+        with override_settings(
+                UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False
+                ), connection.execute_wrapper(
+                    lambda execute, *args: captured.append(args)
+                    or execute(*args)):
+            self.client.get(reverse(route), {"ids_only": "true"})
+        self.client.get("/not/found/")
+
+        # Then
+        self.assertEqual(
+            (
+                requests.values.get((route, "GET", "200"), 0),
+                sum(latency.values.get((route,), [0])[:-1]),
+                queries.values.get((route,), 0),
+                requests.values.get(("unmatched", "GET", "404"), 0)),
+            (
+                before[0] + 1, before[1] + 1, before[2] + len(captured),
+                before[3] + 1))
+
+    @override_settings(PAPI_METRICS_ENABLED=False)
+    def test_disabled(self):
+        """ Test nothing counted when disabled. """
+        # Given
+        requests = get_registry().metrics["papi_requests_total"]
+        before = dict(requests.values)
+
+        # When
+        self.client.get("/not/found/")
+
+        # Then
+        self.assertEqual(requests.values, before)
@@ -0,0 +1,113 @@
+""" Tests for papi.schema """
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from mock import patch
+
+from django.core.management import call_command
+from django.test import (
+    Client,
+    override_settings,
+    )
+from django.urls import reverse
+
+from papi.schema import SchemaView
+from units.cache import LRUCache
+
+
+class SchemaViewTests(unittest.TestCase):
+    """ Tests all cases for papi.schema.SchemaView """
+
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse("schema-json", kwargs={"format": ".json"})
+        patcher = patch.object(SchemaView, "cache", LRUCache(32))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        generator_class = SchemaView.generator_class
+        patcher = patch.object(
+            generator_class, "get_schema", autospec=True,
+            side_effect=generator_class.get_schema)
+        self.get_schema_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cached(self):
+        """ Test schema is generated once, same ETag. """
+        # When
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+
+        # Then
+        self.assertEqual(
+            (first.status_code, second.status_code), (200, 200))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertEqual(first["Content-Type"], second["Content-Type"])
+        self.assertIn("/units/", json.loads(second.content)["paths"])
+        self.assertEqual(self.get_schema_mock.call_count, 1)
+
+    def test_not_modified(self):
+        """ Test 304 for matching If-None-Match. """
+        # Given
+        etag = self.client.get(self.url)["ETag"]
+
+        # When
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        # Then
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "example.com"])
+    def test_host(self):
+        """ Test schema per host. """
+        # When
+        first = self.client.get(self.url)
+        second = self.client.get(self.url, HTTP_HOST="example.com")
+
+        # Then
+        self.assertEqual(json.loads(first.content)["host"], "testserver")
+        self.assertEqual(json.loads(second.content)["host"], "example.com")
+        self.assertEqual(self.get_schema_mock.call_count, 2)
+
+    def test_docs_page(self):
+        """ Test docs pages are not cached. """
+        # Given
+        url = reverse("schema-swagger-ui")
+
+        # When
+        for _ in range(2):
+            response = self.client.get(url)
+
+        # Then
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(len(SchemaView.cache), 0)
+
+
+class WriteSchemaTests(unittest.TestCase):
+    """ Tests all cases for papi write_schema command """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "no_url": ([], None),
+            "url": (["--url", "https://example.com"], "example.com"),
+            }
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        path = os.path.join(directory, "schema.json")
+
+        # When/Then
+        for name, (args, expected_result) in data.items():
+            with self.subTest(name):
+                call_command("write_schema", path, *args, stdout=StringIO())
+                with open(path, encoding="utf-8") as handle:
+                    result = json.load(handle)
+                os.remove(path)
+                self.assertEqual(result.get("host"), expected_result)
+                self.assertIn("/units/", result["paths"])
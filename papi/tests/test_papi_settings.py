@@ -0,0 +1,74 @@
+""" Tests for papi.settings """
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+SCRIPT = """
+import json
+
+import django
+from django.conf import settings
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+django.setup()
+setup_test_environment()
+client = Client()
+print(json.dumps({
+    "middleware": settings.MIDDLEWARE,
+    "renderers": settings.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"],
+    "api": client.get("/api/").status_code,
+    "docs": client.get("/api/docs/redoc/").status_code,
+    }))
+"""
+
+
+class ProfileTests(unittest.TestCase):
+    """ Tests PAPI_PROFILE settings (in a new process, read at startup). """
+
+    def settings(self, profile):
+        """ Get settings summary for profile. """
+        result = subprocess.run(
+            [sys.executable, "-c", SCRIPT],
+            check=True, stdout=subprocess.PIPE,
+            env=dict(
+                os.environ, PAPI_PROFILE=profile,
+                DJANGO_SETTINGS_MODULE="papi.settings"))
+        return json.loads(result.stdout)
+
+    def test_full(self):
+        """ Test full profile keeps docs and browsable API. """
+        # When
+        result = self.settings("full")
+
+        # Then
+        self.assertIn(
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            result["middleware"])
+        self.assertIn(
+            "rest_framework.renderers.BrowsableAPIRenderer",
+            result["renderers"])
+        self.assertEqual(result["api"], 200)
+        self.assertEqual(result["docs"], 200)
+
+    def test_api(self):
+        """ Test api profile strips middleware, renderers and docs. """
+        # When
+        result = self.settings("api")
+
+        # Then
+        self.assertEqual(len(result["middleware"]), 5)
+        for middleware in (
+                "django.contrib.sessions.middleware.SessionMiddleware",
+                "django.middleware.csrf.CsrfViewMiddleware",
+                "django.contrib.auth.middleware.AuthenticationMiddleware",
+                "django.contrib.messages.middleware.MessageMiddleware",
+                "django.middleware.clickjacking.XFrameOptionsMiddleware"):
+            self.assertNotIn(middleware, result["middleware"])
+        self.assertEqual(
+            result["renderers"], ["rest_framework.renderers.JSONRenderer"])
+        self.assertEqual(result["api"], 200)
+        self.assertEqual(result["docs"], 404)
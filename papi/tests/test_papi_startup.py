@@ -0,0 +1,103 @@
+""" Tests for startup (import) time of papi processes """
+import os
+import subprocess
+import sys
+import unittest
+
+from typing import Dict
+
+
+# What every worker imports anyway: Django's handler and DRF views
+BASELINE = """
+import django.core.handlers.wsgi
+import rest_framework.views
+import rest_framework.viewsets
+"""
+
+# Worker startup: settings, apps, WSGI application and URLconf
+BOOT = """
+import papi.wsgi
+from django.urls import get_resolver
+
+get_resolver().url_patterns
+"""
+
+# Imported on first use only (docs, pyparsing reference parser)
+LAZY_MODULES = (
+    "drf_yasg.codecs",
+    "drf_yasg.generators",
+    "drf_yasg.openapi",
+    "papi.schema",
+    "pyparsing",
+    "ruamel.yaml",
+    )
+
+# Import time of project code (and what it pulls in), as a fraction of
+# BASELINE's: relative, so it holds on slow and fast machines alike.
+IMPORT_BUDGET = 0.25
+
+RUNS = 3
+
+
+def import_times(code: str) -> Dict[str, int]:
+    """
+    Get self import time (us) per module imported by code (`python -X
+    importtime`), in a new process.
+
+    Examples
+    --------
+    output:
+        {"units.utils": 4187, "units.views": 8261, ...}
+
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        check=True, stderr=subprocess.PIPE, universal_newlines=True,
+        env=dict(
+            os.environ, PAPI_PROFILE="full",
+            DJANGO_SETTINGS_MODULE="papi.settings"))
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            times[name.strip()] = int(own)
+    return times
+
+
+class StartupTests(unittest.TestCase):
+    """ Tests imports of a new worker process (PAPI_PROFILE = "full"). """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.baseline = [import_times(BASELINE) for _ in range(RUNS)]
+        cls.boot = [import_times(BOOT) for _ in range(RUNS)]
+
+    def test_lazy_imports(self):
+        """ Test docs stack and pyparsing aren't imported at startup. """
+        for module in LAZY_MODULES:
+            with self.subTest(module=module):
+                # Then
+                self.assertFalse(
+                    module in self.boot[0], f"{module} imported at startup")
+
+    def test_import_budget(self):
+        """ Test import time of project code stays within budget. """
+        # Given
+        baseline = min(sum(times.values()) for times in self.baseline)
+
+        # When
+        project = min(
+            sum(
+                own for name, own in times.items()
+                if name not in self.baseline[0])
+            for times in self.boot)
+
+        # Then
+        self.assertLess(
+            project, baseline * IMPORT_BUDGET,
+            f"Startup imports {project / 1000:.1f}ms over framework's "
+            f"{baseline / 1000:.1f}ms (budget {IMPORT_BUDGET:.0%})")
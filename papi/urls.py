@@ -13,34 +13,54 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from typing import (
+    Any,
+    Callable,
+    cast,
+    List,
+    )
+
+from django.apps import apps
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    )
 from django.urls import (
     include,
     path,
     re_path,
     )
+from django.views.decorators.csrf import csrf_exempt
 
-from rest_framework import (
-    permissions,
-    routers,
-    )
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from rest_framework import routers
 
 from units import views as unit_views
+from units.metrics import metrics_view
 
 
-SchemaView = get_schema_view(
-    openapi.Info(
-        title="Prismata API",
-        default_version='v1',
-        description="REST API for Prismata related data.",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="info@ancobl.in"),
-        license=openapi.License(name="AGPLv3+ License"),
-        ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-    )
+def lazy_schema_view(
+        method: str, *args: Any, **kwargs: Any) -> Callable[..., HttpResponse]:
+    """
+    Get view calling SchemaView.`method`(*args, **kwargs), created (and
+    drf-yasg imported) on first request.
+
+    drf-yasg (with its codecs, YAML libraries...) is only needed for the
+    docs, processes serving the API don't pay for importing it at startup.
+
+    """
+    views: List[Callable[..., HttpResponse]] = []
+
+    def view(request: HttpRequest, *view_args: Any, **view_kwargs: Any
+             ) -> HttpResponse:
+        if not views:
+            # pylint: disable=import-outside-toplevel
+            from papi.schema import SchemaView
+
+            views.append(getattr(SchemaView, method)(*args, **kwargs))
+        return views[0](request, *view_args, **view_kwargs)
+
+    # As APIView.as_view() does
+    return cast(Callable[..., HttpResponse], csrf_exempt(view))
 
 
 ROUTER = routers.DefaultRouter()
@@ -48,17 +68,24 @@ ROUTER.register(r'latest/units', unit_views.LatestUnitVersionViewSet)
 
 
 urlpatterns = [  # pylint: disable=invalid-name
-    re_path(
-        r'^api/docs/swagger(?P<format>\.json|\.yaml)$',
-        SchemaView.without_ui(cache_timeout=0),
-        name='schema-json'),
-    re_path(
-        r'^api/docs/swagger/$',
-        SchemaView.with_ui('swagger', cache_timeout=0),
-        name='schema-swagger-ui'),
-    re_path(
-        r'^api/docs/redoc/$',
-        SchemaView.with_ui('redoc', cache_timeout=0),
-        name='schema-redoc'),
     path("api/", include(ROUTER.urls)),
+    path("metrics", metrics_view, name="metrics"),
     ]
+
+# Not installed with the "api" profile (see PAPI_PROFILE setting)
+if apps.is_installed("drf_yasg"):
+    # Cached per process by SchemaView (not with cache_page)
+    urlpatterns[:0] = [
+        re_path(
+            r'^api/docs/swagger(?P<format>\.json|\.yaml)$',
+            lazy_schema_view("without_ui", cache_timeout=0),
+            name='schema-json'),
+        re_path(
+            r'^api/docs/swagger/$',
+            lazy_schema_view("with_ui", 'swagger', cache_timeout=0),
+            name='schema-swagger-ui'),
+        re_path(
+            r'^api/docs/redoc/$',
+            lazy_schema_view("with_ui", 'redoc', cache_timeout=0),
+            name='schema-redoc'),
+        ]
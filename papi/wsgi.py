@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'papi.settings')
 
 application = get_wsgi_application()  # pylint: disable=invalid-name
+
+# Before the first request (see UNITS_WARMUP_ENABLED)
+# pylint: disable=wrong-import-position
+from units.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -25,5 +25,8 @@ setuptools.setup(
     extras_require={
         "dev": ["pycodestyle", "pylint", "mypy"],
         "test": ["mock", "coverage"],
+        "msgpack": ["msgpack"],
+        "compression": ["brotli", "zstandard"],
+        "asgi": ["uvicorn"],
         },
     )
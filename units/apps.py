@@ -5,3 +5,11 @@ from django.apps import AppConfig
 class UnitsConfig(AppConfig):  # type: ignore
     """ Configuration for papi.units app """
     name = 'units'
+
+    def ready(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        from units.cache import invalidate_unit_caches
+        from units.versions import data_version_changed
+
+        data_version_changed.connect(
+            invalidate_unit_caches, dispatch_uid="units_invalidate_caches")
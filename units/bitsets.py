@@ -0,0 +1,171 @@
+""" Bitset indexes for papi.units """
+from bisect import (
+    bisect_left,
+    bisect_right,
+    )
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    )
+
+
+def bits_from_positions(positions: Iterable[int], size: int) -> int:
+    """
+    Get bitmap with bits set for positions.
+
+    Parameters
+    ----------
+    positions : iterable(int)
+        Positions to set (less than size).
+    size : int
+        Amount of rows.
+
+    Returns
+    -------
+    int
+
+    Examples
+    --------
+    input:
+        [0, 2], 3
+
+    output:
+        0b101
+
+    """
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def positions_from_bits(bits: int) -> List[int]:
+    """
+    Get positions of bits set in bitmap, in order.
+
+    Parameters
+    ----------
+    bits : int
+        Bitmap.
+
+    Returns
+    -------
+    list(int)
+
+    Examples
+    --------
+    input:
+        0b101
+
+    output:
+        [0, 2]
+
+    """
+    digits = bin(bits)[:1:-1]  # Least significant first, without "0b"
+    positions = []
+    position = digits.find("1")
+    while position != -1:
+        positions.append(position)
+        position = digits.find("1", position + 1)
+    return positions
+
+
+def bits_from_matches(
+        matches: Sequence[Optional[bool]]) -> Tuple[int, int]:
+    """
+    Get (true, null) bitmaps for per row results.
+
+    Parameters
+    ----------
+    matches : list(bool or None)
+        Result per row, None for NULL.
+
+    Returns
+    -------
+    tuple(int, int)
+
+    """
+    size = len(matches)
+    return (
+        bits_from_positions(
+            (position for position, match in enumerate(matches) if match),
+            size),
+        bits_from_positions(
+            (
+                position for position, match in enumerate(matches)
+                if match is None),
+            size))
+
+
+class BitsetIndex:
+    """
+    One bitmap per distinct value of a column, plus cumulative bitmaps so
+    range comparisons are a single lookup.
+
+    Parameters
+    ----------
+    cells : list
+        Column values (sortable, None for NULL).
+
+    """
+
+    def __init__(self, cells: Sequence[Any]) -> None:
+        size = len(cells)
+        groups: Dict[Any, List[int]] = {}
+        nulls = []
+        for position, cell in enumerate(cells):
+            if cell is None:
+                nulls.append(position)
+            else:
+                groups.setdefault(cell, []).append(position)
+
+        self.values = sorted(groups)
+        self.bitmaps = {
+            value: bits_from_positions(groups[value], size)
+            for value in self.values}
+        self.nulls = bits_from_positions(nulls, size)
+        self.not_null = ((1 << size) - 1) & ~self.nulls
+        # cumulative[i] has rows with values[:i] (cumulative[0] is empty)
+        self.cumulative = [0]
+        for value in self.values:
+            self.cumulative.append(self.cumulative[-1] | self.bitmaps[value])
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def lookup(self, lookup_type: str, value: Any) -> int:
+        """
+        Get bitmap of rows where `cell <lookup_type> value` is true.
+
+        Rows with NULL cells are never included (see `nulls`).
+
+        Parameters
+        ----------
+        lookup_type : str
+            One of exact, gt, gte, lt, lte.
+        value : any
+            Value to compare with (already prepared for the column).
+
+        Returns
+        -------
+        int
+
+        """
+        if lookup_type == "exact":
+            return self.bitmaps.get(value, 0)
+        if lookup_type == "lt":
+            return self.cumulative[bisect_left(self.values, value)]
+        if lookup_type == "lte":
+            return self.cumulative[bisect_right(self.values, value)]
+        if lookup_type == "gt":
+            return self.not_null & ~self.cumulative[
+                bisect_right(self.values, value)]
+        if lookup_type == "gte":
+            return self.not_null & ~self.cumulative[
+                bisect_left(self.values, value)]
+        raise KeyError(lookup_type)
@@ -0,0 +1,232 @@
+""" Caching helpers for papi.units """
+import hashlib
+
+from collections import OrderedDict
+from threading import Lock
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    Optional,
+    Tuple,
+    )
+
+from django.conf import settings
+from django.core.cache import (
+    BaseCache,
+    caches,
+    )
+
+from units.versions import invalidate_data_version
+
+
+class LRUCache:
+    """
+    Bounded, thread safe, least recently used cache.
+
+    Keeps hit/miss/eviction counters so cache effectiveness can be checked
+    at runtime (see `stats`).
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum amount of entries to keep. Oldest entries are evicted first.
+
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = max(int(maxsize), 0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """
+        Get value for key, marking it as the most recently used.
+
+        Parameters
+        ----------
+        key : hashable
+            Key to look for.
+        default : any, optional
+            Value to return when key is not cached.
+
+        Returns
+        -------
+        any
+
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store value for key, evicting the least recently used entries.
+
+        Parameters
+        ----------
+        key : hashable
+            Key to store the value under.
+        value : any
+            Value to store.
+
+        """
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """ Remove all entries and reset counters. """
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns
+        -------
+        dict(str, int)
+
+        Examples
+        --------
+        output:
+            {"hits": 3, "misses": 1, "evictions": 0, "size": 1, "maxsize": 8}
+
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                }
+
+
+def get_response_cache() -> Optional[BaseCache]:
+    """
+    Get cache used for rendered responses.
+
+    Backend is the UNITS_RESPONSE_CACHE alias from CACHES setting (ie: local
+    memory or file based), None when disabled.
+
+    Returns
+    -------
+    BaseCache or None
+
+    """
+    alias = getattr(settings, "UNITS_RESPONSE_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def response_cache_key(
+        version: str, media_type: str, parts: Iterable[Any]) -> str:
+    """
+    Get cache key for a rendered response.
+
+    Parameters
+    ----------
+    version : str
+        Data version the response was built from.
+    media_type : str
+        Accepted renderer media type.
+    parts : iterable
+        Anything else the response depends on (normalized query, host...).
+
+    Returns
+    -------
+    str
+
+    """
+    raw = "\n".join(map(str, parts)).encode()
+    return f"units:{version}:{media_type}:{hashlib.sha1(raw).hexdigest()}"
+
+
+def cache_response(
+        key: str, content: bytes, content_type: str,
+        timeout: Optional[int] = None) -> None:
+    """
+    Store rendered response.
+
+    Parameters
+    ----------
+    key : str
+        Key from `response_cache_key`.
+    content : bytes
+        Rendered response.
+    content_type : str
+        Value for the Content-Type header.
+    timeout : int, optional
+        Seconds to keep the response, defaults to UNITS_RESPONSE_CACHE_TTL.
+
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return
+    if timeout is None:
+        timeout = getattr(settings, "UNITS_RESPONSE_CACHE_TTL", 300)
+    cache.set(key, (content, content_type), timeout)
+
+
+def cached_response(key: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Get rendered response stored by `cache_response`.
+
+    Parameters
+    ----------
+    key : str
+        Key from `response_cache_key`.
+
+    Returns
+    -------
+    tuple(bytes, str) or None
+        Content and content type.
+
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return None
+    return cache.get(key)  # type: ignore
+
+
+def clear_response_cache() -> None:
+    """ Remove all rendered responses. """
+    cache = get_response_cache()
+    if cache is not None:
+        cache.clear()
+
+
+def invalidate_unit_caches(**kwargs: Any) -> None:
+    """
+    Drop cached responses and check data version again.
+
+    Call after loading a new game patch into the database. Also connected to
+    units.versions.data_version_changed (see units.apps).
+
+    """
+    clear_response_cache()
+    if kwargs.get("version") is None:
+        invalidate_data_version()
@@ -0,0 +1,323 @@
+""" In-memory unit catalog for papi.units """
+import operator
+
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    )
+
+from django.conf import settings
+from django.db.models import (
+    BooleanField,
+    IntegerField,
+    Model,
+    QuerySet,
+    )
+
+from units.bitsets import (
+    BitsetIndex,
+    bits_from_matches,
+    bits_from_positions,
+    positions_from_bits,
+    )
+from units.models import get_unit_model
+from units.search import (
+    searchable,
+    TrigramIndex,
+    )
+from units.versions import get_data_version
+
+
+# ASCII only case folding, same as SQLite's LIKE.
+ASCII_LOWER = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "exact": operator.eq,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    }
+
+
+def _as_text(value: Any) -> Optional[str]:
+    """ Get value as the database would compare it in a LIKE. """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value).translate(ASCII_LOWER)
+
+
+class UnitCatalog:  # pylint: disable=too-many-instance-attributes
+    """
+    Column oriented, read only, copy of unit rows.
+
+    Evaluates includes/excludes lookups (as built by
+    units.utils.compile_query) in Python, with the same results as
+    `queryset.filter(**includes).exclude(**excludes)`.
+
+    Lookups become bitmaps (Python ints, one bit per row) combined with
+    bitwise operations. Boolean and small integer columns are answered
+    from bitset indexes (units.bitsets), text columns from trigram indexes
+    (units.search), built on first use.
+
+    Parameters
+    ----------
+    model : Model class
+        Model the rows belong to.
+    rows : iterable(tuple)
+        Rows values, in the order of the model's concrete fields.
+    version : str, optional
+        Data version the rows were loaded from.
+
+    """
+
+    def __init__(
+            self,
+            model: Type[Model],
+            rows: Iterable[Sequence[Any]],
+            version: str = "") -> None:
+        self.model = model
+        self.version = version
+        # pylint: disable=protected-access
+        self.fields = {
+            column.name: column for column in model._meta.concrete_fields}
+        self.names = tuple(self.fields)
+
+        rows = list(rows)
+        self.columns: Dict[str, Tuple[Any, ...]] = {
+            name: tuple(row[index] for row in rows)
+            for index, name in enumerate(self.names)}
+        self._text_columns: Dict[str, Tuple[Optional[str], ...]] = {}
+        self._text_indexes: Dict[str, TrigramIndex] = {}
+        self._bitsets: Dict[str, Optional[BitsetIndex]] = {}
+        self._instances: List[Optional[Model]] = [None] * len(rows)
+
+    def __len__(self) -> int:
+        return len(self._instances)
+
+    @classmethod
+    def load(cls, queryset: QuerySet, version: str = "") -> "UnitCatalog":
+        """
+        Build catalog from all rows in queryset.
+
+        Parameters
+        ----------
+        queryset : QuerySet
+            Rows to load.
+        version : str, optional
+            Data version the rows were loaded from.
+
+        Returns
+        -------
+        UnitCatalog
+
+        """
+        # pylint: disable=protected-access
+        names = [
+            column.name for column in queryset.model._meta.concrete_fields]
+        return cls(queryset.model, queryset.values_list(*names), version)
+
+    def _text_column(self, name: str) -> Tuple[Optional[str], ...]:
+        """ Get lower case text version of a column (for icontains). """
+        column = self._text_columns.get(name)
+        if column is None:
+            column = tuple(map(_as_text, self.columns[name]))
+            self._text_columns[name] = column
+        return column
+
+    def _text_index(self, name: str) -> TrigramIndex:
+        """ Get trigram index of a text column (for icontains). """
+        index = self._text_indexes.get(name)
+        if index is None:
+            index = TrigramIndex(self._text_column(name))
+            self._text_indexes[name] = index
+        return index
+
+    def _bitset(self, name: str) -> Optional[BitsetIndex]:
+        """
+        Get bitset index of a boolean/integer column, None when the column
+        has more than UNITS_BITSET_MAX_VALUES distinct values.
+
+        """
+        if name not in self._bitsets:
+            index = None
+            if isinstance(self.fields[name], (BooleanField, IntegerField)):
+                index = BitsetIndex(self.columns[name])
+                if len(index) > getattr(
+                        settings, "UNITS_BITSET_MAX_VALUES", 64):
+                    index = None
+            self._bitsets[name] = index
+        return self._bitsets[name]
+
+    def _evaluate(
+            self, lookup: str, value: Union[str, int]) -> Tuple[int, int]:
+        """
+        Evaluate lookup for every row.
+
+        Returns bitmaps of rows where the lookup is true, and of rows where
+        the database would compare against NULL.
+
+        """
+        name, _, lookup_type = lookup.partition("__")
+        if name == "pk":
+            name = self.model._meta.pk.name  # pylint: disable=protected-access
+        lookup_type = lookup_type or "exact"
+        field = self.fields[name]
+
+        if lookup_type == "icontains":
+            needle = str(value).translate(ASCII_LOWER)
+            if searchable(f"{name}__{lookup_type}", value):
+                index = self._text_index(name)
+                return (
+                    bits_from_positions(index.search(needle), len(self)),
+                    bits_from_positions(index.nulls, len(self)))
+            return bits_from_matches([
+                None if text is None else needle in text
+                for text in self._text_column(name)])
+
+        compare = COMPARISONS[lookup_type]
+        # Same coercion (and errors) as the ORM
+        prepared = field.get_prep_value(value)
+        bitset = self._bitset(name)
+        if bitset is not None:
+            return bitset.lookup(lookup_type, prepared), bitset.nulls
+        return bits_from_matches([
+            None if cell is None else compare(cell, prepared)
+            for cell in self.columns[name]])
+
+    def filter(
+            self,
+            includes: Dict[str, Union[str, int]],
+            excludes: Dict[str, Union[str, int]]) -> List[int]:
+        """
+        Get positions of rows matching includes and not matching excludes.
+
+        Lookups are combined as bitmaps, with SQL's three valued logic.
+
+        Parameters
+        ----------
+        includes : dict
+            Lookups to filter by.
+        excludes : dict
+            Lookups to exclude by.
+
+        Returns
+        -------
+        list(int)
+
+        """
+        every = (1 << len(self)) - 1
+
+        def conjunction(
+                lookups: Dict[str, Union[str, int]]) -> Tuple[int, int]:
+            """ (true, false) bitmaps of AND of lookups. """
+            # Same order as Q(**lookups), so invalid values raise the same
+            # error. Rows neither true nor false are NULL.
+            true, false = every, 0
+            for lookup, value in sorted(lookups.items()):
+                matches, nulls = self._evaluate(lookup, value)
+                true &= matches
+                false |= every & ~matches & ~nulls
+            return true, false
+
+        true, _ = conjunction(includes)
+        if excludes:
+            # exclude(a, b) is NOT (a AND b), NULL comparisons drop the row
+            _, excluded_false = conjunction(excludes)
+            true &= excluded_false
+        return positions_from_bits(true)
+
+    def instance(self, position: int) -> Model:
+        """
+        Get model instance for row position (shared, don't modify it).
+
+        Parameters
+        ----------
+        position : int
+            Row position.
+
+        Returns
+        -------
+        Model
+
+        """
+        obj = self._instances[position]
+        if obj is None:
+            obj = self.model(
+                *(self.columns[name][position] for name in self.names))
+            self._instances[position] = obj
+        return obj
+
+    def instances(
+            self,
+            includes: Dict[str, Union[str, int]],
+            excludes: Dict[str, Union[str, int]]) -> List[Model]:
+        """
+        Get model instances matching includes and not matching excludes.
+
+        Parameters
+        ----------
+        includes : dict
+            Lookups to filter by.
+        excludes : dict
+            Lookups to exclude by.
+
+        Returns
+        -------
+        list(Model)
+
+        """
+        return [
+            self.instance(position)
+            for position in self.filter(includes, excludes)]
+
+
+_LOCK = Lock()
+_CATALOG: Optional[UnitCatalog] = None
+
+
+def get_catalog(queryset: Optional[QuerySet] = None) -> UnitCatalog:
+    """
+    Get process wide catalog, (re)loading it when the data version changes.
+
+    Parameters
+    ----------
+    queryset : QuerySet, optional
+        Rows to load. Defaults to all rows from UNITS_SOURCE.
+
+    Returns
+    -------
+    UnitCatalog
+
+    """
+    global _CATALOG  # pylint: disable=global-statement
+    version = get_data_version().token
+    catalog = _CATALOG
+    if catalog is None or catalog.version != version:
+        with _LOCK:
+            catalog = _CATALOG
+            if catalog is None or catalog.version != version:
+                if queryset is None:
+                    # pylint: disable=no-member
+                    queryset = get_unit_model().objects.all()
+                catalog = _CATALOG = UnitCatalog.load(queryset, version)
+    return catalog
+
+
+def clear_catalog() -> None:
+    """ Drop process wide catalog, it will be loaded again on next use. """
+    global _CATALOG  # pylint: disable=global-statement
+    with _LOCK:
+        _CATALOG = None
@@ -0,0 +1,15 @@
+""" Command to drop cached unit data, ie: after loading a new game patch. """
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from units.cache import invalidate_unit_caches
+
+
+class Command(BaseCommand):  # type: ignore
+    """ Drop cached unit responses and check data version again. """
+    help = __doc__
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        invalidate_unit_caches()
+        self.stdout.write("Unit caches invalidated.")
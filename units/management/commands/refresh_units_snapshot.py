@@ -0,0 +1,23 @@
+""" Command to materialize the unit view (ie: after a new game patch). """
+from typing import Any
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandParser,
+    )
+
+from units.snapshot import refresh_snapshot
+
+
+class Command(BaseCommand):  # type: ignore
+    """ Copy latest unit versions into the snapshot table (UNITS_SOURCE). """
+    help = __doc__
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Rows per INSERT statement.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        count = refresh_snapshot(batch_size=options["batch_size"])
+        self.stdout.write(f"{count} units copied to snapshot.")
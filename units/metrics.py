@@ -0,0 +1,569 @@
+"""
+Metrics registry for papi (Prometheus text format).
+
+Counters and histograms live in process memory. With PAPI_METRICS_DIR set
+(multiprocess mode, ie: many WSGI workers), every process also writes its
+values to a file in that directory (at most every
+PAPI_METRICS_FLUSH_INTERVAL seconds, and at exit), and the exposition adds
+up the files of all processes, so any worker can serve the endpoint.
+Files of processes that are no longer running are added to an archive file
+(metrics_archive.json) and removed when collected, so totals never drop
+when a worker exits (counters and histograms are totals, a gauge would
+have to be dropped instead). Without fcntl (Windows) the files are kept.
+Forked processes start with empty values (ie: after a warm-up in the
+master of a preforking server).
+
+The endpoint only answers clients in PAPI_METRICS_ALLOWED_NETWORKS.
+"""
+import atexit
+import ipaddress
+import json
+import os
+import re
+
+from abc import (
+    ABC,
+    abstractmethod,
+    )
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+from typing import (
+    Any,
+    cast,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    )
+
+from django.conf import settings
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseForbidden,
+    )
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows, files of exited processes are kept
+    fcntl = None  # type: ignore
+
+
+# Seconds, same as prometheus_client defaults.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+    7.5, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# File of a process in multiprocess mode, with its PID.
+PROCESS_FILE_RE = re.compile(r"metrics_([0-9]+)\.json")
+# Values of processes that exited, and lock for updating it.
+ARCHIVE_FILE = "metrics_archive.json"
+ARCHIVE_LOCK_FILE = "metrics_archive.lock"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """ Escape label value for the text format. """
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """ Get {name="value",...} (empty without labels). """
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    """ Get value as the text format expects it (ints without ".0"). """
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _read_values(path: str) -> Optional[Dict[str, Any]]:
+    """ Get values written by a process, None if missing or incomplete. """
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return cast(Dict[str, Any], json.load(handle))
+    except (OSError, ValueError):
+        return None  # Removed or being replaced
+
+
+def _write_values(path: str, values: Dict[str, Any]) -> None:
+    """ Replace file with values (atomically, readers never see a part). """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(values, handle)
+    os.replace(temporary, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    """ Whether a process with pid is running (on this host). """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Running, as another user
+    return True
+
+
+class Metric(ABC):
+    """
+    Base for metrics, values per label values.
+
+    Parameters
+    ----------
+    registry : Registry
+        Registry the metric belongs to.
+    name : str
+        Metric name.
+    documentation : str
+        HELP text.
+    labelnames : list(str), optional
+        Label names, values are given in the same order.
+
+    """
+    kind = ""
+
+    def __init__(
+            self, registry: "Registry", name: str, documentation: str,
+            labelnames: Sequence[str] = ()) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Labels, Any] = {}
+
+    @abstractmethod
+    def samples(
+            self, values: Dict[Labels, Any]
+            ) -> List[Tuple[str, str, float]]:
+        """ Get (name suffix, labels, value) lines for values. """
+
+    @abstractmethod
+    def merge(self, current: Any, other: Any) -> Any:
+        """ Add values of the same labels from another process. """
+
+
+class Counter(Metric):
+    """ Monotonically increasing value. """
+    kind = "counter"
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        """
+        Increase counter.
+
+        Parameters
+        ----------
+        amount : float, optional
+            Amount to add.
+        labels : tuple(str), optional
+            Label values.
+
+        """
+        with self.registry.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+        self.registry.changed()
+
+    def samples(
+            self, values: Dict[Labels, Any]
+            ) -> List[Tuple[str, str, float]]:
+        return [
+            ("", _format_labels(self.labelnames, labels), value)
+            for labels, value in sorted(values.items())]
+
+    def merge(self, current: Any, other: Any) -> Any:
+        return (current or 0) + other
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, in cumulative buckets.
+
+    Parameters
+    ----------
+    buckets : list(float), optional
+        Upper bounds of buckets (+Inf is added).
+
+    """
+    kind = "histogram"
+
+    def __init__(
+            self, registry: "Registry", name: str, documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        """
+        Add an observation.
+
+        Values are kept as [count per bucket (non cumulative)..., sum].
+
+        Parameters
+        ----------
+        value : float
+            Observed value (ie: seconds).
+        labels : tuple(str), optional
+            Label values.
+
+        """
+        index = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            values = self.values.get(labels)
+            if values is None:
+                values = self.values[labels] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+        self.registry.changed()
+
+    def samples(
+            self, values: Dict[Labels, Any]
+            ) -> List[Tuple[str, str, float]]:
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        names = self.labelnames + ("le",)
+        result = []
+        for labels, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                result.append((
+                    "_bucket", _format_labels(names, labels + (bound,)),
+                    cumulative))
+            result.append(
+                ("_sum", _format_labels(self.labelnames, labels), counts[-1]))
+            result.append((
+                "_count", _format_labels(self.labelnames, labels),
+                cumulative))
+        return result
+
+    def merge(self, current: Any, other: Any) -> Any:
+        if current is None:
+            return list(other)
+        return [first + second for first, second in zip(current, other)]
+
+
+class Registry:
+    """
+    Collection of metrics, exposed in Prometheus text format.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Shared directory for multiprocess mode.
+    flush_interval : float, optional
+        Minimum seconds between writes of this process' file.
+
+    """
+
+    def __init__(
+            self, directory: Optional[str] = None,
+            flush_interval: float = 5) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics: Dict[str, Metric] = {}
+        self.lock = Lock()
+        self._flushed = monotonic()
+
+    def counter(
+            self, name: str, documentation: str,
+            labelnames: Sequence[str] = ()) -> Counter:
+        """ Get counter (created on first use). """
+        return cast(
+            Counter, self._get(Counter, name, documentation, labelnames))
+
+    def histogram(
+            self, name: str, documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """ Get histogram (created on first use). """
+        return cast(Histogram, self._get(
+            Histogram, name, documentation, labelnames, buckets))
+
+    def _get(self, cls: Any, name: str, *args: Any) -> Any:
+        """ Get metric by name, creating it with cls(*args) if needed. """
+        if name not in self.metrics:
+            with self.lock:
+                self.metrics.setdefault(name, cls(self, name, *args))
+        return self.metrics[name]
+
+    @property
+    def path(self) -> Optional[str]:
+        """ File with values of this process (multiprocess mode). """
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+
+    def reset(self) -> None:
+        """ Drop values of every metric (ie: copied from a parent process). """
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+        self._flushed = monotonic()
+
+    def changed(self) -> None:
+        """ Write values to file when due (multiprocess mode). """
+        due = monotonic() - self._flushed >= self.flush_interval
+        if self.directory and due:
+            self.flush()
+
+    def snapshot(self) -> Dict[str, List[Tuple[Labels, Any]]]:
+        """ Get copy of values of every metric. """
+        with self.lock:
+            return {
+                name: [
+                    (labels, list(value) if isinstance(value, list) else value)
+                    for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items()}
+
+    def flush(self) -> None:
+        """ Write values of this process to its file (multiprocess mode). """
+        path = self.path
+        if path is None:
+            return
+        self._flushed = monotonic()
+        os.makedirs(self.directory or "", exist_ok=True)
+        _write_values(path, self.snapshot())
+
+    def archive(self, paths: Sequence[str]) -> bool:
+        """
+        Add values of files of exited processes to the archive file and
+        remove them (multiprocess mode).
+
+        Parameters
+        ----------
+        paths : list(str)
+            Files of processes that are no longer running.
+
+        Returns
+        -------
+        bool
+            False when files can't be archived (no fcntl), they are kept.
+
+        """
+        if fcntl is None or not self.directory:
+            return False
+        archive = os.path.join(self.directory, ARCHIVE_FILE)
+        lock_path = os.path.join(self.directory, ARCHIVE_LOCK_FILE)
+        with open(lock_path, "a", encoding="utf-8") as lock:
+            # Released when closed, other processes may be archiving too
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            sources = [_read_values(archive)]
+            sources.extend(_read_values(path) for path in paths)
+            if not any(sources[1:]):
+                return True  # Archived by another process meanwhile
+            _write_values(archive, {
+                name: list(values.items())
+                for name, values in self._merge(sources).items()})
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Already archived by another process
+        return True
+
+    def collect(self) -> Dict[str, Dict[Labels, Any]]:
+        """
+        Get values of every metric, added up for all processes in
+        multiprocess mode (live values for this process).
+
+        Files of processes that are no longer running are archived first
+        (see `archive`).
+
+        """
+        own = self.path
+        sources: List[Optional[Dict[str, Any]]] = [self.snapshot()]
+        if self.directory and os.path.isdir(self.directory):
+            paths, exited = [], []
+            for filename in sorted(os.listdir(self.directory)):
+                path = os.path.join(self.directory, filename)
+                match = PROCESS_FILE_RE.fullmatch(filename)
+                if match is None or path == own:
+                    continue
+                if _pid_alive(int(match.group(1))):
+                    paths.append(path)
+                else:
+                    exited.append(path)
+            if exited and not self.archive(exited):
+                paths.extend(exited)
+            paths.append(os.path.join(self.directory, ARCHIVE_FILE))
+            sources.extend(_read_values(path) for path in paths)
+        return self._merge(sources)
+
+    def _merge(
+            self, sources: Sequence[Optional[Dict[str, Any]]]
+            ) -> Dict[str, Dict[Labels, Any]]:
+        """ Add up values of processes (None sources are skipped). """
+        result: Dict[str, Dict[Labels, Any]] = {}
+        for source in sources:
+            for name, items in (source or {}).items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = result.setdefault(name, {})
+                for labels, value in items:
+                    labels = tuple(labels)
+                    values[labels] = metric.merge(values.get(labels), value)
+        return result
+
+    def exposition(self) -> str:
+        """
+        Get metrics in Prometheus text format.
+
+        Returns
+        -------
+        str
+
+        Examples
+        --------
+        output:
+            # HELP papi_requests_total Requests by route, method and status.
+            # TYPE papi_requests_total counter
+            papi_requests_total{route="api-root",method="GET",status="200"} 3
+
+        """
+        collected = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for suffix, labels, value in metric.samples(
+                    collected.get(name, {})):
+                lines.append(f"{name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _create_registry() -> Registry:
+    """ Registry configured from PAPI_METRICS_* settings. """
+    created = Registry(
+        getattr(settings, "PAPI_METRICS_DIR", None),
+        getattr(settings, "PAPI_METRICS_FLUSH_INTERVAL", 5))
+    atexit.register(created.flush)
+    return created
+
+
+_REGISTRY: Optional[Registry] = None
+
+
+def get_registry() -> Registry:
+    """
+    Get process wide metrics registry, with papi metrics registered.
+
+    Returns
+    -------
+    Registry
+
+    """
+    global _REGISTRY  # pylint: disable=global-statement
+    if _REGISTRY is None:
+        registry = _create_registry()
+        registry.counter(
+            "papi_requests_total", "Requests by route, method and status.",
+            ("route", "method", "status"))
+        registry.histogram(
+            "papi_request_duration_seconds", "Request latency by route.",
+            ("route",))
+        registry.counter(
+            "papi_db_queries_total", "Database queries by route.", ("route",))
+        registry.counter(
+            "units_query_parse_failures_total",
+            "Queries (q) with invalid filters that were dropped.")
+        registry.counter(
+            "units_ignored_filters_total",
+            "Filters on unknown fields that were ignored.")
+        registry.counter(
+            "units_response_cache_total", "Response cache lookups by result.",
+            ("result",))
+        _REGISTRY = registry
+    return _REGISTRY
+
+
+def _reset_registry() -> None:
+    """ Start forked processes without the parent's values. """
+    if _REGISTRY is not None:
+        _REGISTRY.lock = Lock()  # May have been held by another thread
+        _REGISTRY.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_registry)
+
+
+def metrics_enabled() -> bool:
+    """ Whether metrics are collected (PAPI_METRICS_ENABLED setting). """
+    return bool(getattr(settings, "PAPI_METRICS_ENABLED", True))
+
+
+def inc(name: str, amount: float = 1, labels: Labels = ()) -> None:
+    """
+    Increase counter registered in get_registry (if metrics are enabled).
+
+    Parameters
+    ----------
+    name : str
+        Counter name.
+    amount : float, optional
+        Amount to add.
+    labels : tuple(str), optional
+        Label values.
+
+    """
+    if metrics_enabled():
+        cast(Counter, get_registry().metrics[name]).inc(amount, labels)
+
+
+def observe(name: str, value: float, labels: Labels = ()) -> None:
+    """
+    Add observation to histogram registered in get_registry (if metrics
+    are enabled).
+
+    Parameters
+    ----------
+    name : str
+        Histogram name.
+    value : float
+        Observed value.
+    labels : tuple(str), optional
+        Label values.
+
+    """
+    if metrics_enabled():
+        cast(Histogram, get_registry().metrics[name]).observe(value, labels)
+
+
+def metrics_allowed(request: HttpRequest) -> bool:
+    """
+    Whether the client may read metrics (PAPI_METRICS_ALLOWED_NETWORKS
+    setting, None allows everyone).
+
+    The client is REMOTE_ADDR, behind a reverse proxy allow the proxy or
+    scrape workers directly.
+
+    """
+    networks = getattr(
+        settings, "PAPI_METRICS_ALLOWED_NETWORKS", ["127.0.0.0/8", "::1"])
+    if networks is None:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in networks)
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """ Expose metrics in Prometheus text format (to allowed clients). """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        get_registry().exposition(), content_type=CONTENT_TYPE)
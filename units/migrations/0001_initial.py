@@ -0,0 +1,144 @@
+""" Initial migration for papi.units """
+# pylint: disable=invalid-name
+# Generated by Django 2.2.8 on 2026-10-18 20:20
+from typing import (
+    List,
+    Tuple,
+    )
+
+from django.db import (
+    migrations,
+    models,
+    )
+
+
+class Migration(migrations.Migration):  # type: ignore
+    """ Unit view (not managed) and snapshot table with indexes. """
+
+    initial = True
+
+    dependencies: List[Tuple[str, str]] = []
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestUnitVersionView",
+            fields=[
+                ("id", models.AutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name="ID")),
+                ("name", models.CharField(max_length=64)),
+                ("wiki_path", models.CharField(max_length=64)),
+                ("image_url", models.CharField(max_length=128)),
+                ("panel_url", models.CharField(max_length=128)),
+                ("gold", models.IntegerField()),
+                ("green", models.IntegerField()),
+                ("blue", models.IntegerField()),
+                ("red", models.IntegerField()),
+                ("energy", models.IntegerField()),
+                ("attack", models.IntegerField()),
+                ("health", models.IntegerField()),
+                ("supply", models.IntegerField()),
+                ("unit_spell", models.CharField(max_length=32)),
+                ("frontline", models.BooleanField()),
+                ("fragile", models.BooleanField()),
+                ("blocker", models.BooleanField()),
+                ("prompt", models.BooleanField()),
+                ("stamina", models.IntegerField()),
+                ("lifespan", models.IntegerField()),
+                ("build_time", models.IntegerField()),
+                ("exhaust_turn", models.IntegerField()),
+                ("exhaust_ability", models.IntegerField()),
+                ("position", models.CharField(max_length=32)),
+                ("abilities", models.CharField(max_length=256)),
+            ],
+            options={
+                "db_table": "latest_unit_version",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="LatestUnitVersionSnapshot",
+            fields=[
+                ("id", models.AutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name="ID")),
+                ("name", models.CharField(max_length=64)),
+                ("wiki_path", models.CharField(max_length=64)),
+                ("image_url", models.CharField(max_length=128)),
+                ("panel_url", models.CharField(max_length=128)),
+                ("gold", models.IntegerField()),
+                ("green", models.IntegerField()),
+                ("blue", models.IntegerField()),
+                ("red", models.IntegerField()),
+                ("energy", models.IntegerField()),
+                ("attack", models.IntegerField()),
+                ("health", models.IntegerField()),
+                ("supply", models.IntegerField()),
+                ("unit_spell", models.CharField(max_length=32)),
+                ("frontline", models.BooleanField()),
+                ("fragile", models.BooleanField()),
+                ("blocker", models.BooleanField()),
+                ("prompt", models.BooleanField()),
+                ("stamina", models.IntegerField()),
+                ("lifespan", models.IntegerField()),
+                ("build_time", models.IntegerField()),
+                ("exhaust_turn", models.IntegerField()),
+                ("exhaust_ability", models.IntegerField()),
+                ("position", models.CharField(max_length=32)),
+                ("abilities", models.CharField(max_length=256)),
+            ],
+            options={
+                "db_table": "latest_unit_version_snapshot",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["name"], name="unit_snapshot_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["gold"], name="unit_snapshot_gold_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["green"], name="unit_snapshot_green_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["blue"], name="unit_snapshot_blue_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["red"], name="unit_snapshot_red_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["energy"], name="unit_snapshot_energy_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["attack"], name="unit_snapshot_attack_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["health"], name="unit_snapshot_health_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["supply"], name="unit_snapshot_supply_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="latestunitversionsnapshot",
+            index=models.Index(
+                fields=["unit_spell"], name="unit_snapshot_unit_spell_idx"),
+        ),
+    ]
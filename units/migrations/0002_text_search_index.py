@@ -0,0 +1,64 @@
+""" Text search indexes for unit snapshot (see units.search). """
+# pylint: disable=invalid-name
+from typing import Any
+
+from django.db import (
+    migrations,
+    OperationalError,
+    )
+
+TABLE = "latest_unit_version_snapshot"
+FTS_TABLE = f"{TABLE}_fts"
+COLUMNS = ("name", "unit_spell", "abilities")
+
+
+def create_indexes(apps: Any, schema_editor: Any) -> None:
+    """
+    SQLite: FTS5 trigram table (external content, rowid is the unit id).
+    PostgreSQL: trigram GIN indexes on UPPER(column), as used by icontains.
+
+    """
+    # pylint: disable=unused-argument
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"{', '.join(COLUMNS)}, content='{TABLE}', "
+                "content_rowid='id', tokenize='trigram')")
+        except OperationalError:
+            # No FTS5 or trigram tokenizer (SQLite < 3.34), scan instead
+            return
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    elif vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in COLUMNS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS unit_snapshot_{column}_trgm "
+                f"ON {TABLE} USING gin ((UPPER({column}::text)) "
+                "gin_trgm_ops)")
+
+
+def drop_indexes(apps: Any, schema_editor: Any) -> None:
+    """ Drop indexes created by `create_indexes`. """
+    # pylint: disable=unused-argument
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        for column in COLUMNS:
+            schema_editor.execute(
+                f"DROP INDEX IF EXISTS unit_snapshot_{column}_trgm")
+
+
+class Migration(migrations.Migration):  # type: ignore
+    """ Text search indexes for unit snapshot. """
+
+    dependencies = [
+        ("units", "0001_initial"),
+        ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+        ]
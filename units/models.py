@@ -1,9 +1,12 @@
 """ Models for papi.units """
+from typing import Type
+
+from django.conf import settings
 from django.db import models
 
 
-class LatestUnitVersionView(models.Model):  # type: ignore
-    """ View with unit information and its latest version. """
+class UnitFields(models.Model):  # type: ignore
+    """ Unit information columns, shared by view and snapshot. """
     name = models.CharField(max_length=64)
     wiki_path = models.CharField(max_length=64)
     image_url = models.CharField(max_length=128)
@@ -31,8 +34,55 @@ class LatestUnitVersionView(models.Model):  # type: ignore
 
     class Meta:  # pylint: disable=too-few-public-methods
         """ Metadata for Django models. """
-        managed = False
-        db_table = 'latest_unit_version'
+        abstract = True
 
     def __str__(self) -> str:
         return f"{self.name}"
+
+
+class LatestUnitVersionView(UnitFields):
+    """ View with unit information and its latest version. """
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """ Metadata for Django models. """
+        managed = False
+        db_table = 'latest_unit_version'
+
+
+# Indexed columns in LatestUnitVersionSnapshot.
+SNAPSHOT_INDEXES = (
+    "name", "gold", "green", "blue", "red", "energy", "attack", "health",
+    "supply", "unit_spell",
+    )
+
+
+class LatestUnitVersionSnapshot(UnitFields):
+    """
+    Materialized copy of LatestUnitVersionView, with indexes.
+
+    Refreshed with `python manage.py refresh_units_snapshot`.
+
+    """
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """ Metadata for Django models. """
+        db_table = 'latest_unit_version_snapshot'
+        indexes = [
+            models.Index(fields=[name], name=f"unit_snapshot_{name}_idx")
+            for name in SNAPSHOT_INDEXES]
+
+
+def get_unit_model() -> Type[UnitFields]:
+    """
+    Get model units are read from, depending on UNITS_SOURCE setting.
+
+    "view" (default) reads the live view, "snapshot" the materialized table.
+
+    Returns
+    -------
+    Model class
+
+    """
+    if getattr(settings, "UNITS_SOURCE", "view") == "snapshot":
+        return LatestUnitVersionSnapshot
+    return LatestUnitVersionView
@@ -0,0 +1,159 @@
+""" Pagination for papi.units """
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    )
+
+from django.conf import settings
+from django.db.models import (
+    Model,
+    QuerySet,
+    )
+from rest_framework import exceptions
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+
+from units.catalog import COMPARISONS
+
+
+# Allowed values for "ordering" parameter, primary key breaks ties (but
+# only the first field is in cursors, see UnitCursorPagination).
+ORDERINGS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "-id": ("-id",),
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    }
+
+
+class InstanceList:
+    """
+    Ordering, filtering and slicing (as used by CursorPagination) for a
+    list of model instances (ie: units.catalog results).
+
+    Parameters
+    ----------
+    model : Model class
+        Model the instances belong to.
+    items : list(Model)
+        Instances.
+
+    """
+
+    def __init__(self, model: Type[Model], items: Sequence[Model]) -> None:
+        self.model = model
+        self.items = list(items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        return self.items[key]
+
+    def order_by(self, *ordering: str) -> "InstanceList":
+        """ Get instances sorted by ordering (NULLs first, as SQLite). """
+        items = list(self.items)
+        # Stable sorts, least significant field first
+        for order in reversed(ordering):
+            name = order.lstrip("-")
+            items.sort(
+                key=lambda obj, name=name: (  # type: ignore
+                    getattr(obj, name) is not None, getattr(obj, name)),
+                reverse=order.startswith("-"))
+        return InstanceList(self.model, items)
+
+    def filter(self, **lookups: Any) -> "InstanceList":
+        """ Get instances matching comparison lookups (ie: name__gt). """
+        items = self.items
+        for lookup, value in lookups.items():
+            name, _, lookup_type = lookup.partition("__")
+            compare = COMPARISONS[lookup_type or "exact"]
+            # pylint: disable=protected-access
+            prepared = self.model._meta.get_field(name).get_prep_value(value)
+            items = [
+                obj for obj in items
+                if getattr(obj, name) is not None
+                and compare(getattr(obj, name), prepared)]
+        return InstanceList(self.model, items)
+
+
+class UnitCursorPagination(CursorPagination):  # type: ignore
+    """
+    Keyset pagination for units.
+
+    Pages are filtered on the last seen value of an indexed key (id or
+    name) instead of using offsets, so every page costs the same and pages
+    stay consistent when rows are added or removed.
+
+    Cursors only hold the first ordering field: rows with the same name
+    are skipped by offset (after filtering on the name). That is correct,
+    but a page starting in a group of duplicate names costs the size of
+    that group, and rows added to or removed from the group while paging
+    can shift it. Unit names are nearly unique, so groups stay small.
+
+    Page size defaults to UNITS_PAGE_SIZE, it can be changed with
+    "page_size" parameter (1 to UNITS_MAX_PAGE_SIZE, 400 otherwise).
+    Ordering can be changed with "ordering" parameter (see ORDERINGS).
+
+    """
+
+    page_size_query_param = "page_size"
+    ordering_query_param = "ordering"
+    ordering = ORDERINGS["id"]
+
+    def requested(self, request: Request) -> bool:
+        """ Whether request asks for a page (pagination is opt-in). """
+        return (
+            self.cursor_query_param in request.GET
+            or self.page_size_query_param in request.GET)
+
+    def get_page_size(self, request: Request) -> Optional[int]:
+        """
+        Page size from request or UNITS_PAGE_SIZE.
+
+        Raises
+        ------
+        ValidationError
+            If "page_size" parameter is not an integer from 1 to
+            UNITS_MAX_PAGE_SIZE.
+
+        """
+        self.page_size = getattr(settings, "UNITS_PAGE_SIZE", 100)
+        self.max_page_size = getattr(settings, "UNITS_MAX_PAGE_SIZE", 1000)
+        value = request.GET.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except ValueError:
+            page_size = 0
+        if not 1 <= page_size <= self.max_page_size:
+            raise exceptions.ValidationError({
+                self.page_size_query_param: [
+                    f"Must be an integer from 1 to {self.max_page_size}."]})
+        return page_size
+
+    def get_ordering(
+            self, request: Request, queryset: Any, view: Any
+            ) -> Tuple[str, ...]:
+        """ Ordering from "ordering" parameter, by id if not valid. """
+        return ORDERINGS.get(
+            request.GET.get(self.ordering_query_param, ""),
+            type(self).ordering)
+
+    def paginate_queryset(
+            self,
+            queryset: Union[QuerySet, List[Model]],
+            request: Request,
+            view: Any = None) -> Optional[List[Model]]:
+        """ Support lists returned by the catalog backend. """
+        if not isinstance(queryset, QuerySet):
+            queryset = InstanceList(view.queryset.model, queryset)
+        return super().paginate_queryset(  # type: ignore
+            queryset, request, view)
@@ -0,0 +1,215 @@
+""" Renderers for papi.units """
+# pylint: disable=too-few-public-methods
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    )
+
+from rest_framework.compat import (
+    LONG_SEPARATORS,
+    SHORT_SEPARATORS,
+    )
+from rest_framework.renderers import (
+    BaseRenderer,
+    JSONRenderer,
+    )
+
+try:
+    import msgpack
+except ImportError:  # Optional, binary renderers are not available
+    msgpack = None
+
+
+def json_encoder(renderer: JSONRenderer) -> Callable[[Any], bytes]:
+    """
+    Get function encoding values the same way as renderer (not indented).
+
+    Parameters
+    ----------
+    renderer : JSONRenderer
+        Renderer to take options from.
+
+    Returns
+    -------
+    callable
+
+    """
+    encoder = renderer.encoder_class(
+        ensure_ascii=renderer.ensure_ascii,
+        allow_nan=not renderer.strict,
+        separators=SHORT_SEPARATORS if renderer.compact else LONG_SEPARATORS)
+
+    def encode(data: Any) -> bytes:
+        # Same escaping as JSONRenderer
+        return encoder.encode(data).replace(  # type: ignore
+            "\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+    return encode
+
+
+def batches(items: Iterable[Any], size: int) -> Iterator[Any]:
+    """ Split items into lists of (at most) size items. """
+    iterator = iter(items)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def stream_json(
+        renderer: JSONRenderer,
+        items: Iterable[Any],
+        batch_size: int = 500) -> Iterator[bytes]:
+    """
+    Render items as a JSON array, in chunks of batch_size items.
+
+    Joined chunks are identical to `renderer.render(list(items))`.
+
+    Parameters
+    ----------
+    renderer : JSONRenderer
+        Renderer to take options from.
+    items : iterable
+        Items to render.
+    batch_size : int, optional
+        Items per chunk.
+
+    Returns
+    -------
+    iterator(bytes)
+
+    """
+    encode = json_encoder(renderer)
+    separator = b"," if renderer.compact else b", "
+    prefix = b"["
+    for batch in batches(items, batch_size):
+        yield prefix + separator.join(map(encode, batch))
+        prefix = separator
+    yield b"[]" if prefix == b"[" else b"]"
+
+
+class NDJSONRenderer(JSONRenderer):  # type: ignore
+    """ Renderer which serializes to newline delimited JSON. """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(
+            self,
+            data: Any,
+            accepted_media_type: Optional[str] = None,
+            renderer_context: Optional[Dict[str, Any]] = None) -> bytes:
+        """ Render one line per item if data is a list. """
+        if data is None:
+            return b""
+        return b"".join(
+            self.stream(data if isinstance(data, list) else [data]))
+
+    def stream(
+            self,
+            items: Iterable[Any],
+            batch_size: int = 500) -> Iterator[bytes]:
+        """
+        Render items in chunks of batch_size lines.
+
+        Parameters
+        ----------
+        items : iterable
+            Items to render.
+        batch_size : int, optional
+            Items per chunk.
+
+        Returns
+        -------
+        iterator(bytes)
+
+        """
+        encode = json_encoder(self)
+        for batch in batches(items, batch_size):
+            yield b"".join(encode(item) + b"\n" for item in batch)
+
+
+def to_columns(data: Any) -> Any:
+    """
+    Get lists of objects as objects of lists ("struct of arrays").
+
+    Nested lists (ie: paginated results, batch results) are converted too,
+    anything else is left as is.
+
+    Parameters
+    ----------
+    data : any
+        Data to convert.
+
+    Returns
+    -------
+    any
+
+    Examples
+    --------
+    input:
+        [{"name": "Drone", "gold": 3}, {"name": "Wall", "gold": 1}]
+
+    output:
+        {"name": ["Drone", "Wall"], "gold": [3, 1]}
+
+    """
+    if isinstance(data, list):
+        if data and all(isinstance(item, dict) for item in data):
+            return {
+                name: [item.get(name) for item in data] for name in data[0]}
+        return [to_columns(item) for item in data]
+    if isinstance(data, dict):
+        return {key: to_columns(value) for key, value in data.items()}
+    return data
+
+
+class MessagePackRenderer(BaseRenderer):  # type: ignore
+    """ Renderer which serializes to MessagePack (needs msgpack). """
+    media_type = "application/x-msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(
+            self,
+            data: Any,
+            accepted_media_type: Optional[str] = None,
+            renderer_context: Optional[Dict[str, Any]] = None) -> bytes:
+        """ Render data (anything not native, ie: Decimal, as str). """
+        if data is None:
+            return b""
+        return msgpack.packb(  # type: ignore
+            data, use_bin_type=True, default=str)
+
+
+class ColumnarMessagePackRenderer(MessagePackRenderer):
+    """
+    Renderer which serializes lists as columns (see to_columns) to
+    MessagePack.
+
+    """
+    media_type = "application/x-msgpack-columns"
+    format = "msgpack-columns"
+
+    def render(
+            self,
+            data: Any,
+            accepted_media_type: Optional[str] = None,
+            renderer_context: Optional[Dict[str, Any]] = None) -> bytes:
+        """ Render data with lists as columns. """
+        return super().render(
+            to_columns(data), accepted_media_type, renderer_context)
+
+
+def binary_renderers() -> List[Type[BaseRenderer]]:
+    """ Get MessagePack renderers, if msgpack is installed. """
+    if msgpack is None:
+        return []
+    return [MessagePackRenderer, ColumnarMessagePackRenderer]
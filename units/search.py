@@ -0,0 +1,224 @@
+""" Text search indexes for papi.units """
+from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Optional,
+    List,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    )
+
+from django.db import (
+    connection,
+    connections,
+    )
+from django.db.models import (
+    Model,
+    Q,
+    )
+from django.db.models.expressions import RawSQL
+
+from units.models import LatestUnitVersionSnapshot
+
+
+# Text columns covered by the indexes (snapshot table and catalog).
+TEXT_SEARCH_FIELDS = ("name", "unit_spell", "abilities")
+# Shorter values can't be looked up by trigram, they are scanned.
+MIN_SEARCH_LENGTH = 3
+
+# SQLite full text (FTS5) table, rowid is the snapshot id.
+FTS_TABLE = "latest_unit_version_snapshot_fts"
+
+
+class FTSMatch(RawSQL):  # type: ignore # pylint: disable=abstract-method
+    """ Row ids matching a FTS5 query, as right hand side of `pk__in`. """
+
+    def __init__(self, query: str) -> None:
+        super().__init__(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [query])
+
+    def as_sql(
+            self, compiler: Any, connection: Any
+            ) -> Tuple[str, List[str]]:
+        # pylint: disable=unused-argument,redefined-outer-name
+        # Not parenthesized, IN adds them
+        return self.sql, list(self.params)
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Get all 3 character substrings of text.
+
+    Parameters
+    ----------
+    text : str
+        Text (already case folded).
+
+    Returns
+    -------
+    set(str)
+
+    Examples
+    --------
+    input:
+        "gain"
+
+    output:
+        {"gai", "ain"}
+
+    """
+    return {text[index:index + 3] for index in range(len(text) - 2)}
+
+
+def searchable(lookup: str, value: Union[str, int]) -> Optional[str]:
+    """
+    Get field name if lookup can be answered by a text index.
+
+    Parameters
+    ----------
+    lookup : str
+        Django lookup (ie: "abilities__icontains").
+    value : str or int
+        Lookup value.
+
+    Returns
+    -------
+    str or None
+
+    """
+    field, _, lookup_type = lookup.partition("__")
+    if (
+            lookup_type == "icontains"
+            and field in TEXT_SEARCH_FIELDS
+            and len(str(value)) >= MIN_SEARCH_LENGTH):
+        return field
+    return None
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(alias: str) -> bool:
+    """ Whether FTS table exists in database (checked once per process). """
+    with connections[alias].cursor() as cursor:
+        return FTS_TABLE in connections[alias].introspection.table_names(
+            cursor)
+
+
+def has_text_index(model: Type[Model]) -> bool:
+    """
+    Whether lookups for model can use the SQLite FTS5 index.
+
+    Only the snapshot table is indexed. On PostgreSQL the trigram (GIN)
+    indexes are used by plain icontains lookups, nothing to route.
+
+    Parameters
+    ----------
+    model : Model class
+        Model being queried.
+
+    Returns
+    -------
+    bool
+
+    """
+    return (
+        model is LatestUnitVersionSnapshot
+        and connection.vendor == "sqlite"
+        and _has_fts_table(connection.alias))
+
+
+def text_search_q(lookups: Dict[str, Union[str, int]]) -> Q:
+    """
+    Get Q object for lookups, with text lookups narrowed by the FTS index.
+
+    Candidates from the index are checked against the original lookup, so
+    results are the same as `Q(**lookups)`.
+
+    Parameters
+    ----------
+    lookups : dict
+        Lookups as built by units.utils.compile_query.
+
+    Returns
+    -------
+    Q
+
+    Examples
+    --------
+    input:
+        {"abilities__icontains": "gain XXXX"}
+
+    output:
+        Q(abilities__icontains="gain XXXX")
+        & Q(pk__in=FTSMatch('abilities : "gain XXXX"'))
+
+    """
+    query = Q(**lookups)
+    for lookup, value in sorted(lookups.items()):
+        field = searchable(lookup, value)
+        if field:
+            phrase = str(value).replace('"', '""')
+            query &= Q(pk__in=FTSMatch(f'{field} : "{phrase}"'))
+    return query
+
+
+def rebuild_text_index() -> None:
+    """ Rebuild FTS index from snapshot rows (when available). """
+    if has_text_index(LatestUnitVersionSnapshot):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class TrigramIndex:  # pylint: disable=too-few-public-methods
+    """
+    In-memory trigram index over a text column.
+
+    Parameters
+    ----------
+    texts : iterable(str or None)
+        Column values, already case folded.
+
+    """
+
+    def __init__(self, texts: Iterable[Optional[str]]) -> None:
+        self.texts = tuple(texts)
+        self.nulls = [
+            position for position, text in enumerate(self.texts)
+            if text is None]
+        self.postings: Dict[str, Set[int]] = {}
+        for position, text in enumerate(self.texts):
+            for trigram in trigrams(text or ""):
+                self.postings.setdefault(trigram, set()).add(position)
+
+    def search(self, needle: str) -> Set[int]:
+        """
+        Get positions of texts containing needle.
+
+        Parameters
+        ----------
+        needle : str
+            Text to look for (case folded, at least 3 characters).
+
+        Returns
+        -------
+        set(int)
+
+        """
+        candidates: Optional[Set[int]] = None
+        for trigram in sorted(
+                trigrams(needle),
+                key=lambda value: len(self.postings.get(value, ()))):
+            posting = self.postings.get(trigram, set())
+            candidates = (
+                set(posting) if candidates is None else candidates & posting)
+            if not candidates:
+                return set()
+        texts = self.texts
+        return {
+            position for position in candidates or ()
+            if needle in texts[position]}  # type: ignore
@@ -1,14 +1,211 @@
 """ Serializers for papi.units """
+from operator import attrgetter
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    )
+
+from django.conf import settings
+from django.db.models import (
+    Model,
+    QuerySet,
+    )
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
 from units.models import LatestUnitVersionView
 
 
 class LatestUnitVersionViewSerializer(
         serializers.HyperlinkedModelSerializer):  # type: ignore
-    """ Main serializer for LatestUnitVersionView model. """
+    """
+    Main serializer for LatestUnitVersionView model.
+
+    Output can be restricted with `fields` argument (list of field names).
+
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
     class Meta:  # pylint: disable=too-few-public-methods
         """ Metadatda for serializer. """
         model = LatestUnitVersionView
         fields = "__all__"
+
+
+class LatestUnitVersionViewFastSerializer:
+    """
+    Fast serializer for LatestUnitVersionView model (read only).
+
+    Same output as LatestUnitVersionViewSerializer, without DRF's field
+    machinery: rows are fetched with `values_list` (or read from instances)
+    and dicts are built from precomputed key tuples. The detail URL is
+    reversed once per serializer and filled in with each primary key.
+
+    Parameters
+    ----------
+    instance : QuerySet, iterable(Model) or Model
+        Data to serialize.
+    many : bool, optional
+        Whether instance is a collection.
+    context : dict, optional
+        Serializer context, "request" is required for absolute URLs.
+    fields : list(str), optional
+        Restrict output to these fields (output order is not affected).
+
+    """
+
+    model = LatestUnitVersionView
+    view_name = "latestunitversionview-detail"
+    url_marker = "__pk__"
+
+    def __init__(
+            self,
+            instance: Union[QuerySet, Iterable[Model], Model],
+            many: bool = False,
+            context: Optional[Dict[str, Any]] = None,
+            fields: Optional[Sequence[str]] = None,
+            **kwargs: Any) -> None:
+        # pylint: disable=unused-argument
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+        # pylint: disable=no-member,protected-access
+        self.pk_name = self.model._meta.pk.name
+        self.names = tuple(
+            column.name for column in self.model._meta.concrete_fields
+            if not column.primary_key
+            and (not fields or column.name in fields))
+        self.with_url = not fields or "url" in fields
+        self.keys = (("url",) if self.with_url else ()) + self.names
+
+    def get_url_template(self) -> Tuple[str, str]:
+        """
+        Get detail URL as (prefix, suffix) to be joined with a primary key.
+
+        Returns
+        -------
+        tuple(str, str)
+
+        """
+        url = reverse(
+            self.view_name,
+            kwargs={"pk": self.url_marker},
+            request=self.context.get("request"),
+            format=self.context.get("format"))
+        prefix, _, suffix = url.partition(self.url_marker)
+        return prefix, suffix
+
+    def rows(
+            self, chunk_size: Optional[int] = None
+            ) -> Iterable[Tuple[Any, ...]]:
+        """
+        Get (pk, *values) tuples for all objects.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Stream rows from the database with `iterator(chunk_size)`
+            instead of loading them all at once.
+
+        Returns
+        -------
+        iterable(tuple)
+
+        """
+        instance = self.instance
+        if isinstance(instance, QuerySet):
+            rows = instance.values_list(self.pk_name, *self.names)
+            if chunk_size:
+                return rows.iterator(chunk_size)  # type: ignore
+            return rows  # type: ignore
+        objects = instance if self.many else [instance]
+        if not self.names:
+            # attrgetter with a single attribute doesn't return a tuple
+            return ((getattr(obj, self.pk_name),) for obj in objects)
+        return map(attrgetter(self.pk_name, *self.names), objects)
+
+    def iter_representation(
+            self, rows: Iterable[Tuple[Any, ...]]
+            ) -> Iterator[Dict[str, Any]]:
+        """
+        Get output dicts for rows, one at a time.
+
+        Parameters
+        ----------
+        rows : iterable(tuple)
+            Rows as returned by `rows`.
+
+        Returns
+        -------
+        iterator(dict)
+
+        """
+        keys = self.keys
+        if not self.with_url:
+            for row in rows:
+                yield dict(zip(keys, row[1:]))
+            return
+
+        prefix, suffix = self.get_url_template()
+        for row in rows:
+            url = None if row[0] in (None, "") else f"{prefix}{row[0]}{suffix}"
+            yield dict(zip(keys, (url,) + row[1:]))
+
+    def to_representation(
+            self, rows: Iterable[Tuple[Any, ...]]
+            ) -> List[Dict[str, Any]]:
+        """
+        Get output dicts for rows.
+
+        Parameters
+        ----------
+        rows : iterable(tuple)
+            Rows as returned by `rows`.
+
+        Returns
+        -------
+        list(dict)
+
+        """
+        return list(self.iter_representation(rows))
+
+    @property
+    def data(self) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """ Serialized data. """
+        result = self.to_representation(self.rows())
+        return result if self.many else result[0]
+
+
+class BatchQuerySerializer(serializers.Serializer):  # type: ignore
+    """
+    Input for batch queries, a list of "q" strings.
+
+    At most UNITS_BATCH_MAX_QUERIES queries are accepted.
+
+    """
+    # pylint: disable=abstract-method
+    queries = serializers.ListField(
+        child=serializers.CharField(allow_blank=True, trim_whitespace=False),
+        allow_empty=False)
+
+    def validate_queries(self, value: List[str]) -> List[str]:
+        """ Limit amount of queries. """
+        limit = getattr(settings, "UNITS_BATCH_MAX_QUERIES", 100)
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {limit} elements.")
+        return value
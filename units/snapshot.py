@@ -0,0 +1,46 @@
+""" Materialized unit snapshot for papi.units """
+from django.db import transaction
+
+from units.cache import invalidate_unit_caches
+from units.catalog import clear_catalog
+from units.models import (
+    LatestUnitVersionSnapshot,
+    LatestUnitVersionView,
+    )
+from units.search import rebuild_text_index
+
+
+def refresh_snapshot(batch_size: int = 500) -> int:
+    """
+    Copy LatestUnitVersionView rows into LatestUnitVersionSnapshot.
+
+    Old rows are replaced in a single transaction, so readers see either
+    the old or the new snapshot, never a partial one. Text search index is
+    rebuilt in the same transaction. Then the catalog and cached responses
+    are dropped and the data version is checked again, so this process
+    serves the new rows right away.
+
+    Parameters
+    ----------
+    batch_size : int, optional
+        Rows per INSERT statement.
+
+    Returns
+    -------
+    int
+        Amount of rows copied.
+
+    """
+    # pylint: disable=no-member,protected-access
+    names = [
+        column.name for column in LatestUnitVersionView._meta.concrete_fields]
+    with transaction.atomic():
+        rows = LatestUnitVersionView.objects.values_list(*names)
+        objects = [LatestUnitVersionSnapshot(*row) for row in rows]
+        LatestUnitVersionSnapshot.objects.all().delete()
+        LatestUnitVersionSnapshot.objects.bulk_create(
+            objects, batch_size=batch_size)
+        rebuild_text_index()
+    clear_catalog()
+    invalidate_unit_caches()
+    return len(objects)
@@ -0,0 +1,84 @@
+""" Shared data for units tests """
+import random
+
+from django.db import connection
+from django.test import TestCase
+
+from units.models import LatestUnitVersionView
+
+
+NAMES = [
+    "Drone", "Engineer", "Blastforge", "Animus", "Conduit", "Gauss Cannon",
+    "Wall", "Steelsplitter", "Tarsier", "Rhino", "Forcefield", "Shadowfang",
+    "Doomed Drone", "Galvani Drone", "Xeno Guardian", "Infusion Grid",
+    ]
+ABILITIES = [
+    "", "gain 1 gold", "gain XXXX", "Deal 2 damage", "gain BB",
+    "Sacrifice DRONE: gain 1 energy", "Blocker", "gain X per drone",
+    ]
+
+
+def unit_rows(count=48, seed=0):
+    """ Get list of random (but reproducible) unit rows as dicts. """
+    rand = random.Random(seed)
+    rows = []
+    for index in range(count):
+        name = rand.choice(NAMES)
+        rows.append({
+            "id": index + 1,
+            "name": f"{name} {index}" if rand.random() < 0.5 else name,
+            "wiki_path": name.replace(" ", "_"),
+            "image_url": f"https://example.com/{index}.png",
+            "panel_url": f"https://example.com/{index}_panel.png",
+            "gold": rand.randint(0, 20),
+            "green": rand.randint(0, 3),
+            "blue": rand.randint(0, 3),
+            "red": rand.randint(0, 3),
+            "energy": rand.randint(0, 5),
+            "attack": rand.randint(0, 12),
+            "health": rand.randint(0, 40),
+            "supply": rand.randint(1, 20),
+            "unit_spell": rand.choice(["Unit", "Spell"]),
+            "frontline": rand.random() < 0.3,
+            "fragile": rand.random() < 0.3,
+            "blocker": rand.random() < 0.4,
+            "prompt": rand.random() < 0.2,
+            "stamina": rand.randint(0, 3),
+            "lifespan": rand.randint(0, 8),
+            "build_time": rand.randint(0, 5),
+            "exhaust_turn": rand.randint(0, 2),
+            "exhaust_ability": rand.randint(0, 2),
+            "position": rand.choice(["Front", "Middle", "Back", "Tech"]),
+            "abilities": rand.choice(ABILITIES),
+            })
+    return rows
+
+
+class UnitTableTestCase(TestCase):
+    """
+    TestCase with a real latest_unit_version table (model is unmanaged).
+
+    Table is filled with `unit_rows()`.
+
+    """
+
+    rows = unit_rows()
+
+    @classmethod
+    def setUpClass(cls):
+        # Schema changes can't happen inside the TestCase transaction
+        with connection.schema_editor() as editor:
+            editor.create_model(LatestUnitVersionView)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(LatestUnitVersionView)
+
+    @classmethod
+    def setUpTestData(cls):
+        # pylint: disable=no-member
+        LatestUnitVersionView.objects.bulk_create(
+            LatestUnitVersionView(**row) for row in cls.rows)
@@ -0,0 +1,82 @@
+""" Tests for units.bitsets """
+import random
+import unittest
+
+from units.bitsets import (
+    BitsetIndex,
+    bits_from_matches,
+    bits_from_positions,
+    positions_from_bits,
+    )
+from units.catalog import COMPARISONS
+
+
+class BitsTests(unittest.TestCase):
+    """ Tests conversions between positions and bitmaps. """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "some": ([0, 2, 9], 10, 0b1000000101),
+            "none": ([], 10, 0),
+            "all": ([0, 1, 2], 3, 0b111),
+            "empty": ([], 0, 0),
+            }
+
+        # When/Then
+        for name, (positions, size, expected_result) in data.items():
+            with self.subTest(name):
+                bits = bits_from_positions(positions, size)
+                self.assertEqual(bits, expected_result)
+                self.assertEqual(positions_from_bits(bits), positions)
+
+    def test_matches(self):
+        """ Test true and null bitmaps from per row results. """
+        # When
+        result = bits_from_matches([True, None, False, True, None])
+
+        # Then
+        self.assertEqual(result, (0b01001, 0b10010))
+
+
+class BitsetIndexTests(unittest.TestCase):
+    """ Tests all cases for units.bitsets.BitsetIndex """
+
+    def test_same_as_scan(self):
+        """ Test lookups match comparing every row. """
+        # Given
+        rand = random.Random(6)
+        columns = {
+            "integers": [
+                None if rand.random() < 0.1 else rand.randint(0, 6)
+                for _ in range(200)],
+            "booleans": [
+                None if rand.random() < 0.1 else rand.random() < 0.5
+                for _ in range(200)],
+            }
+        values = [-1, 0, 1, 3, 6, 7, True, False]
+
+        # When/Then
+        for name, cells in columns.items():
+            index = BitsetIndex(cells)
+            for lookup_type, compare in COMPARISONS.items():
+                for value in values:
+                    with self.subTest(f"{name}_{lookup_type}_{value}"):
+                        self.assertEqual(
+                            positions_from_bits(
+                                index.lookup(lookup_type, value)),
+                            [
+                                position
+                                for position, cell in enumerate(cells)
+                                if cell is not None and compare(cell, value)])
+            self.assertEqual(
+                positions_from_bits(index.nulls),
+                [position for position, cell in enumerate(cells)
+                 if cell is None])
+
+    def test_invalid_lookup(self):
+        """ Test unsupported lookups. """
+        # When/Then
+        with self.assertRaises(KeyError):
+            BitsetIndex([1, 2]).lookup("icontains", 1)
@@ -0,0 +1,208 @@
+""" Tests for units.cache """
+import threading
+import unittest
+from mock import patch
+
+from django.core.cache import caches
+from django.test import override_settings
+
+from units.cache import (
+    cache_response,
+    cached_response,
+    clear_response_cache,
+    get_response_cache,
+    invalidate_unit_caches,
+    LRUCache,
+    response_cache_key,
+    )
+
+
+class LRUCacheTests(unittest.TestCase):
+    """ Tests all cases for units.cache.LRUCache """
+
+    def test_get_set(self):
+        """ Test hits and misses. """
+        # Given
+        cache = LRUCache(maxsize=2)
+        expected_result = {
+            "hits": 1, "misses": 1, "evictions": 0, "size": 1, "maxsize": 2}
+
+        # When
+        cache.set("a", 1)
+        hit = cache.get("a")
+        miss = cache.get("b", "default")
+
+        # Then
+        self.assertEqual(hit, 1)
+        self.assertEqual(miss, "default")
+        self.assertEqual(cache.stats(), expected_result)
+
+    def test_eviction(self):
+        """ Test least recently used entry is evicted first. """
+        # Given
+        cache = LRUCache(maxsize=2)
+
+        # When
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        # Then
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_disabled(self):
+        """ Test nothing is stored when size is zero. """
+        # Given
+        cache = LRUCache(maxsize=0)
+
+        # When
+        cache.set("a", 1)
+
+        # Then
+        self.assertEqual(len(cache), 0)
+
+    def test_clear(self):
+        """ Test entries and counters are reset. """
+        # Given
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.get("a")
+
+        # When
+        cache.clear()
+
+        # Then
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hits, 0)
+
+    def test_threads(self):
+        """ Test size is respected with concurrent writers. """
+        # Given
+        cache = LRUCache(maxsize=50)
+
+        def worker(offset):
+            for index in range(500):
+                cache.set(offset + index, index)
+                cache.get(offset + index - 1)
+
+        threads = [
+            threading.Thread(target=worker, args=(offset * 1000,))
+            for offset in range(8)]
+
+        # When
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Then
+        self.assertEqual(len(cache), 50)
+        self.assertEqual(cache.evictions, 8 * 500 - 50)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    """ Tests all cases for units.cache rendered responses functions. """
+
+    def setUp(self):
+        overrides = override_settings(
+            UNITS_RESPONSE_CACHE="units", UNITS_RESPONSE_CACHE_TTL=60)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        caches["units"].clear()
+
+    def test_disabled(self):
+        """ Test nothing is stored when there is no cache alias. """
+        # Given
+        key = response_cache_key("1", "application/json", ["list"])
+
+        # When
+        with override_settings(UNITS_RESPONSE_CACHE=None):
+            cache = get_response_cache()
+            cache_response(key, b"[]", "application/json")
+            result = cached_response(key)
+
+        # Then
+        self.assertIsNone(cache)
+        self.assertIsNone(result)
+        self.assertIsNone(cached_response(key))
+
+    def test_store(self):
+        """ Test stored responses are returned. """
+        # Given
+        key = response_cache_key("1", "application/json", ["list"])
+
+        # When
+        cache_response(key, b"[]", "application/json")
+        result = cached_response(key)
+
+        # Then
+        self.assertEqual(result, (b"[]", "application/json"))
+
+    def test_key(self):
+        """ Test keys change with version, media type and parts. """
+        # Given
+        key = response_cache_key("1", "application/json", ["list", "q"])
+
+        # When
+        keys = {
+            response_cache_key("2", "application/json", ["list", "q"]),
+            response_cache_key("1", "text/html", ["list", "q"]),
+            response_cache_key("1", "application/json", ["list", "r"]),
+            }
+
+        # Then
+        self.assertNotIn(key, keys)
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(
+            key, response_cache_key("1", "application/json", ["list", "q"]))
+
+    def test_file_backend(self):
+        """ Test file based backend can be used. """
+        # Given
+        key = response_cache_key("1", "application/json", ["list"])
+        settings = {
+            "units_file": {
+                "BACKEND":
+                "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": "/tmp/papi_tests_units_cache",
+                },
+            }
+
+        # When
+        with override_settings(
+                CACHES=settings, UNITS_RESPONSE_CACHE="units_file"):
+            cache_response(key, b"[]", "application/json")
+            result = cached_response(key)
+            clear_response_cache()
+            cleared = cached_response(key)
+
+        # Then
+        self.assertEqual(result, (b"[]", "application/json"))
+        self.assertIsNone(cleared)
+
+    @patch("units.cache.invalidate_data_version")
+    def test_invalidate(self, invalidate_mock):
+        """ Test invalidation hook. """
+        # Given
+        key = response_cache_key("1", "application/json", ["list"])
+        cache_response(key, b"[]", "application/json")
+
+        # When
+        invalidate_unit_caches()
+
+        # Then
+        self.assertIsNone(cached_response(key))
+        invalidate_mock.assert_called_once_with()
+
+    @patch("units.cache.invalidate_data_version")
+    def test_invalidate_signal(self, invalidate_mock):
+        """ Test data version is not checked again on version change. """
+        # When
+        invalidate_unit_caches(sender=None, version="2")
+
+        # Then
+        invalidate_mock.assert_not_called()
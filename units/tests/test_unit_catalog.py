@@ -0,0 +1,205 @@
+""" Tests for units.catalog """
+import random
+import unittest
+from mock import patch
+
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+
+from units.catalog import (
+    clear_catalog,
+    get_catalog,
+    UnitCatalog,
+    )
+from units.models import LatestUnitVersionView
+from units.tests.fixtures import (
+    unit_rows,
+    UnitTableTestCase,
+    )
+from units.utils import (
+    compile_query,
+    OPERATORS_MAP,
+    SYNONYMS_MAP,
+    )
+from units.views import UNIT_FIELDS
+
+
+def make_catalog(rows, version=""):
+    """ Get catalog for list of row dicts. """
+    return UnitCatalog(
+        LatestUnitVersionView,
+        [[row[name] for name in UNIT_FIELDS] for row in rows],
+        version)
+
+
+class UnitCatalogTests(unittest.TestCase):
+    """ Tests all cases for units.catalog.UnitCatalog """
+
+    def setUp(self):
+        self.rows = [
+            dict(unit_rows(1)[0], id=1, name="Drone", gold=3, blocker=True,
+                 abilities="gain 1 gold"),
+            dict(unit_rows(1)[0], id=2, name="Doomed Drone", gold=5,
+                 blocker=False, abilities="Gain XXXX"),
+            dict(unit_rows(1)[0], id=3, name="Wall", gold=13, blocker=True,
+                 abilities=""),
+            ]
+        self.catalog = make_catalog(self.rows)
+
+    def test_lookups(self):
+        """ Test all supported lookups. """
+        # Given
+        data = {
+            "exact": ({"gold": 5}, {}, [1]),
+            "exact_text": ({"name": "Wall"}, {}, [2]),
+            "exact_text_case": ({"name": "wall"}, {}, []),
+            "exact_bool": ({"blocker": 1}, {}, [0, 2]),
+            "icontains": ({"name__icontains": "DRONE"}, {}, [0, 1]),
+            "icontains_number": ({"gold__icontains": "3"}, {}, [0, 2]),
+            "icontains_bool": ({"blocker__icontains": "1"}, {}, [0, 2]),
+            "gt": ({"gold__gt": 3}, {}, [1, 2]),
+            "gte": ({"gold__gte": 5}, {}, [1, 2]),
+            "lt": ({"gold__lt": 5}, {}, [0]),
+            "lte": ({"gold__lte": 5}, {}, [0, 1]),
+            "gt_text": ({"name__gt": "E"}, {}, [2]),
+            "pk": ({"pk": 2}, {}, [1]),
+            "multiple": ({"gold__gt": 3, "blocker": 1}, {}, [2]),
+            "exclude": ({}, {"abilities__icontains": "gain"}, [2]),
+            "exclude_multiple": (
+                {}, {"gold__gt": 3, "blocker": 1}, [0, 1]),
+            "both": (
+                {"name__icontains": "drone"}, {"gold": 3}, [1]),
+            "none": ({}, {}, [0, 1, 2]),
+            }
+
+        # When/Then
+        for name, (includes, excludes, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    self.catalog.filter(includes, excludes),
+                    expected_result)
+
+    def test_null(self):
+        """ Test NULL values never match (including excludes). """
+        # Given
+        self.rows[0]["abilities"] = None
+        catalog = make_catalog(self.rows)
+
+        # When
+        included = catalog.filter({"abilities__icontains": "gain"}, {})
+        excluded = catalog.filter({}, {"abilities__icontains": "gain"})
+
+        # Then
+        self.assertEqual(included, [1])
+        self.assertEqual(excluded, [2])
+
+    def test_invalid_value(self):
+        """ Test same errors as the ORM for values of the wrong type. """
+        # When/Then
+        with self.assertRaises(ValueError):
+            self.catalog.filter({"gold__gt": "abc"}, {})
+
+    def test_instances(self):
+        """ Test model instances are built (once) from columns. """
+        # When
+        result = self.catalog.instances({"gold": 5}, {})
+
+        # Then
+        self.assertEqual(len(result), 1)
+        self.assertIsInstance(result[0], LatestUnitVersionView)
+        self.assertEqual(result[0].pk, 2)
+        self.assertEqual(result[0].name, "Doomed Drone")
+        self.assertIs(self.catalog.instances({"gold": 5}, {})[0], result[0])
+
+
+class GetCatalogTests(unittest.TestCase):
+    """ Tests all cases for units.catalog.get_catalog """
+
+    def setUp(self):
+        clear_catalog()
+        self.addCleanup(clear_catalog)
+
+    @patch("units.catalog.UnitCatalog.load")
+    @patch("units.catalog.get_data_version")
+    def test_reload(self, version_mock, load_mock):
+        """ Test catalog is only loaded again when data version changes. """
+        # Given
+        version_mock.return_value.token = "1"
+        load_mock.side_effect = lambda queryset, version: make_catalog(
+            [], version)
+
+        # When
+        first = get_catalog()
+        second = get_catalog()
+        version_mock.return_value.token = "2"
+        third = get_catalog()
+
+        # Then
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(third.version, "2")
+        self.assertEqual(load_mock.call_count, 2)
+
+
+class UnitCatalogDatabaseTests(UnitTableTestCase):
+    """ Tests units.catalog.UnitCatalog against the ORM. """
+
+    def test_load(self):
+        """ Test all rows are loaded. """
+        # When
+        # pylint: disable=no-member
+        catalog = UnitCatalog.load(LatestUnitVersionView.objects.all())
+
+        # Then
+        self.assertEqual(len(catalog), len(self.rows))
+        self.assertEqual(catalog.instance(0).name, self.rows[0]["name"])
+
+    def test_same_as_orm(self):
+        """ Test generated queries give the same results as the ORM. """
+        self.assert_same_as_orm(UnitCatalog.load(
+            LatestUnitVersionView.objects.all()))  # pylint: disable=no-member
+
+    @override_settings(UNITS_BITSET_MAX_VALUES=0)
+    def test_same_as_orm_without_bitsets(self):
+        """ Test same results when columns are scanned. """
+        self.assert_same_as_orm(UnitCatalog.load(
+            LatestUnitVersionView.objects.all()))  # pylint: disable=no-member
+
+    def assert_same_as_orm(self, catalog):
+        """ Check generated queries give the same results as the ORM. """
+        # Given
+        # pylint: disable=no-member
+        queryset = LatestUnitVersionView.objects.all()
+        rand = random.Random(3)
+        fields = list(SYNONYMS_MAP) + ["unit_spell", "id"]
+        values = [
+            "0", "1", "2", "3", "5", "10", "drone", "DRONE", "Wall", "gain",
+            "gain XXXX", "front", "Unit", "e",
+            ]
+
+        def query():
+            return ",".join(
+                rand.choice(fields) + rand.choice(list(OPERATORS_MAP))
+                + rand.choice(values)
+                for _ in range(rand.randint(1, 3)))
+
+        queries = [query() for _ in range(300)]
+
+        # When/Then
+        for raw_query in queries:
+            plan = compile_query(raw_query, allowed=UNIT_FIELDS)
+            with self.subTest(raw_query):
+                try:
+                    expected_result = list(
+                        queryset.filter(**plan.includes)
+                        .exclude(**plan.excludes)
+                        .values_list("id", flat=True))
+                except (ValueError, ValidationError) as error:
+                    # Invalid value for the field type
+                    with self.assertRaises(type(error)):
+                        catalog.filter(plan.includes, plan.excludes)
+                    continue
+                result = [
+                    obj.pk
+                    for obj in catalog.instances(plan.includes, plan.excludes)]
+                self.assertEqual(result, expected_result)
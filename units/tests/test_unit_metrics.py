@@ -0,0 +1,302 @@
+""" Tests for units.metrics """
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from units.metrics import (
+    get_registry,
+    inc,
+    Metric,
+    metrics_view,
+    Registry,
+    )
+from units.tests.fixtures import UnitTableTestCase
+from units.views import LatestUnitVersionViewSet
+
+
+def value(name, labels=()):
+    """ Get current value of a metric in the process registry. """
+    return get_registry().metrics[name].values.get(labels, 0)
+
+
+class RegistryTests(unittest.TestCase):
+    """ Tests all cases for units.metrics.Registry """
+
+    def test_exposition(self):
+        """ Test text format of counters and histograms. """
+        # Given
+        registry = Registry()
+        counter = registry.counter(
+            "requests_total", "Requests.", ("route", "status"))
+        histogram = registry.histogram(
+            "latency_seconds", "Latency.", buckets=(0.1, 1))
+        registry.counter("unused_total", "Unused.")
+
+        # When
+        counter.inc(labels=("list", "200"))
+        counter.inc(2, labels=("list", "200"))
+        counter.inc(labels=('a"b\\c', "404"))
+        for seconds in (0.05, 0.1, 0.5, 3):
+            histogram.observe(seconds)
+        result = registry.exposition()
+
+        # Then
+        self.assertEqual(result, "\n".join([
+            "# HELP latency_seconds Latency.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 3.65",
+            "latency_seconds_count 4",
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{route="a\\"b\\\\c",status="404"} 1',
+            'requests_total{route="list",status="200"} 3',
+            "# HELP unused_total Unused.",
+            "# TYPE unused_total counter",
+            "",
+            ]))
+
+    def test_reset(self):
+        """ Test values are dropped, metrics kept. """
+        # Given
+        registry = Registry()
+        registry.counter("requests_total", "Requests.").inc()
+        registry.histogram("latency_seconds", "Latency.").observe(1)
+
+        # When
+        registry.reset()
+
+        # Then
+        self.assertEqual(
+            registry.snapshot(), {"requests_total": [], "latency_seconds": []})
+
+    def test_same_metric(self):
+        """ Test metrics are created once. """
+        # Given
+        registry = Registry()
+
+        # When/Then
+        self.assertIs(
+            registry.counter("a_total", "A."),
+            registry.counter("a_total", "Other."))
+
+    def test_multiprocess(self):
+        """ Test values of every process are added up. """
+        # Given
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registries = []
+        for pid in (1, 2):
+            with patch("units.metrics.os.getpid", return_value=pid):
+                registry = Registry(directory, flush_interval=0)
+                registry.counter("a_total", "A.", ("x",)).inc(
+                    pid, labels=("y",))
+                registry.histogram(
+                    "b_seconds", "B.", buckets=(1,)).observe(pid)
+                registries.append(registry)
+        with open(
+                os.path.join(directory, "other.txt"), "w",
+                encoding="utf-8") as handle:
+            handle.write("not metrics")
+
+        # When
+        with patch("units.metrics.os.getpid", return_value=1), \
+                patch("units.metrics._pid_alive", return_value=True):
+            registries[0].counter("a_total", "A.", ("x",)).inc(
+                10, labels=("y",))  # Not flushed yet, read live
+            result = registries[0].exposition()
+
+        # Then
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            ["metrics_1.json", "metrics_2.json", "other.txt"])
+        self.assertIn('a_total{x="y"} 13\n', result)
+        self.assertIn('b_seconds_bucket{le="1"} 1\n', result)
+        self.assertIn("b_seconds_count 2\n", result)
+        self.assertIn("b_seconds_sum 3\n", result)
+
+    def test_dead_process(self):
+        """ Test totals are kept when processes exit (files archived). """
+        # Given
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registries = []
+        for pid in (1, 2, 3):
+            with patch("units.metrics.os.getpid", return_value=pid):
+                registry = Registry(directory, flush_interval=0)
+                registry.counter("a_total", "A.").inc(pid)
+                registry.histogram(
+                    "b_seconds", "B.", buckets=(1,)).observe(pid)
+                registries.append(registry)
+        alive = {1, 2, 3}
+
+        def exposition():
+            with patch("units.metrics.os.getpid", return_value=1), patch(
+                    "units.metrics._pid_alive",
+                    side_effect=alive.__contains__):
+                return registries[0].exposition()
+
+        # When
+        before = exposition()
+        alive.discard(2)
+        after = exposition()
+        alive.discard(3)
+        again = exposition()
+        last = exposition()
+
+        # Then
+        self.assertIn("a_total 6\n", before)
+        self.assertIn("b_seconds_count 3\n", before)
+        self.assertEqual(after, before)
+        self.assertEqual(again, before)
+        self.assertEqual(last, before)
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            ["metrics_1.json", "metrics_archive.json", "metrics_archive.lock"])
+
+    @patch("units.metrics.fcntl", None)
+    def test_dead_process_no_fcntl(self):
+        """ Test files of exited processes are kept without fcntl. """
+        # Given
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registries = []
+        for pid in (1, 2):
+            with patch("units.metrics.os.getpid", return_value=pid):
+                registry = Registry(directory, flush_interval=0)
+                registry.counter("a_total", "A.").inc(pid)
+                registries.append(registry)
+
+        # When
+        with patch("units.metrics.os.getpid", return_value=1), \
+                patch("units.metrics._pid_alive", return_value=False):
+            result = registries[0].exposition()
+
+        # Then
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            ["metrics_1.json", "metrics_2.json"])
+        self.assertIn("a_total 3\n", result)
+
+    def test_abstract_metric(self):
+        """ Test metrics must implement samples and merge. """
+        # When/Then
+        # pylint: disable=abstract-class-instantiated
+        with self.assertRaises(TypeError):
+            Metric(Registry(), "a_total", "A.")
+
+
+class IncTests(unittest.TestCase):
+    """ Tests all cases for units.metrics.inc """
+
+    def test_cases(self):
+        """ Test counting only when enabled. """
+        # Given
+        before = value("units_ignored_filters_total")
+
+        # When
+        inc("units_ignored_filters_total", 2)
+        with override_settings(PAPI_METRICS_ENABLED=False):
+            inc("units_ignored_filters_total", 5)
+
+        # Then
+        self.assertEqual(value("units_ignored_filters_total"), before + 2)
+
+
+class MetricsViewTests(unittest.TestCase):
+    """ Tests all cases for units.metrics.metrics_view """
+
+    def test_view(self):
+        """ Test text format response. """
+        # When
+        response = metrics_view(APIRequestFactory().get("/metrics"))
+
+        # Then
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            b"# TYPE papi_request_duration_seconds histogram",
+            response.content)
+
+    def test_allowed_networks(self):
+        """ Test only clients in PAPI_METRICS_ALLOWED_NETWORKS get metrics. """
+        # Given
+        factory = APIRequestFactory()
+        data = [
+            (["127.0.0.0/8", "::1"], "127.0.0.1", 200),
+            (["127.0.0.0/8", "::1"], "::1", 200),
+            (["127.0.0.0/8", "::1"], "10.0.0.1", 403),
+            (["10.0.0.0/8"], "10.1.2.3", 200),
+            (["10.0.0.1"], "10.0.0.2", 403),
+            (["127.0.0.0/8"], "", 403),
+            (None, "10.0.0.1", 200),
+            ]
+
+        # When/Then
+        for networks, address, expected_result in data:
+            with self.subTest(f"{networks}_{address}"), override_settings(
+                    PAPI_METRICS_ALLOWED_NETWORKS=networks):
+                response = metrics_view(
+                    factory.get("/metrics", REMOTE_ADDR=address))
+                self.assertEqual(response.status_code, expected_result)
+
+
+class UnitMetricsTests(UnitTableTestCase):
+    """ Tests metrics of units.views.LatestUnitVersionViewSet requests. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+        overrides = override_settings(UNITS_CONDITIONAL_GET=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_filters(self):
+        """ Test invalid and ignored filters are counted. """
+        # Given
+        data = {
+            "valid": ("g=1,au>2", 0, 0),
+            "invalid": ("g=1,drone", 1, 0),
+            "ignored": ("g=1,bad=1,worse=2", 0, 2),
+            }
+
+        # When/Then
+        for name, (query, failures, ignored) in data.items():
+            with self.subTest(name):
+                before = (
+                    value("units_query_parse_failures_total"),
+                    value("units_ignored_filters_total"))
+                with override_settings(UNITS_RESPONSE_CACHE=None):
+                    self.view(self.factory.get(self.url, {"q": query}))
+                self.assertEqual(
+                    (
+                        value("units_query_parse_failures_total"),
+                        value("units_ignored_filters_total")),
+                    (before[0] + failures, before[1] + ignored))
+
+    def test_response_cache(self):
+        """ Test response cache hits and misses are counted. """
+        # Given
+        before = (
+            value("units_response_cache_total", ("hit",)),
+            value("units_response_cache_total", ("miss",)))
+        params = {"q": "g>=1", "fields": "name,au,b"}
+
+        # When
+        for _ in range(3):
+            self.view(self.factory.get(self.url, params))
+
+        # Then
+        self.assertEqual(
+            (
+                value("units_response_cache_total", ("hit",)),
+                value("units_response_cache_total", ("miss",))),
+            (before[0] + 2, before[1] + 1))
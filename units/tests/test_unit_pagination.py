@@ -0,0 +1,265 @@
+""" Tests for units.pagination """
+import unittest
+from urllib.parse import (
+    parse_qs,
+    urlparse,
+    )
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from units.catalog import clear_catalog
+from units.models import LatestUnitVersionView
+from units.pagination import (
+    InstanceList,
+    UnitCursorPagination,
+    )
+from units.tests.fixtures import (
+    unit_rows,
+    UnitTableTestCase,
+    )
+from units.versions import invalidate_data_version
+from units.views import LatestUnitVersionViewSet
+
+
+class InstanceListTests(unittest.TestCase):
+    """ Tests all cases for units.pagination.InstanceList """
+
+    def setUp(self):
+        self.items = InstanceList(LatestUnitVersionView, [
+            LatestUnitVersionView(id=1, name="Wall"),
+            LatestUnitVersionView(id=2, name="Drone"),
+            LatestUnitVersionView(id=3, name="Wall"),
+            LatestUnitVersionView(id=4, name=None),
+            ])
+
+    def test_order_by(self):
+        """ Test ordering by one or more fields. """
+        # Given
+        data = {
+            "id": (("id",), [1, 2, 3, 4]),
+            "id_desc": (("-id",), [4, 3, 2, 1]),
+            "name_id": (("name", "id"), [4, 2, 1, 3]),
+            "name_id_desc": (("-name", "-id"), [3, 1, 2, 4]),
+            }
+
+        # When/Then
+        for name, (ordering, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    [obj.id for obj in self.items.order_by(*ordering)],
+                    expected_result)
+
+    def test_filter(self):
+        """ Test comparison lookups, NULLs never match. """
+        # Given
+        data = {
+            "gt": ("id__gt", "2", [3, 4]),
+            "lt": ("id__lt", 2, [1]),
+            "text": ("name__gt", "Drone", [1, 3]),
+            }
+
+        # When/Then
+        for name, (lookup, value, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    [obj.id for obj in self.items.filter(**{lookup: value})],
+                    expected_result)
+
+
+class UnitCursorPaginationTests(unittest.TestCase):
+    """ Tests all cases for units.pagination.UnitCursorPagination """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.paginator = UnitCursorPagination()
+
+    def test_requested(self):
+        """ Test pagination is only used when asked for. """
+        # Given
+        data = {
+            "cursor": ({"cursor": "abc"}, True),
+            "page_size": ({"page_size": "10"}, True),
+            "ordering": ({"ordering": "name"}, False),
+            "none": ({}, False),
+            }
+
+        # When/Then
+        for name, (params, expected_result) in data.items():
+            with self.subTest(name):
+                request = Request(self.factory.get("/api/", params))
+                self.assertEqual(
+                    self.paginator.requested(request), expected_result)
+
+    def test_ordering(self):
+        """ Test ordering parameter, by id when not valid. """
+        # Given
+        data = {
+            "name": ("name", ("name", "id")),
+            "name_desc": ("-name", ("-name", "-id")),
+            "invalid": ("gold", ("id",)),
+            }
+
+        # When/Then
+        for name, (ordering, expected_result) in data.items():
+            with self.subTest(name):
+                request = Request(
+                    self.factory.get("/api/", {"ordering": ordering}))
+                self.assertEqual(
+                    self.paginator.get_ordering(request, None, None),
+                    expected_result)
+
+    @override_settings(UNITS_PAGE_SIZE=7, UNITS_MAX_PAGE_SIZE=20)
+    def test_page_size(self):
+        """ Test page size from settings and parameter. """
+        # Given
+        data = {
+            "default": ({}, 7),
+            "param": ({"page_size": "5"}, 5),
+            "max": ({"page_size": "20"}, 20),
+            }
+
+        # When/Then
+        for name, (params, expected_result) in data.items():
+            with self.subTest(name):
+                request = Request(self.factory.get("/api/", params))
+                self.assertEqual(
+                    self.paginator.get_page_size(request), expected_result)
+
+    @override_settings(UNITS_MAX_PAGE_SIZE=20)
+    def test_page_size_invalid(self):
+        """ Test invalid or out of range page size is rejected. """
+        # Given
+        data = ("abc", "", "0", "-5", "21", "1.5")
+
+        # When/Then
+        for value in data:
+            with self.subTest(value):
+                request = Request(
+                    self.factory.get("/api/", {"page_size": value}))
+                with self.assertRaises(ValidationError) as context:
+                    self.paginator.get_page_size(request)
+                self.assertIn("page_size", context.exception.detail)
+
+
+@override_settings(UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False)
+class UnitCursorPaginationDatabaseTests(UnitTableTestCase):
+    """ Tests paginated units.views.LatestUnitVersionViewSet lists. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+
+    def pages(self, params):
+        """ Get ids of every page, following next links. """
+        result = []
+        params = dict(params, format="json")
+        while True:
+            data = self.view(self.factory.get(self.url, params)).data
+            result.append([row["url"] for row in data["results"]])
+            if not data["next"]:
+                return result
+            params = {
+                key: values[0] for key, values
+                in parse_qs(urlparse(data["next"]).query).items()}
+
+    def test_pages(self):
+        """ Test pages cover all rows once, in order, for both backends. """
+        # Given
+        rows = unit_rows()
+        data = {
+            "id": ({}, sorted(rows, key=lambda row: row["id"])),
+            "name": (
+                {"ordering": "name"},
+                sorted(rows, key=lambda row: (row["name"], row["id"]))),
+            "name_desc": (
+                {"ordering": "-name"},
+                sorted(
+                    rows, key=lambda row: (row["name"], row["id"]),
+                    reverse=True)),
+            }
+
+        # When/Then
+        for backend in ("orm", "catalog"):
+            for name, (params, expected_rows) in data.items():
+                with self.subTest(f"{backend}_{name}"), override_settings(
+                        UNITS_BACKEND=backend):
+                    clear_catalog()
+                    pages = self.pages(dict(params, page_size=10))
+                    self.assertEqual(
+                        [len(page) for page in pages], [10, 10, 10, 10, 8])
+                    self.assertEqual(
+                        [url.rsplit("/", 2)[-2] for page in pages
+                         for url in page],
+                        [str(row["id"]) for row in expected_rows])
+        clear_catalog()
+
+    def test_duplicate_names(self):
+        """ Test pages over rows with the same name (skipped by offset). """
+        # Given
+        # pylint: disable=no-member
+        LatestUnitVersionView.objects.filter(id__gt=10).update(name="Drone")
+        invalidate_data_version()
+        rows = [
+            dict(row, name="Drone") if row["id"] > 10 else row
+            for row in self.rows]
+        data = {
+            "name": (
+                {"ordering": "name"},
+                sorted(rows, key=lambda row: (row["name"], row["id"]))),
+            "name_desc": (
+                {"ordering": "-name"},
+                sorted(
+                    rows, key=lambda row: (row["name"], row["id"]),
+                    reverse=True)),
+            }
+
+        # When/Then
+        for backend in ("orm", "catalog"):
+            for name, (params, expected_rows) in data.items():
+                with self.subTest(f"{backend}_{name}"), override_settings(
+                        UNITS_BACKEND=backend):
+                    clear_catalog()
+                    pages = self.pages(dict(params, page_size=7))
+                    self.assertEqual(
+                        [url.rsplit("/", 2)[-2] for page in pages
+                         for url in page],
+                        [str(row["id"]) for row in expected_rows])
+        clear_catalog()
+
+    def test_page_size_invalid(self):
+        """ Test 400 for invalid page size. """
+        # When
+        response = self.view(self.factory.get(
+            self.url, {"page_size": "abc", "format": "json"}))
+
+        # Then
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("page_size", response.data)
+
+    def test_fields(self):
+        """ Test pagination keys are loaded along requested fields. """
+        # Given
+        invalidate_data_version()
+
+        # When
+        with self.assertNumQueries(1):
+            data = self.view(self.factory.get(
+                self.url,
+                {"page_size": 5, "ordering": "name", "fields": "gold"})).data
+
+        # Then
+        self.assertEqual(list(data["results"][0]), ["gold"])
+        self.assertIsNotNone(data["next"])
+
+    def test_not_paginated(self):
+        """ Test full list without pagination parameters. """
+        # When
+        data = self.view(self.factory.get(self.url)).data
+
+        # Then
+        self.assertEqual(len(data), len(self.rows))
@@ -0,0 +1,190 @@
+""" Tests for units.renderers """
+import unittest
+from mock import patch
+
+from rest_framework.renderers import JSONRenderer
+
+from units.renderers import (
+    batches,
+    binary_renderers,
+    ColumnarMessagePackRenderer,
+    MessagePackRenderer,
+    msgpack,
+    NDJSONRenderer,
+    stream_json,
+    to_columns,
+    )
+
+
+DATA = [
+    {"name": "Drone", "gold": 3, "frontline": False},
+    {"name": "Line\u2028separator \xe9", "gold": None},
+    {"name": "Wall", "abilities": ""},
+    ]
+
+
+class StreamJSONTests(unittest.TestCase):
+    """ Tests all cases for units.renderers.stream_json """
+
+    def test_same_as_renderer(self):
+        """ Test joined chunks are identical to JSONRenderer output. """
+        # Given
+        renderer = JSONRenderer()
+        data = {
+            "empty": ([], 2),
+            "one": (DATA[:1], 2),
+            "exact_batches": (DATA[:2], 1),
+            "partial_batch": (DATA, 2),
+            }
+
+        # When/Then
+        for name, (items, batch_size) in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    b"".join(stream_json(renderer, iter(items), batch_size)),
+                    renderer.render(items))
+
+    def test_not_compact(self):
+        """ Test long separators. """
+        # Given
+        renderer = JSONRenderer()
+        renderer.compact = False
+
+        # When
+        result = b"".join(stream_json(renderer, DATA, 2))
+
+        # Then
+        self.assertEqual(result, renderer.render(DATA))
+
+    def test_chunks(self):
+        """ Test one chunk per batch. """
+        # When
+        result = list(stream_json(JSONRenderer(), DATA, 2))
+
+        # Then
+        self.assertEqual(len(result), 3)
+
+
+class NDJSONRendererTests(unittest.TestCase):
+    """ Tests all cases for units.renderers.NDJSONRenderer """
+
+    def test_render(self):
+        """ Test one line per item. """
+        # Given
+        renderer = NDJSONRenderer()
+        expected_result = b"".join(
+            JSONRenderer().render(item) + b"\n" for item in DATA)
+
+        # When
+        result = renderer.render(DATA)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.assertEqual(result.count(b"\n"), len(DATA))
+
+    def test_render_single(self):
+        """ Test objects (ie: details or errors) are a single line. """
+        # When
+        result = NDJSONRenderer().render({"detail": "Not found."})
+
+        # Then
+        self.assertEqual(result, b'{"detail":"Not found."}\n')
+
+    def test_render_none(self):
+        """ Test empty output. """
+        # When
+        result = NDJSONRenderer().render(None)
+
+        # Then
+        self.assertEqual(result, b"")
+
+    def test_stream(self):
+        """ Test chunks. """
+        # When
+        result = list(NDJSONRenderer().stream(iter(DATA), 2))
+
+        # Then
+        self.assertEqual(len(result), 2)
+        self.assertEqual(b"".join(result), NDJSONRenderer().render(DATA))
+
+
+class BatchesTests(unittest.TestCase):
+    """ Tests all cases for units.renderers.batches """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # When/Then
+        self.assertEqual(list(batches([], 2)), [])
+        self.assertEqual(list(batches(range(4), 2)), [[0, 1], [2, 3]])
+        self.assertEqual(list(batches(range(3), 2)), [[0, 1], [2]])
+
+
+class ToColumnsTests(unittest.TestCase):
+    """ Tests all cases for units.renderers.to_columns """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        rows = [{"name": "Drone", "gold": 3}, {"name": "Wall", "gold": None}]
+        columns = {"name": ["Drone", "Wall"], "gold": [3, None]}
+        data = {
+            "list": (rows, columns),
+            "empty": ([], []),
+            "paginated": (
+                {"next": None, "results": rows},
+                {"next": None, "results": columns}),
+            "batch": ({"results": [rows, []]}, {"results": [columns, []]}),
+            "values": ([1, 2], [1, 2]),
+            "object": (rows[0], rows[0]),
+            }
+
+        # When/Then
+        for name, (value, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(to_columns(value), expected_result)
+
+
+@unittest.skipUnless(msgpack, "msgpack not installed")
+class MessagePackRendererTests(unittest.TestCase):
+    """ Tests all cases for units.renderers.MessagePackRenderer """
+
+    def test_render(self):
+        """ Test data round trips. """
+        # When
+        result = MessagePackRenderer().render(DATA)
+
+        # Then
+        self.assertEqual(msgpack.unpackb(result), DATA)
+
+    def test_render_columns(self):
+        """ Test lists are rendered as columns. """
+        # When
+        result = ColumnarMessagePackRenderer().render(DATA[:1])
+
+        # Then
+        self.assertEqual(
+            msgpack.unpackb(result),
+            {"name": ["Drone"], "gold": [3], "frontline": [False]})
+
+    def test_render_none(self):
+        """ Test empty output. """
+        # When/Then
+        self.assertEqual(MessagePackRenderer().render(None), b"")
+
+
+class BinaryRenderersTests(unittest.TestCase):
+    """ Tests all cases for units.renderers.binary_renderers """
+
+    @unittest.skipUnless(msgpack, "msgpack not installed")
+    def test_installed(self):
+        """ Test MessagePack renderers with msgpack. """
+        # When/Then
+        self.assertEqual(
+            binary_renderers(),
+            [MessagePackRenderer, ColumnarMessagePackRenderer])
+
+    @patch("units.renderers.msgpack", None)
+    def test_not_installed(self):
+        """ Test no binary renderers without msgpack. """
+        # When/Then
+        self.assertEqual(binary_renderers(), [])
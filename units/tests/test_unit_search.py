@@ -0,0 +1,184 @@
+""" Tests for units.search """
+import random
+import unittest
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from units.models import (
+    LatestUnitVersionSnapshot,
+    LatestUnitVersionView,
+    )
+from units.search import (
+    FTS_TABLE,
+    has_text_index,
+    searchable,
+    text_search_q,
+    TrigramIndex,
+    trigrams,
+    )
+from units.snapshot import refresh_snapshot
+from units.tests.fixtures import UnitTableTestCase
+from units.utils import compile_query
+from units.versions import invalidate_data_version
+from units.views import (
+    LatestUnitVersionViewSet,
+    UNIT_FIELDS,
+    )
+
+
+class TrigramsTests(unittest.TestCase):
+    """ Tests all cases for units.search.trigrams """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "word": ("gain", {"gai", "ain"}),
+            "spaces": ("a bc", {"a b", " bc"}),
+            "short": ("ab", set()),
+            "empty": ("", set()),
+            }
+
+        # When/Then
+        for name, (text, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(trigrams(text), expected_result)
+
+
+class SearchableTests(unittest.TestCase):
+    """ Tests all cases for units.search.searchable """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "abilities": ("abilities__icontains", "gain", "abilities"),
+            "name": ("name__icontains", "dro", "name"),
+            "short": ("name__icontains", "dr", None),
+            "not_indexed": ("position__icontains", "front", None),
+            "not_icontains": ("name__gt", "drone", None),
+            "exact": ("gold", 5, None),
+            }
+
+        # When/Then
+        for name, (lookup, value, expected_result) in data.items():
+            with self.subTest(name):
+                self.assertEqual(searchable(lookup, value), expected_result)
+
+
+class TrigramIndexTests(unittest.TestCase):
+    """ Tests all cases for units.search.TrigramIndex """
+
+    def test_same_as_scan(self):
+        """ Test results match a substring scan. """
+        # Given
+        rand = random.Random(4)
+        texts = [
+            None if rand.random() < 0.05 else "".join(
+                rand.choice("abc x") for _ in range(rand.randint(0, 12)))
+            for _ in range(300)]
+        index = TrigramIndex(texts)
+        needles = {
+            "".join(rand.choice("abc x") for _ in range(rand.randint(3, 5)))
+            for _ in range(200)}
+
+        # When/Then
+        for needle in needles:
+            with self.subTest(needle):
+                self.assertEqual(
+                    index.search(needle),
+                    {
+                        position for position, text in enumerate(texts)
+                        if text is not None and needle in text})
+        self.assertEqual(
+            index.nulls,
+            [position for position, text in enumerate(texts) if text is None])
+
+
+class TextSearchDatabaseTests(UnitTableTestCase):
+    """ Tests units.search FTS5 index against plain lookups. """
+
+    def setUp(self):
+        refresh_snapshot()
+
+    def test_has_text_index(self):
+        """ Test only the snapshot table is indexed. """
+        # When/Then
+        self.assertTrue(has_text_index(LatestUnitVersionSnapshot))
+        self.assertFalse(has_text_index(LatestUnitVersionView))
+
+    def test_routed(self):
+        """ Test long enough text lookups go through the index. """
+        # Given
+        # pylint: disable=no-member
+        queryset = LatestUnitVersionSnapshot.objects.all()
+
+        # When
+        indexed = str(queryset.filter(text_search_q(
+            {"abilities__icontains": "gain", "gold": 3})).query)
+        scanned = str(queryset.filter(text_search_q(
+            {"abilities__icontains": "ga", "gold": 3})).query)
+
+        # Then
+        self.assertIn(FTS_TABLE, indexed)
+        self.assertNotIn(FTS_TABLE, scanned)
+
+    def test_same_as_scan(self):
+        """ Test generated queries give the same results with the index. """
+        # Given
+        # pylint: disable=no-member
+        queryset = LatestUnitVersionSnapshot.objects.order_by("id")
+        rand = random.Random(5)
+        fields = ["n", "a", "unit_spell", "pos", "au"]
+        operators = ["=", ":", "!=", "<>"]
+        values = [
+            "drone", "DRONE", "Wall", "gain", "gain XXXX", "Unit", "pel", "e",
+            "gain X per", "energy", "dro ne", "XX",
+            ]
+
+        def query():
+            return ",".join(
+                rand.choice(fields) + rand.choice(operators)
+                + rand.choice(values)
+                for _ in range(rand.randint(1, 3)))
+
+        queries = [query() for _ in range(200)]
+
+        # When/Then
+        for raw_query in queries:
+            plan = compile_query(raw_query, allowed=UNIT_FIELDS)
+            with self.subTest(raw_query):
+                expected_result = list(
+                    queryset.filter(**plan.includes).exclude(**plan.excludes)
+                    .values_list("id", flat=True))
+                result = queryset.filter(text_search_q(plan.includes))
+                if plan.excludes:
+                    result = result.exclude(text_search_q(plan.excludes))
+                self.assertEqual(
+                    list(result.values_list("id", flat=True)),
+                    expected_result)
+
+    @override_settings(
+        UNITS_SOURCE="snapshot", UNITS_RESPONSE_CACHE=None,
+        UNITS_CONDITIONAL_GET=False)
+    def test_view(self):
+        """ Test view filters snapshot through the index. """
+        # Given
+        invalidate_data_version()
+        view = LatestUnitVersionViewSet.as_view({"get": "list"})
+        request = APIRequestFactory().get(
+            reverse("latestunitversionview-list"), {"q": "a=gain XXXX"})
+        expected_result = sorted(
+            row["id"] for row in self.rows
+            if "gain xxxx" in row["abilities"].lower())
+
+        # When
+        data = view(request).data
+
+        # Then
+        self.assertEqual(
+            sorted(int(row["url"].rsplit("/", 2)[-2]) for row in data),
+            expected_result)
+        invalidate_data_version()
@@ -0,0 +1,157 @@
+""" Tests for units.serializers """
+import unittest
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from units.models import LatestUnitVersionView
+from units.serializers import (
+    LatestUnitVersionViewFastSerializer,
+    LatestUnitVersionViewSerializer,
+    )
+from units.tests.fixtures import (
+    unit_rows,
+    UnitTableTestCase,
+    )
+
+
+def render(serializer_class, instance, many=True, fields=None, **context):
+    """ Get JSON bytes for instance. """
+    serializer = serializer_class(
+        instance, many=many, context=context, fields=fields)
+    return JSONRenderer().render(serializer.data)
+
+
+class LatestUnitVersionViewFastSerializerTests(unittest.TestCase):
+    """
+    Tests units.serializers.LatestUnitVersionViewFastSerializer output
+    against units.serializers.LatestUnitVersionViewSerializer.
+
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.objects = [LatestUnitVersionView(**row) for row in unit_rows()]
+
+    def test_same_output(self):
+        """ Test output is byte identical to the DRF serializer. """
+        # Given
+        data = {
+            "plain": ({}, None),
+            "format_param": ({"format": "json"}, None),
+            "format_suffix": ({}, "json"),
+            }
+
+        # When/Then
+        for name, (params, format_kwarg) in data.items():
+            with self.subTest(name):
+                request = Request(self.factory.get("/api/", params))
+                context = {"request": request, "format": format_kwarg}
+                self.assertEqual(
+                    render(
+                        LatestUnitVersionViewFastSerializer, self.objects,
+                        **context),
+                    render(
+                        LatestUnitVersionViewSerializer, self.objects,
+                        **context))
+
+    def test_single(self):
+        """ Test single object output. """
+        # Given
+        request = Request(self.factory.get("/api/"))
+
+        # When
+        result = render(
+            LatestUnitVersionViewFastSerializer, self.objects[0],
+            many=False, request=request)
+
+        # Then
+        self.assertEqual(
+            result,
+            render(
+                LatestUnitVersionViewSerializer, self.objects[0],
+                many=False, request=request))
+
+    def test_fields(self):
+        """ Test output restricted to fields is byte identical. """
+        # Given
+        data = {
+            "with_url": ["gold", "url", "name"],
+            "without_url": ["name", "gold"],
+            "url_only": ["url"],
+            }
+        request = Request(self.factory.get("/api/"))
+
+        # When/Then
+        for name, fields in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    render(
+                        LatestUnitVersionViewFastSerializer, self.objects,
+                        fields=fields, request=request),
+                    render(
+                        LatestUnitVersionViewSerializer, self.objects,
+                        fields=fields, request=request))
+
+    def test_unsaved(self):
+        """ Test objects without primary key have no URL. """
+        # Given
+        obj = LatestUnitVersionView(name="Drone")
+
+        # When
+        result = LatestUnitVersionViewFastSerializer(obj).data
+
+        # Then
+        self.assertIsNone(result["url"])
+        self.assertEqual(result["name"], "Drone")
+
+    def test_keys(self):
+        """ Test keys and order. """
+        # When
+        result = LatestUnitVersionViewFastSerializer(self.objects[0]).data
+
+        # Then
+        self.assertEqual(
+            list(result),
+            list(LatestUnitVersionViewSerializer().fields))
+
+
+class LatestUnitVersionViewFastSerializerDatabaseTests(UnitTableTestCase):
+    """
+    Tests units.serializers.LatestUnitVersionViewFastSerializer with
+    querysets.
+
+    """
+
+    def test_queryset(self):
+        """ Test values_list output is byte identical. """
+        # Given
+        request = Request(APIRequestFactory().get("/api/"))
+        # pylint: disable=no-member
+        queryset = LatestUnitVersionView.objects.filter(gold__gt=3)
+
+        # When
+        result = render(
+            LatestUnitVersionViewFastSerializer, queryset, request=request)
+
+        # Then
+        self.assertEqual(
+            result,
+            render(
+                LatestUnitVersionViewSerializer, queryset, request=request))
+        self.assertGreater(len(result), 1000)
+
+    def test_queryset_iterator(self):
+        """ Test rows read with a cursor are the same. """
+        # Given
+        # pylint: disable=no-member
+        serializer = LatestUnitVersionViewFastSerializer(
+            LatestUnitVersionView.objects.all(), many=True)
+
+        # When
+        result = serializer.rows(chunk_size=10)
+
+        # Then
+        self.assertNotIsInstance(result, list)
+        self.assertEqual(list(result), list(serializer.rows()))
@@ -0,0 +1,171 @@
+""" Tests for units.snapshot """
+from io import StringIO
+from mock import patch
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from units.catalog import clear_catalog
+from units.models import (
+    get_unit_model,
+    LatestUnitVersionSnapshot,
+    LatestUnitVersionView,
+    )
+from units.snapshot import refresh_snapshot
+from units.tests.fixtures import UnitTableTestCase
+from units.versions import (
+    compute_data_version,
+    invalidate_data_version,
+    )
+from units.views import (
+    LatestUnitVersionViewSet,
+    UNIT_FIELDS,
+    )
+
+
+class RefreshSnapshotTests(UnitTableTestCase):
+    """ Tests all cases for units.snapshot.refresh_snapshot """
+
+    def test_copy(self):
+        """ Test all rows are copied. """
+        # When
+        result = refresh_snapshot(batch_size=10)
+
+        # Then
+        # pylint: disable=no-member
+        self.assertEqual(result, len(self.rows))
+        self.assertEqual(
+            list(LatestUnitVersionSnapshot.objects.order_by("id").values_list(
+                *UNIT_FIELDS)),
+            list(LatestUnitVersionView.objects.order_by("id").values_list(
+                *UNIT_FIELDS)))
+
+    def test_replace(self):
+        """ Test old rows are replaced. """
+        # Given
+        refresh_snapshot()
+        # pylint: disable=no-member
+        LatestUnitVersionView.objects.filter(pk=1).delete()
+        LatestUnitVersionView.objects.filter(pk=2).update(name="Renamed")
+
+        # When
+        refresh_snapshot()
+
+        # Then
+        snapshot = LatestUnitVersionSnapshot.objects
+        self.assertEqual(snapshot.count(), len(self.rows) - 1)
+        self.assertFalse(snapshot.filter(pk=1).exists())
+        self.assertEqual(snapshot.get(pk=2).name, "Renamed")
+
+    def test_command(self):
+        """ Test command refreshes snapshot and invalidates caches. """
+        # Given
+        out = StringIO()
+
+        # When
+        with patch(
+                "units.snapshot.invalidate_unit_caches") as invalidate_mock:
+            call_command("refresh_units_snapshot", stdout=out)
+
+        # Then
+        # pylint: disable=no-member
+        self.assertEqual(
+            LatestUnitVersionSnapshot.objects.count(), len(self.rows))
+        self.assertIn(f"{len(self.rows)} units", out.getvalue())
+        invalidate_mock.assert_called_once_with()
+
+
+@override_settings(UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False)
+class UnitSourceTests(UnitTableTestCase):
+    """ Tests UNITS_SOURCE setting. """
+
+    def setUp(self):
+        refresh_snapshot()
+        # pylint: disable=no-member
+        LatestUnitVersionView.objects.filter(pk=1).update(name="Live")
+
+    def test_model(self):
+        """ Test model for each source. """
+        # Given
+        data = {
+            "view": LatestUnitVersionView,
+            "snapshot": LatestUnitVersionSnapshot,
+            }
+
+        # When/Then
+        for source, expected_result in data.items():
+            with self.subTest(source), override_settings(UNITS_SOURCE=source):
+                self.assertIs(get_unit_model(), expected_result)
+
+    def test_views(self):
+        """ Test views read from the configured source. """
+        # Given
+        factory = APIRequestFactory()
+        url = reverse("latestunitversionview-detail", kwargs={"pk": 1})
+        view = LatestUnitVersionViewSet.as_view({"get": "retrieve"})
+        data = {
+            "view": "Live",
+            "snapshot": self.rows[0]["name"],
+            }
+
+        # When/Then
+        for source, expected_result in data.items():
+            for backend in ("orm", "catalog"):
+                with self.subTest(f"{source}_{backend}"), override_settings(
+                        UNITS_SOURCE=source, UNITS_BACKEND=backend):
+                    invalidate_data_version()
+                    response = view(factory.get(url), pk=1)
+                    self.assertEqual(response.data["name"], expected_result)
+        clear_catalog()
+        invalidate_data_version()
+
+    def test_data_version(self):
+        """ Test data version changes when any column of the source does. """
+        # Given
+        # pylint: disable=no-member
+        snapshot = LatestUnitVersionSnapshot.objects
+        row = self.rows[0]
+        data = {
+            "abilities": f"{row['abilities']} X",
+            "frontline": not row["frontline"],
+            "gold": row["gold"] + 1,
+            "position": row["position"].swapcase(),
+            }
+
+        # When
+        with override_settings(UNITS_SOURCE="snapshot"):
+            tokens = [compute_data_version()]
+            refresh_snapshot()  # Unit 1 is renamed
+            tokens.append(compute_data_version())
+            for column, value in data.items():
+                snapshot.filter(pk=1).update(**{column: value})
+                tokens.append(compute_data_version())
+
+        # Then
+        self.assertEqual(len(set(tokens)), len(tokens))
+        with override_settings(UNITS_SOURCE="view"):
+            self.assertNotIn(compute_data_version(), tokens)
+
+    @override_settings(
+        UNITS_SOURCE="snapshot", UNITS_BACKEND="catalog",
+        UNITS_DATA_VERSION_TTL=3600)
+    def test_refresh_reloads(self):
+        """ Test refreshed rows are served right away (catalog reloaded). """
+        # Given
+        factory = APIRequestFactory()
+        url = reverse("latestunitversionview-detail", kwargs={"pk": 1})
+        view = LatestUnitVersionViewSet.as_view({"get": "retrieve"})
+        invalidate_data_version()
+        before = view(factory.get(url), pk=1).data["name"]
+
+        # When
+        refresh_snapshot()
+        after = view(factory.get(url), pk=1).data["name"]
+
+        # Then
+        self.assertEqual(before, self.rows[0]["name"])
+        self.assertEqual(after, "Live")
+        clear_catalog()
+        invalidate_data_version()
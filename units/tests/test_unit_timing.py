@@ -0,0 +1,153 @@
+""" Tests for units.timing """
+import unittest
+from mock import (
+    MagicMock,
+    patch,
+    )
+
+from django.http import HttpResponse
+from django.test import (
+    override_settings,
+    RequestFactory,
+    )
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from units.tests.fixtures import UnitTableTestCase
+from units.timing import (
+    start_timer,
+    Timer,
+    )
+from units.views import LatestUnitVersionViewSet
+
+
+class TimerTests(unittest.TestCase):
+    """ Tests all cases for units.timing.Timer """
+
+    @patch("units.timing.perf_counter")
+    def test_nested(self, perf_counter):
+        """ Test time of nested stages and queries counted once. """
+        # Given
+        perf_counter.side_effect = [0, 1, 2, 4, 5, 6, 10, 12]
+        timer = Timer()
+        execute = MagicMock(return_value="rows")
+
+        # When
+        with timer.stage("serialize"):  # 1 to 10
+            with timer.stage("query"):  # 2 to 6
+                result = timer.execute(execute, "SQL", [], False, {})  # 4-5
+
+        # Then
+        self.assertEqual(result, "rows")
+        execute.assert_called_once_with("SQL", [], False, {})
+        self.assertEqual(
+            timer.durations, {"db": 1, "query": 3, "serialize": 5})
+        self.assertEqual(timer.queries, 1)
+        self.assertEqual(
+            timer.header(),
+            'db;dur=1000.00;desc="1 queries", query;dur=3000.00, '
+            'serialize;dur=5000.00, total;dur=12000.00')
+
+    @override_settings(UNITS_SERVER_TIMING=True)
+    def test_finish(self):
+        """ Test header and log record fields. """
+        # Given
+        timer = Timer()
+        timer.durations = {"parse": 0.001}
+        timer.queries = 2
+        request = RequestFactory().get("/api/?q=g>1")
+        response = HttpResponse()
+
+        # When
+        with self.assertLogs("units.timing", "INFO") as logs:
+            timer.finish(request, response)
+
+        # Then
+        self.assertTrue(
+            response["Server-Timing"].startswith("parse;dur=1.00, total;"))
+        record = logs.records[0]
+        self.assertEqual(
+            (record.method, record.path, record.status, record.queries),
+            ("GET", "/api/?q=g%3E1", 200, 2))
+        self.assertEqual(list(record.timings), ["parse", "total"])
+        self.assertIn("queries=2 parse=1.0ms", record.getMessage())
+
+    def test_finish_header(self):
+        """ Test header only with DEBUG or UNITS_SERVER_TIMING. """
+        # Given
+        data = {
+            "off": (False, False, False),
+            "debug": (True, False, True),
+            "setting": (False, True, True),
+            }
+
+        # When/Then
+        for name, (debug, enabled, expected_result) in data.items():
+            with self.subTest(name), override_settings(
+                    DEBUG=debug, UNITS_SERVER_TIMING=enabled), self.assertLogs(
+                        "units.timing", "INFO"):
+                response = HttpResponse()
+                Timer().finish(RequestFactory().get("/api/"), response)
+                self.assertEqual(
+                    response.has_header("Server-Timing"), expected_result)
+
+
+class StartTimerTests(unittest.TestCase):
+    """ Tests all cases for units.timing.start_timer """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "disabled": (0, 0.0, False),
+            "all": (1, 0.99, True),
+            "sampled": (0.5, 0.25, True),
+            "not_sampled": (0.5, 0.5, False),
+            }
+
+        # When/Then
+        for name, (rate, random, expected_result) in data.items():
+            with self.subTest(name), override_settings(
+                    UNITS_TIMING_SAMPLE_RATE=rate), patch(
+                        "units.timing.random.random", return_value=random):
+                self.assertEqual(
+                    isinstance(start_timer(), Timer), expected_result)
+
+
+class TimedViewTests(UnitTableTestCase):
+    """ Tests timing of units.views.LatestUnitVersionViewSet requests. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+        overrides = override_settings(
+            UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    @override_settings(UNITS_TIMING_SAMPLE_RATE=1, UNITS_SERVER_TIMING=True)
+    def test_sampled(self):
+        """ Test stages in header and log. """
+        # When
+        with self.assertLogs("units.timing", "INFO") as logs:
+            response = self.view(self.factory.get(self.url, {"q": "g>=1"}))
+
+        # Then
+        self.assertTrue(response.is_rendered)
+        names = [
+            metric.split(";")[0]
+            for metric in response["Server-Timing"].split(", ")]
+        self.assertEqual(
+            sorted(names),
+            ["db", "parse", "query", "render", "serialize", "total"])
+        self.assertEqual(logs.records[0].queries, 1)
+
+    @override_settings(UNITS_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """ Test no header. """
+        # When
+        response = self.view(self.factory.get(self.url))
+
+        # Then
+        self.assertFalse(response.has_header("Server-Timing"))
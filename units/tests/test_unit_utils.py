@@ -1,13 +1,48 @@
 """ Tests for units.utils """
+import random
 import unittest
+from mock import patch
+
+from django.test import override_settings
 
 from units.utils import (
+    compile_query,
     filter_to_lookup,
+    get_query_cache,
     includes_excludes,
+    parse_aggregates,
+    parse_fields,
     parse_query,
+    parse_query_reference,
+    QueryPlan,
+    scan_query,
     )
 
 
+class ScanQueryTests(unittest.TestCase):
+    """ Tests all cases for units.utils.scan_query """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "valid": ("gold=5, blue!=3", True),
+            "trailing_comma": ("gold=5, ", True),
+            "empty": ("", True),
+            "invalid_later": ("gold=5,drone,energy:2", False),
+            "invalid_first": ("drone,gold=5", False),
+            "invalid_end": ("gold=5;", False),
+            "whitespace_value": ("gold= ", False),
+            }
+
+        # When/Then
+        for name, (query, expected_result) in data.items():
+            with self.subTest(name):
+                filters, complete = scan_query(query)
+                self.assertEqual(complete, expected_result)
+                self.assertEqual(filters, list(parse_query(query)))
+
+
 class ParseQueryTests(unittest.TestCase):
     """ Tests all cases for units.utils.parse_query """
 
@@ -64,6 +99,21 @@ class ParseQueryTests(unittest.TestCase):
                 "query": "",
                 "expected_result": []
                 },
+            "whitespace_value": {
+                "query": "gold=5,red= ",
+                "expected_result": []
+                },
+            "tabs": {
+                "query": "\tname=a\tb",
+                "expected_result": [["name", "=", "a  b"]]
+                },
+            "trailing_spaces": {
+                "query": "name= drone  , gold=5",
+                "expected_result": [
+                    ["name", "=", "drone  "],
+                    ["gold", "=", "5"],
+                    ]
+                },
             }
 
         # When/Then
@@ -72,6 +122,59 @@ class ParseQueryTests(unittest.TestCase):
                 self.assertEqual(
                     list(parse_query(params["query"])),
                     params["expected_result"])
+                self.assertEqual(
+                    list(parse_query_reference(params["query"])),
+                    params["expected_result"])
+
+
+class ParseQueryDifferentialTests(unittest.TestCase):
+    """
+    Tests units.utils.parse_query against units.utils.parse_query_reference.
+
+    """
+
+    def test_random_characters(self):
+        """ Test queries built from random grammar characters. """
+        # Given
+        rand = random.Random(1)
+        alphabet = "ab_Z09 \t\n\r,=:<>!\xe9\x0c"
+        queries = [
+            "".join(
+                rand.choice(alphabet) for _ in range(rand.randint(0, 16)))
+            for _ in range(3000)]
+
+        # When/Then
+        for query in queries:
+            with self.subTest(query):
+                self.assertEqual(
+                    list(parse_query(query)),
+                    list(parse_query_reference(query)))
+
+    def test_random_filters(self):
+        """ Test queries built from random (mostly valid) filters. """
+        # Given
+        rand = random.Random(2)
+        fields = ["gold", "n", "a", "build_time", "Bad1", "", " "]
+        operators = [
+            ":", "=", ">", ">=", "<", "<=", "!=", "<>", "==", "!", " ="]
+        values = [
+            "5", "drone", "gain XXXX", " 3", "3 ", "\t1", " ", "", "a-b"]
+        separators = [",", ", ", " ,", ",\n", ",,", "\t,", ""]
+
+        def query():
+            return rand.choice(separators).join(
+                rand.choice(fields) + rand.choice(operators)
+                + rand.choice(values)
+                for _ in range(rand.randint(1, 5)))
+
+        queries = [query() for _ in range(3000)]
+
+        # When/Then
+        for query in queries:
+            with self.subTest(query):
+                self.assertEqual(
+                    list(parse_query(query)),
+                    list(parse_query_reference(query)))
 
 
 class FilterToDjangoTests(unittest.TestCase):
@@ -282,3 +385,186 @@ class IncludesExcludesTests(unittest.TestCase):
 
         # Then
         self.assertEqual(result, expected_result)
+
+
+class ParseFieldsTests(unittest.TestCase):
+    """ Tests all cases for units.utils.parse_fields """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "simple": {
+                "data": "name,gold",
+                "expected_result": ("name", "gold"),
+                },
+            "synonyms": {
+                "data": "n,au",
+                "expected_result": ("name", "gold"),
+                },
+            "spaces": {
+                "data": " name , gold ",
+                "expected_result": ("name", "gold"),
+                },
+            "duplicates": {
+                "data": "name,n,name",
+                "expected_result": ("name",),
+                },
+            "empty_entries": {
+                "data": ",name,,",
+                "expected_result": ("name",),
+                },
+            "empty": {
+                "data": "",
+                "expected_result": (),
+                },
+            }
+
+        # When/Then
+        for name, params in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    parse_fields(params["data"]),
+                    params["expected_result"])
+
+    def test_allowed(self):
+        """ Test only return fields in the allowed list. """
+        # When
+        result = parse_fields("n,bad_field,au", allowed=["name", "gold"])
+
+        # Then
+        self.assertEqual(result, ("name", "gold"))
+
+
+class ParseAggregatesTests(unittest.TestCase):
+    """ Tests all cases for units.utils.parse_aggregates """
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        data = {
+            "count": {
+                "data": "count",
+                "expected_result": {"count": ("count", None)},
+                },
+            "functions": {
+                "data": "min:gold,max:gold,avg:attack,sum:health,count:red",
+                "expected_result": {
+                    "min_gold": ("min", "gold"),
+                    "max_gold": ("max", "gold"),
+                    "avg_attack": ("avg", "attack"),
+                    "sum_health": ("sum", "health"),
+                    "count_red": ("count", "red"),
+                    },
+                },
+            "synonyms_and_spaces": {
+                "data": " AVG : x , count ",
+                "expected_result": {
+                    "avg_attack": ("avg", "attack"),
+                    "count": ("count", None),
+                    },
+                },
+            "invalid": {
+                "data": "median:gold,avg,max:,:gold,",
+                "expected_result": {},
+                },
+            "empty": {
+                "data": "",
+                "expected_result": {},
+                },
+            }
+
+        # When/Then
+        for name, params in data.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    parse_aggregates(params["data"]),
+                    params["expected_result"])
+
+    def test_allowed(self):
+        """ Test only return aggregates over allowed fields. """
+        # When
+        result = parse_aggregates("max:au,max:name,count", allowed=["gold"])
+
+        # Then
+        self.assertEqual(
+            result, {"max_gold": ("max", "gold"), "count": ("count", None)})
+
+
+class CompileQueryTests(unittest.TestCase):
+    """ Tests all cases for units.utils.compile_query """
+
+    def setUp(self):
+        get_query_cache().clear()
+
+    def test_plan(self):
+        """ Test includes, excludes, ignored and normalized query. """
+        # Given
+        data = "name!=drone,au=5,bad=1,gold=5"
+        expected_result = QueryPlan(
+            includes={"gold": 5},
+            excludes={"name__icontains": "drone"},
+            ignored={"bad": 1},
+            normalized="gold=5,!name__icontains='drone'",
+            )
+
+        # When
+        result = compile_query(data, allowed=["gold", "name"])
+
+        # Then
+        self.assertEqual(result, expected_result)
+
+    def test_normalized_equivalent(self):
+        """ Test equivalent queries share normalized representation. """
+        # When
+        first = compile_query("gold=5,n!=drone")
+        second = compile_query("name<>drone,   au:5")
+
+        # Then
+        self.assertEqual(first.normalized, second.normalized)
+
+    def test_cached(self):
+        """ Test repeated queries skip parsing. """
+        # Given
+        compile_query("gold=5")
+
+        # When
+        with patch("units.utils.parse_query") as parse_mock:
+            result = compile_query("gold=5")
+
+        # Then
+        self.assertEqual(result.includes, {"gold": 5})
+        parse_mock.assert_not_called()
+        self.assertEqual(get_query_cache().hits, 1)
+        self.assertEqual(get_query_cache().misses, 1)
+
+    def test_cache_allowed_key(self):
+        """ Test allowed fields are part of the cache key. """
+        # When
+        compile_query("gold=5", allowed=["gold"])
+        result = compile_query("gold=5", allowed=["name"])
+
+        # Then
+        self.assertEqual(result.includes, {})
+        self.assertEqual(result.ignored, {"gold": 5})
+
+    def test_cache_disabled(self):
+        """ Test parsing always happens when cache is disabled. """
+        # When
+        with override_settings(UNITS_QUERY_CACHE_ENABLED=False):
+            compile_query("gold=5")
+            compile_query("gold=5")
+
+        # Then
+        self.assertEqual(len(get_query_cache()), 0)
+
+    def test_includes_excludes_copies(self):
+        """ Test cached plans are not modified through includes_excludes. """
+        # Given
+        includes, _ = includes_excludes("gold=5")
+
+        # When
+        includes["red"] = 1
+
+        # Then
+        self.assertEqual(compile_query("gold=5").includes, {"gold": 5})
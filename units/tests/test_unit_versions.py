@@ -0,0 +1,152 @@
+""" Tests for units.versions """
+import threading
+import unittest
+from mock import (
+    MagicMock,
+    patch,
+    )
+
+from django.test import override_settings
+
+from units import versions
+from units.models import LatestUnitVersionView
+from units.tests.fixtures import UnitTableTestCase
+
+
+class GetDataVersionTests(unittest.TestCase):
+    """ Tests all cases for units.versions.get_data_version """
+
+    def setUp(self):
+        versions._CURRENT = None  # pylint: disable=protected-access
+        patcher = patch("units.versions.compute_data_version")
+        self.compute_mock = patcher.start()
+        self.compute_mock.return_value = "a"
+        self.addCleanup(patcher.stop)
+        self.receiver = MagicMock()
+        versions.data_version_changed.connect(self.receiver)
+        self.addCleanup(
+            versions.data_version_changed.disconnect, self.receiver)
+
+    @override_settings(UNITS_DATA_VERSION_TTL=60)
+    def test_ttl(self):
+        """ Test database is not checked again before TTL expires. """
+        # When
+        first = versions.get_data_version()
+        self.compute_mock.return_value = "b"
+        second = versions.get_data_version()
+
+        # Then
+        self.assertEqual(first.token, "a")
+        self.assertEqual(second, first)
+        self.compute_mock.assert_called_once_with()
+        self.receiver.assert_called_once()
+
+    @override_settings(UNITS_DATA_VERSION_TTL=0)
+    def test_changed(self):
+        """ Test new version and signal when data changes. """
+        # Given
+        first = versions.get_data_version()
+        self.compute_mock.return_value = "b"
+
+        # When
+        second = versions.get_data_version()
+        third = versions.get_data_version()
+
+        # Then
+        self.assertEqual(second.token, "b")
+        self.assertGreaterEqual(second.modified, first.modified)
+        self.assertEqual(third, second)
+        self.assertEqual(self.receiver.call_count, 2)
+        self.assertEqual(self.receiver.call_args[1]["version"], second)
+
+    @override_settings(UNITS_DATA_VERSION_TTL=60)
+    def test_invalidate(self):
+        """ Test invalidation checks the database right away. """
+        # Given
+        versions.get_data_version()
+        self.compute_mock.return_value = "b"
+
+        # When
+        result = versions.invalidate_data_version()
+
+        # Then
+        self.assertEqual(result.token, "b")
+
+    @override_settings(UNITS_DATA_VERSION_TTL=0)
+    def test_stale_while_checking(self):
+        """ Test other threads get previous version during a check. """
+        # Given
+        first = versions.get_data_version()
+        started, finish = threading.Event(), threading.Event()
+
+        def slow_compute():
+            started.set()
+            finish.wait(5)
+            return "b"
+
+        self.compute_mock.side_effect = slow_compute
+        checking = threading.Thread(target=versions.get_data_version)
+        checking.start()
+        started.wait(5)
+
+        # When
+        during = versions.get_data_version()
+        finish.set()
+        checking.join(5)
+        self.compute_mock.side_effect = None
+        self.compute_mock.return_value = "b"
+        after = versions.get_data_version()
+
+        # Then
+        self.assertEqual(during, first)
+        self.assertEqual(after.token, "b")
+        self.assertEqual(self.compute_mock.call_count, 3)
+
+
+class ComputeDataVersionTests(UnitTableTestCase):
+    """ Tests all cases for units.versions.compute_data_version """
+
+    def test_changes(self):
+        """ Test token changes with the data. """
+        # Given
+        first = versions.compute_data_version()
+        again = versions.compute_data_version()
+
+        # When
+        # pylint: disable=no-member
+        LatestUnitVersionView.objects.filter(pk=1).update(
+            gold=100)
+        second = versions.compute_data_version()
+
+        # Then
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, second)
+
+    def test_any_column(self):
+        """ Test token changes with text, flags and cancelling numbers. """
+        # Given
+        # pylint: disable=no-member
+        objects = LatestUnitVersionView.objects
+        first, second = self.rows[0], self.rows[1]
+        data = {
+            "text": [(1, {"abilities": first["abilities"] + " X"})],
+            "same_length": [(1, {"name": first["name"].swapcase()})],
+            "flag": [(1, {"frontline": not first["frontline"]})],
+            "cancelling": [
+                (1, {"gold": first["gold"] + 1}),
+                (2, {"gold": second["gold"] - 1}),
+                ],
+            }
+        original = versions.compute_data_version()
+
+        # When/Then
+        for name, updates in data.items():
+            with self.subTest(name):
+                for pk, values in updates:
+                    objects.filter(pk=pk).update(**values)
+                self.assertNotEqual(
+                    versions.compute_data_version(), original)
+                for pk, values in updates:
+                    objects.filter(pk=pk).update(**{
+                        key: self.rows[pk - 1][key] for key in values})
+                self.assertEqual(versions.compute_data_version(), original)
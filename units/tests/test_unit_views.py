@@ -1,16 +1,43 @@
 """ Tests for units.views """
+import tracemalloc
 import unittest
+from datetime import (
+    datetime,
+    timezone,
+    )
 from mock import (
     call,
     MagicMock,
+    patch,
     )
 
+from django.core.cache import caches
+from django.db.models import QuerySet
+from django.http import Http404
+from django.test import override_settings
 from django.urls import reverse
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
 
+from units.catalog import clear_catalog
+from units.models import LatestUnitVersionView
+from units.renderers import msgpack
+from units.serializers import (
+    LatestUnitVersionViewFastSerializer,
+    LatestUnitVersionViewSerializer,
+    )
+from units.tests.fixtures import (
+    unit_rows,
+    UnitTableTestCase,
+    )
+from units.versions import DataVersion
 from units.views import LatestUnitVersionViewSet
 
 
+MODIFIED = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
 class LatestUnitVersionCleanTests(unittest.TestCase):
     """ Tests success cases for units.views.LatestUnitVersionViewSet. """
 
@@ -129,3 +156,713 @@ class LatestUnitVersionCleanTests(unittest.TestCase):
             call.filter(gold=5),
             call.exclude(gold=5),
             ])
+
+    def test_fields(self):
+        """ Test only requested (valid) fields are selected. """
+        # Given
+        request = self.factory.get(
+            self.url, {"fields": "url,n,au,invalid,name"})
+        self.view.request = request
+        self.view.queryset = self.queryset_mock
+        expected_result = MagicMock()
+
+        self.queryset_mock.filter.return_value = self.queryset_mock
+        self.queryset_mock.exclude.return_value = self.queryset_mock
+        self.queryset_mock.only.return_value = expected_result
+
+        # When
+        result = LatestUnitVersionViewSet.get_queryset(self.view)
+
+        # Then
+        self.assertEqual(result, expected_result)
+        self.queryset_mock.only.assert_called_once_with("pk", "name", "gold")
+
+
+class LatestUnitVersionCatalogTests(unittest.TestCase):
+    """
+    Tests units.views.LatestUnitVersionViewSet with the catalog backend.
+
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet()
+        self.view.queryset = MagicMock()
+        self.view.format_kwarg = None
+        self.objects = [
+            LatestUnitVersionView(id=1, name="Drone"),
+            LatestUnitVersionView(id=2, name="Wall"),
+            ]
+        patcher = patch("units.views.get_catalog")
+        self.catalog_mock = patcher.start().return_value
+        self.catalog_mock.instances.return_value = self.objects
+        self.addCleanup(patcher.stop)
+
+    @override_settings(UNITS_BACKEND="catalog")
+    def test_queryset(self):
+        """ Test filters are evaluated by the catalog. """
+        # Given
+        self.view.request = self.factory.get(self.url, {"q": "gold=5,r!=1"})
+
+        # When
+        result = LatestUnitVersionViewSet.get_queryset(self.view)
+
+        # Then
+        self.assertEqual(result, self.objects)
+        self.catalog_mock.instances.assert_called_once_with(
+            {"gold": 5}, {"red": 1})
+        self.view.queryset.filter.assert_not_called()
+
+    @override_settings(UNITS_BACKEND="catalog")
+    def test_object(self):
+        """ Test object is looked up in the catalog results. """
+        # Given
+        request = self.factory.get(self.url)
+        self.view.request = Request(request)
+        self.view.kwargs = {"pk": "2"}
+
+        # When
+        result = LatestUnitVersionViewSet.get_object(self.view)
+
+        # Then
+        self.assertIs(result, self.objects[1])
+
+    @override_settings(UNITS_BACKEND="catalog")
+    def test_object_not_found(self):
+        """ Test missing or invalid primary keys. """
+        # Given
+        request = self.factory.get(self.url)
+        self.view.request = Request(request)
+
+        for pk in ["3", "invalid"]:
+            with self.subTest(pk):
+                self.view.kwargs = {"pk": pk}
+
+                # When/Then
+                with self.assertRaises(Http404):
+                    LatestUnitVersionViewSet.get_object(self.view)
+
+
+class LatestUnitVersionResponseCacheTests(unittest.TestCase):
+    """
+    Tests units.views.LatestUnitVersionViewSet rendered responses cache.
+
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        overrides = override_settings(UNITS_RESPONSE_CACHE="units")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        caches["units"].clear()
+
+        patcher = patch("units.views.get_data_version")
+        self.version_mock = patcher.start()
+        self.version_mock.return_value = DataVersion("1", MODIFIED)
+        self.addCleanup(patcher.stop)
+
+        patcher = patch.object(LatestUnitVersionViewSet, "get_queryset")
+        self.queryset_mock = patcher.start()
+        self.queryset_mock.return_value = [
+            LatestUnitVersionView(id=1, name="Drone", gold=3)]
+        self.addCleanup(patcher.stop)
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+
+    def get(self, params, **extra):
+        """ Get rendered response for list action. """
+        response = self.view(self.factory.get(self.url, params, **extra))
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def test_cached(self):
+        """ Test equivalent queries are served from cache. """
+        # When
+        first = self.get({"q": "gold=3", "format": "json"})
+        second = self.get({"q": "au:3", "format": "json"})
+
+        # Then
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["Content-Type"], second["Content-Type"])
+        self.assertEqual(second["Vary"], "Accept")
+        self.queryset_mock.assert_called_once_with()
+
+    def test_key_changes(self):
+        """ Test different queries, versions and renderers are not shared. """
+        # When
+        self.get({"q": "gold=3", "format": "json"})
+        self.get({"q": "gold=4", "format": "json"})
+        self.version_mock.return_value = DataVersion("2", MODIFIED)
+        self.get({"q": "gold=3", "format": "json"})
+        with override_settings(ALLOWED_HOSTS=["other"]):
+            self.get({"q": "gold=3", "format": "json"}, HTTP_HOST="other")
+
+        # Then
+        self.assertEqual(self.queryset_mock.call_count, 4)
+
+    def test_browsable_api(self):
+        """ Test browsable API responses are never cached. """
+        # Given
+        self.get({"format": "api"})
+        calls = self.queryset_mock.call_count
+
+        # When
+        self.get({"format": "api"})
+
+        # Then
+        self.assertEqual(self.queryset_mock.call_count, calls * 2)
+
+
+class LatestUnitVersionConditionalTests(unittest.TestCase):
+    """ Tests units.views.LatestUnitVersionViewSet conditional GET. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        overrides = override_settings(
+            UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=True)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        patcher = patch("units.views.get_data_version")
+        self.version_mock = patcher.start()
+        self.version_mock.return_value = DataVersion("1", MODIFIED)
+        self.addCleanup(patcher.stop)
+
+        patcher = patch.object(LatestUnitVersionViewSet, "get_queryset")
+        self.queryset_mock = patcher.start()
+        self.queryset_mock.return_value = [
+            LatestUnitVersionView(id=1, name="Drone", gold=3)]
+        self.addCleanup(patcher.stop)
+
+    def get(self, action, url, **extra):
+        """ Get rendered response for action. """
+        view = LatestUnitVersionViewSet.as_view({"get": action})
+        kwargs = {"pk": "1"} if action == "retrieve" else {}
+        response = view(
+            self.factory.get(url, {"format": "json"}, **extra), **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        return response
+
+    def test_validators(self):
+        """ Test ETag and Last-Modified headers. """
+        # Given
+        url = reverse("latestunitversionview-list")
+
+        # When
+        response = self.get("list", url)
+
+        # Then
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["ETag"], r'^"[0-9a-f]{40}"$')
+        self.assertEqual(
+            response["Last-Modified"], "Wed, 01 Jan 2020 00:00:00 GMT")
+
+    def test_if_none_match(self):
+        """ Test 304 without running the queryset when ETag matches. """
+        # Given
+        url = reverse("latestunitversionview-list")
+        etag = self.get("list", url)["ETag"]
+        self.queryset_mock.reset_mock()
+
+        # When
+        response = self.get("list", url, HTTP_IF_NONE_MATCH=etag)
+
+        # Then
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        self.queryset_mock.assert_not_called()
+
+    def test_if_none_match_changed(self):
+        """ Test full response when data version changed. """
+        # Given
+        url = reverse("latestunitversionview-list")
+        etag = self.get("list", url)["ETag"]
+        self.version_mock.return_value = DataVersion("2", MODIFIED)
+
+        # When
+        response = self.get("list", url, HTTP_IF_NONE_MATCH=etag)
+
+        # Then
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_if_modified_since(self):
+        """ Test 304 when data didn't change since given date. """
+        # Given
+        url = reverse("latestunitversionview-detail", kwargs={"pk": 1})
+        data = {
+            "Wed, 01 Jan 2020 00:00:00 GMT": 304,
+            "Thu, 02 Jan 2020 00:00:00 GMT": 304,
+            "Tue, 31 Dec 2019 00:00:00 GMT": 200,
+            }
+
+        # When/Then
+        for since, expected_result in data.items():
+            with self.subTest(since):
+                response = self.get(
+                    "retrieve", url, HTTP_IF_MODIFIED_SINCE=since)
+                self.assertEqual(response.status_code, expected_result)
+
+    def test_detail_etag(self):
+        """ Test detail and list responses have different ETags. """
+        # When
+        list_etag = self.get(
+            "list", reverse("latestunitversionview-list"))["ETag"]
+        detail_etag = self.get(
+            "retrieve",
+            reverse("latestunitversionview-detail", kwargs={"pk": 1}))["ETag"]
+
+        # Then
+        self.assertNotEqual(list_etag, detail_etag)
+
+    def test_disabled(self):
+        """ Test no validators when disabled. """
+        # Given
+        url = reverse("latestunitversionview-list")
+
+        # When
+        with override_settings(UNITS_CONDITIONAL_GET=False):
+            response = self.get("list", url, HTTP_IF_NONE_MATCH="*")
+
+        # Then
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class LatestUnitVersionSerializerClassTests(unittest.TestCase):
+    """ Tests units.views.LatestUnitVersionViewSet serializer selection. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet()
+
+    def serializer_class(self, params, renderer=None):
+        """ Get serializer class for request with params. """
+        self.view.request = Request(self.factory.get(self.url, params))
+        self.view.request.accepted_renderer = renderer
+        return self.view.get_serializer_class()
+
+    def test_cases(self):
+        """ Test all cases. """
+        # Given
+        browsable = BrowsableAPIRenderer()
+        data = {
+            "default": ({}, None, False, LatestUnitVersionViewSerializer),
+            "param": (
+                {"serializer": "fast"}, None, False,
+                LatestUnitVersionViewFastSerializer),
+            "setting": ({}, None, True, LatestUnitVersionViewFastSerializer),
+            "browsable": (
+                {"serializer": "fast"}, browsable, True,
+                LatestUnitVersionViewSerializer),
+            }
+
+        # When/Then
+        for name, (params, renderer, setting, expected_result) in (
+                data.items()):
+            with self.subTest(name):
+                with override_settings(UNITS_FAST_SERIALIZER=setting):
+                    self.assertIs(
+                        self.serializer_class(params, renderer),
+                        expected_result)
+
+
+class LatestUnitVersionStreamTests(unittest.TestCase):
+    """ Tests units.views.LatestUnitVersionViewSet streamed lists. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        overrides = override_settings(
+            UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False,
+            UNITS_STREAM_CHUNK_SIZE=100)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+
+    def get(self, params, count=3):
+        """ Get response for list action with count (lazy) units. """
+        objects = (
+            LatestUnitVersionView(
+                id=index, name=f"Drone {index}", gold=3, frontline=False)
+            for index in range(1, count + 1))
+        with patch.object(
+                LatestUnitVersionViewSet, "get_queryset",
+                return_value=objects):
+            return self.view(self.factory.get(self.url, params))
+
+    def test_ndjson(self):
+        """ Test NDJSON is always streamed. """
+        # When
+        response = self.get({"format": "ndjson"})
+        content = b"".join(response.streaming_content)
+
+        # Then
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(content.count(b"\n"), 3)
+        self.assertTrue(content.startswith(b'{"url":"http://testserver/'))
+
+    def test_json(self):
+        """ Test streamed JSON is identical to regular JSON. """
+        # Given
+        expected_result = self.get({"format": "json"}).render().content
+
+        # When
+        response = self.get({"format": "json", "stream": "true"})
+
+        # Then
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b"".join(response.streaming_content), expected_result)
+
+    def test_not_streamed(self):
+        """ Test regular responses without stream parameter. """
+        # Given
+        data = {
+            "json": {"format": "json"},
+            "browsable_api": {"format": "api", "stream": "true"},
+            }
+
+        # When/Then
+        for name, params in data.items():
+            with self.subTest(name):
+                self.assertFalse(self.get(params).streaming)
+
+    def test_fields(self):
+        """ Test fields parameter restricts output of every serializer. """
+        # Given
+        data = {
+            "regular": {"format": "json"},
+            "fast": {"format": "json", "serializer": "fast"},
+            "stream": {"format": "json", "stream": "true"},
+            "ndjson": {"format": "ndjson"},
+            }
+        expected_result = b'{"name":"Drone 1","gold":3}'
+
+        # When/Then
+        for name, params in data.items():
+            with self.subTest(name):
+                response = self.get(
+                    dict(params, fields="gold,n,bad"), count=1)
+                content = (
+                    b"".join(response.streaming_content)
+                    if response.streaming else response.render().content)
+                self.assertIn(expected_result, content)
+                self.assertNotIn(b"url", content)
+
+
+@override_settings(
+    UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False,
+    UNITS_BACKEND="orm", UNITS_STREAM_CHUNK_SIZE=100)
+class LatestUnitVersionStreamMemoryTests(UnitTableTestCase):
+    """ Tests memory use of streamed lists read from the database. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+
+    def peak(self, count):
+        """ Get peak memory (bytes) streaming a table of count rows. """
+        # pylint: disable=no-member
+        LatestUnitVersionView.objects.all().delete()
+        LatestUnitVersionView.objects.bulk_create(
+            LatestUnitVersionView(**row) for row in unit_rows(count))
+        request = self.factory.get(self.url, {"format": "ndjson"})
+        tracemalloc.start()
+        response = self.view(request)
+        lines = 0
+        for chunk in response.streaming_content:
+            lines += chunk.count(b"\n")
+        _, result = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(lines, count)
+        return result
+
+    def test_memory(self):
+        """ Test peak memory doesn't grow with the amount of rows. """
+        # Given
+        iterator = patch.object(
+            QuerySet, "iterator", autospec=True,
+            side_effect=QuerySet.iterator)
+
+        # When
+        with iterator as iterator_mock:
+            small = self.peak(500)
+            large = self.peak(5000)
+
+        # Then
+        # Rows are read with a database cursor, UNITS_STREAM_CHUNK_SIZE at
+        # a time (not the data version check)
+        self.assertEqual(
+            [args[1:] for args, _ in iterator_mock.call_args_list].count(
+                (100,)),
+            2)
+        self.assertLess(large, small * 2)
+
+
+@override_settings(UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False)
+class LatestUnitVersionBatchTests(UnitTableTestCase):
+    """ Tests units.views.LatestUnitVersionViewSet.batch """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-batch")
+        self.view = LatestUnitVersionViewSet.as_view({"post": "batch"})
+        self.list_view = LatestUnitVersionViewSet.as_view({"get": "list"})
+
+    def post(self, queries, **params):
+        """ Get batch response for queries. """
+        url = self.url
+        if params:
+            url = f"{url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
+        return self.view(self.factory.post(
+            url, {"queries": queries}, format="json"))
+
+    def test_same_as_list(self):
+        """ Test results match list endpoint, for both backends. """
+        # Given
+        queries = [
+            "gold>3,frontline=1", "a=gain XXXX,n!=drone", "", "bad=1",
+            "unit_spell=Spell,au<=10"]
+
+        # When/Then
+        for backend in ("orm", "catalog"):
+            with self.subTest(backend), override_settings(
+                    UNITS_BACKEND=backend):
+                clear_catalog()
+                response = self.post(queries)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.data["results"],
+                    [
+                        self.list_view(
+                            self.factory.get(
+                                reverse("latestunitversionview-list"),
+                                {"q": query})).data
+                        for query in queries])
+        clear_catalog()
+
+    def test_single_query(self):
+        """ Test all queries are answered with one database query. """
+        # When/Then
+        with self.assertNumQueries(1):
+            response = self.post(["gold>3", "a=gain", "n=drone"] * 10)
+        self.assertEqual(len(response.data["results"]), 30)
+
+    def test_fields(self):
+        """ Test fields parameter applies to every result. """
+        # When
+        response = self.post(["gold>3", "n=drone"], fields="name")
+
+        # Then
+        for result in response.data["results"]:
+            self.assertEqual({key for row in result for key in row}, {"name"})
+
+    @override_settings(UNITS_BATCH_MAX_QUERIES=2)
+    def test_invalid(self):
+        """ Test invalid input. """
+        # Given
+        data = {
+            "empty": [],
+            "too_many": ["a=1", "a=2", "a=3"],
+            "not_list": "gold>3",
+            }
+
+        # When/Then
+        for name, queries in data.items():
+            with self.subTest(name):
+                response = self.post(queries)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("queries", response.data)
+
+    def test_invalid_value(self):
+        """ Test errors are reported per query. """
+        # When
+        response = self.post(["gold>3", "gold>abc"])
+
+        # Then
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data["queries"]), ["1"])
+
+
+@override_settings(UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False)
+class LatestUnitVersionCompactTests(UnitTableTestCase):
+    """ Tests units.views.LatestUnitVersionViewSet compact lists. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+
+    def test_cases(self):
+        """ Test ids and names of matching units, for both backends. """
+        # Given
+        matches = [row for row in self.rows if row["gold"] > 10]
+        data = {
+            "ids": ({"ids_only": "true"}, [row["id"] for row in matches]),
+            "names": ({"names_only": "1"}, [row["name"] for row in matches]),
+            }
+
+        # When/Then
+        for backend in ("orm", "catalog"):
+            for name, (params, expected_result) in data.items():
+                with self.subTest(f"{backend}_{name}"), override_settings(
+                        UNITS_BACKEND=backend), patch.object(
+                            LatestUnitVersionViewSet,
+                            "get_serializer") as serializer_mock:
+                    clear_catalog()
+                    response = self.view(self.factory.get(
+                        self.url, dict(params, q="gold>10")))
+                    self.assertEqual(response.data, expected_result)
+                    serializer_mock.assert_not_called()
+        clear_catalog()
+
+    def test_disabled(self):
+        """ Test regular list for other values. """
+        # When
+        response = self.view(self.factory.get(self.url, {"ids_only": "no"}))
+
+        # Then
+        self.assertEqual(len(response.data), len(self.rows))
+        self.assertIsInstance(response.data[0], dict)
+
+
+@override_settings(UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False)
+class LatestUnitVersionAggregateTests(UnitTableTestCase):
+    """ Tests units.views.LatestUnitVersionViewSet.aggregate """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-aggregate")
+        self.view = LatestUnitVersionViewSet.as_view({"get": "aggregate"})
+
+    def get(self, params):
+        """ Get aggregate response data. """
+        return self.view(self.factory.get(self.url, params)).data
+
+    def test_aggregates(self):
+        """ Test aggregates over filtered units. """
+        # Given
+        rows = [
+            row for row in self.rows
+            if row["frontline"] and row["gold"] >= 3]
+        expected_result = {
+            "count": len(rows),
+            "avg_attack": sum(row["attack"] for row in rows) / len(rows),
+            "max_gold": max(row["gold"] for row in rows),
+            "min_health": min(row["health"] for row in rows),
+            "sum_supply": sum(row["supply"] for row in rows),
+            }
+
+        # When/Then
+        for backend in ("orm", "catalog"):
+            with self.subTest(backend), override_settings(
+                    UNITS_BACKEND=backend):
+                result = self.get({
+                    "q": "fl=1,au>=3",
+                    "aggregates": "count,avg:x,max:au,min:h,sum:su,max:n"})
+                self.assertEqual(set(result), set(expected_result))
+                for name, value in expected_result.items():
+                    self.assertAlmostEqual(result[name], value)
+
+    def test_group_by(self):
+        """ Test aggregates per group, ordered by group. """
+        # Given
+        expected_result = [
+            {
+                "unit_spell": unit_spell,
+                "position": position,
+                "count": len(rows),
+                "max_gold": max(row["gold"] for row in rows),
+                }
+            for unit_spell, position, rows in sorted(
+                (unit_spell, position, [
+                    row for row in self.rows
+                    if (row["unit_spell"], row["position"])
+                    == (unit_spell, position)])
+                for unit_spell, position in {
+                    (row["unit_spell"], row["position"])
+                    for row in self.rows})]
+
+        # When
+        result = self.get(
+            {"aggregates": "count,max:gold", "group_by": "unit_spell,pos"})
+
+        # Then
+        self.assertEqual([dict(item) for item in result], expected_result)
+
+    def test_default(self):
+        """ Test count when no valid aggregates. """
+        # When
+        result = self.get({"aggregates": "median:gold", "q": "au>10"})
+
+        # Then
+        self.assertEqual(
+            result,
+            {"count": len([row for row in self.rows if row["gold"] > 10])})
+
+
+@unittest.skipUnless(msgpack, "msgpack not installed")
+@override_settings(UNITS_RESPONSE_CACHE=None, UNITS_CONDITIONAL_GET=False)
+class LatestUnitVersionMessagePackTests(UnitTableTestCase):
+    """ Tests MessagePack units.views.LatestUnitVersionViewSet lists. """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.url = reverse("latestunitversionview-list")
+        self.view = LatestUnitVersionViewSet.as_view({"get": "list"})
+
+    def test_same_as_json(self):
+        """ Test same data as JSON, by format or Accept. """
+        # Given
+        params = {"q": "g>=1", "fields": "name,g,fl"}
+        expected_result = self.view(self.factory.get(self.url, params)).data
+        data = {
+            "format": (dict(params, format="msgpack"), {}),
+            "accept": (params, {"HTTP_ACCEPT": "application/x-msgpack"}),
+            }
+
+        # When/Then
+        for name, (query, headers) in data.items():
+            with self.subTest(name):
+                response = self.view(
+                    self.factory.get(self.url, query, **headers))
+                response.render()
+                self.assertEqual(
+                    response["Content-Type"], "application/x-msgpack")
+                self.assertEqual(
+                    msgpack.unpackb(response.content), expected_result)
+
+    def test_columns(self):
+        """ Test columnar layout, by format or Accept. """
+        # Given
+        params = {"q": "g>=1", "fields": "name,g"}
+        rows = self.view(self.factory.get(self.url, params)).data
+        expected_result = {
+            "name": [row["name"] for row in rows],
+            "green": [row["green"] for row in rows],
+            }
+        data = {
+            "format": (dict(params, format="msgpack-columns"), {}),
+            "accept": (
+                params,
+                {"HTTP_ACCEPT": "application/x-msgpack-columns"}),
+            }
+
+        # When/Then
+        for name, (query, headers) in data.items():
+            with self.subTest(name):
+                response = self.view(
+                    self.factory.get(self.url, query, **headers))
+                response.render()
+                self.assertEqual(
+                    msgpack.unpackb(response.content), expected_result)
@@ -0,0 +1,125 @@
+""" Tests for units.warmup """
+import unittest
+from mock import patch
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from units.cache import invalidate_unit_caches
+from units.metrics import get_registry
+from units.tests.fixtures import UnitTableTestCase
+from units.views import LatestUnitVersionViewSet
+from units.warmup import warm_up
+
+
+class WarmUpTests(unittest.TestCase):
+    """ Tests all cases for units.warmup.warm_up """
+
+    def setUp(self):
+        patcher = patch("units.warmup.connections")
+        self.connections_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled(self):
+        """ Test nothing runs without UNITS_WARMUP_ENABLED. """
+        # Given
+        with patch("units.warmup.load_urls") as load_urls_mock:
+            # When
+            result = warm_up()
+
+        # Then
+        self.assertEqual(result, {})
+        load_urls_mock.assert_not_called()
+        self.connections_mock.close_all.assert_not_called()
+
+    @override_settings(
+        UNITS_WARMUP_ENABLED=True, UNITS_WARMUP_PRELOAD=False,
+        UNITS_WARMUP_QUERIES=["g=1", "au>2"], UNITS_WARMUP_SCHEMA=False)
+    def test_steps(self):
+        """ Test steps enabled in settings run, failures are skipped. """
+        # Given
+        with patch("units.warmup.run_query") as run_query_mock:
+            run_query_mock.side_effect = [ValueError("bad"), None]
+            with self.assertLogs("units.warmup") as logs:
+                # When
+                result = warm_up()
+
+        # Then
+        self.assertEqual(list(result), ["urls", "q=au>2"])
+        self.assertEqual(
+            [call.args for call in run_query_mock.call_args_list],
+            [("g=1",), ("au>2",)])
+        self.assertEqual(
+            [record.levelname for record in logs.records], ["ERROR", "INFO"])
+        self.connections_mock.close_all.assert_called_once_with()
+
+    @override_settings(
+        UNITS_WARMUP_ENABLED=True, UNITS_WARMUP_SCHEMA=False,
+        UNITS_BACKEND="catalog")
+    def test_catalog(self):
+        """ Test catalog is loaded with the catalog backend. """
+        # Given
+        with patch("units.warmup.get_catalog") as get_catalog_mock, \
+                patch("units.warmup.get_data_version"), \
+                self.assertLogs("units.warmup"):
+            # When
+            result = warm_up()
+
+        # Then
+        self.assertEqual(list(result), ["urls", "preload"])
+        get_catalog_mock.assert_called_once_with()
+
+    @override_settings(
+        UNITS_WARMUP_ENABLED=True, UNITS_WARMUP_SCHEMA=False,
+        UNITS_BACKEND="orm")
+    def test_orm(self):
+        """ Test only data version is loaded with the ORM backend. """
+        # Given
+        with patch("units.warmup.get_catalog") as get_catalog_mock, \
+                patch("units.warmup.get_data_version") as version_mock, \
+                self.assertLogs("units.warmup"):
+            # When
+            result = warm_up()
+
+        # Then
+        self.assertEqual(list(result), ["urls", "preload"])
+        version_mock.assert_called_once_with()
+        get_catalog_mock.assert_not_called()
+
+
+class WarmUpUnitsTests(UnitTableTestCase):
+    """ Tests units.warmup.warm_up with a unit table. """
+
+    def setUp(self):
+        invalidate_unit_caches()
+        self.addCleanup(invalidate_unit_caches)
+        patcher = patch("units.warmup.connections")
+        self.connections_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(
+        UNITS_WARMUP_ENABLED=True, UNITS_WARMUP_QUERIES=["g>=1"],
+        UNITS_WARMUP_HOST="testserver", UNITS_CONDITIONAL_GET=False)
+    def test_warm(self):
+        """ Test first request for a warmed query is a cache hit. """
+        # Given
+        factory = APIRequestFactory()
+        view = LatestUnitVersionViewSet.as_view({"get": "list"})
+        hits = get_registry().metrics["units_response_cache_total"].values
+
+        # When
+        with self.assertLogs("units.warmup") as logs:
+            result = warm_up()
+        before = hits.get(("hit",), 0)
+        response = view(factory.get(
+            reverse("latestunitversionview-list"), {"q": "g>=1"},
+            HTTP_ACCEPT="application/json"))
+
+        # Then
+        self.assertEqual(
+            list(result), ["urls", "preload", "q=g>=1", "schema"])
+        self.assertEqual(
+            [record.levelname for record in logs.records], ["INFO"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(hits.get(("hit",), 0), before + 1)
@@ -0,0 +1,152 @@
+""" Per request timing instrumentation for papi.units """
+import logging
+import random
+
+from contextlib import contextmanager
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    )
+
+from django.conf import settings
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    )
+
+
+LOGGER = logging.getLogger("units.timing")
+
+
+class Timer:
+    """
+    Time spent per stage of a request.
+
+    Stages can be nested, time of nested stages (and database queries, see
+    `execute`) is only counted in the innermost one, so durations add up to
+    (at most) the total.
+
+    """
+
+    def __init__(self) -> None:
+        self.start = perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.queries = 0
+        # Time spent in nested stages, per open stage
+        self._nested: List[float] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Add time spent in block to stage.
+
+        Parameters
+        ----------
+        name : str
+            Stage name (ie: parse, query, serialize, render).
+
+        """
+        self._nested.append(0.0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            nested = self._nested.pop()
+            self.durations[name] = (
+                self.durations.get(name, 0.0) + elapsed - nested)
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def execute(
+            self, execute: Callable[..., Any], sql: str, params: Any,
+            many: bool, context: Dict[str, Any]) -> Any:
+        """ Database execute wrapper, counts queries as "db" stage. """
+        self.queries += 1
+        with self.stage("db"):
+            return execute(sql, params, many, context)
+
+    def total(self) -> float:
+        """ Get seconds since timer started. """
+        return perf_counter() - self.start
+
+    def header(self) -> str:
+        """
+        Get Server-Timing header value (milliseconds).
+
+        Returns
+        -------
+        str
+
+        Examples
+        --------
+        output:
+            'parse;dur=0.05, db;dur=1.20;desc="2 queries", total;dur=3.10'
+
+        """
+        metrics = []
+        for name, seconds in self.durations.items():
+            metric = f"{name};dur={seconds * 1000:.2f}"
+            if name == "db":
+                metric += f';desc="{self.queries} queries"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={self.total() * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def finish(self, request: HttpRequest, response: HttpResponse) -> None:
+        """
+        Log timings, add Server-Timing header to response when DEBUG or
+        UNITS_SERVER_TIMING is on (it tells clients about queries).
+
+        Log records have `method`, `path`, `status`, `queries` and
+        `timings` (milliseconds per stage, and total) attributes.
+
+        Parameters
+        ----------
+        request : HttpRequest
+            Request being timed.
+        response : HttpResponse
+            Response for request.
+
+        """
+        if settings.DEBUG or getattr(settings, "UNITS_SERVER_TIMING", False):
+            response["Server-Timing"] = self.header()
+        timings = {
+            name: round(seconds * 1000, 3)
+            for name, seconds in self.durations.items()}
+        timings["total"] = round(self.total() * 1000, 3)
+        LOGGER.info(
+            "%s %s %s queries=%s %s",
+            request.method, request.get_full_path(), response.status_code,
+            self.queries,
+            " ".join(f"{name}={value}ms" for name, value in timings.items()),
+            extra={
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "queries": self.queries,
+                "timings": timings,
+                })
+
+
+def start_timer() -> Optional[Timer]:
+    """
+    Get timer for a request, None when not sampled.
+
+    A UNITS_TIMING_SAMPLE_RATE fraction of requests is timed (0 to disable,
+    1 for every request).
+
+    Returns
+    -------
+    Timer or None
+
+    """
+    rate = getattr(settings, "UNITS_TIMING_SAMPLE_RATE", 0.0)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    return Timer()
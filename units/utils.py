@@ -1,21 +1,21 @@
 """ Utilities for papi.units """
+import re
+
+from functools import lru_cache
 from typing import (
+    Any,
     Dict,
     Iterator,
     List,
+    NamedTuple,
     Optional,
+    Sequence,
     Tuple,
     Union,
     )
-from pyparsing import (
-    alphanums,
-    alphas,
-    Combine,
-    delimitedList,
-    oneOf,
-    ParseException,
-    Word,
-    )
+from django.conf import settings
+
+from units.cache import LRUCache
 
 
 OPERATORS_MAP = {
@@ -28,11 +28,6 @@ OPERATORS_MAP = {
     "!=": "__icontains",
     "<>": "__icontains",
     }
-SEARCH_OPERATORS = oneOf(" ".join(OPERATORS_MAP.keys()))
-SEARCH_FILTER = (
-    Word(alphas + "_") + SEARCH_OPERATORS + Word(alphanums + "_" + " "))
-SEARCH_QUERY = delimitedList(Combine(SEARCH_FILTER), delim=",")
-
 SYNONYMS_MAP = {
     "n": "name",
     "au": "gold",
@@ -56,11 +51,23 @@ SYNONYMS_MAP = {
     "a": "abilities",
     }
 
+AGGREGATE_FUNCTIONS = ("count", "min", "max", "avg", "sum")
+
+
+# Single pass scanner equivalent to the pyparsing grammar (get_search_grammar).
+# Two character operators go first to match pyparsing's longest match.
+SEARCH_FILTER_RE = re.compile(
+    r"[ \t\n\r]*([A-Za-z_]+)(>=|<=|<>|!=|[:=><])([0-9A-Za-z_ ]+)")
+SEARCH_DELIMITER_RE = re.compile(r"[ \t\n\r]*,")
+
 
 def parse_query(raw_query: str) -> Iterator[List[str]]:
     """
     Get valid params from query string.
 
+    Scans the query once, producing the same output as
+    `parse_query_reference` (pyparsing based) at a fraction of the cost.
+
     Parameters
     ----------
     raw_query : str
@@ -80,18 +87,112 @@ def parse_query(raw_query: str) -> Iterator[List[str]]:
             ["gold", "=", "5"],
             ["blue", "!=", "3"],
             ["red", ">=", "1"],
-            ["drone"],
-            ["energy", ":", "2"],
         ]
 
     """
+    filters, _ = scan_query(raw_query)
+    return iter(filters)
+
+
+def scan_query(raw_query: str) -> Tuple[List[List[str]], bool]:
+    """
+    Get valid params from query string (see parse_query), and whether the
+    whole query was valid (nothing dropped).
+
+    Parameters
+    ----------
+    raw_query : str
+        String to be parsed.
+
+    Returns
+    -------
+    tuple(list(list(str)), bool)
+
+    Examples
+    --------
+    input:
+        "gold=5,drone"
+
+    output:
+        ([["gold", "=", "5"]], False)
+
+    """
+    # pyparsing expands tabs before parsing
+    text = raw_query.expandtabs()
+    filters: List[List[str]] = []
+    position = 0
+    while True:
+        match = SEARCH_FILTER_RE.match(text, position)
+        if not match:
+            # Invalid first filter drops everything, later ones end the query
+            return filters, not text[position:].strip()
+        field, operator, value = match.groups()
+        value = value.lstrip(" ")
+        if not value:
+            return [], False  # whitespace only value, drop everything
+        filters.append([field, operator, value])
+
+        delimiter = SEARCH_DELIMITER_RE.match(text, match.end())
+        if not delimiter:
+            return filters, not text[match.end():].strip()
+        position = delimiter.end()
+
+
+@lru_cache(maxsize=None)
+def get_search_grammar() -> Tuple[Any, Any, Any]:
+    """
+    Get pyparsing grammar of search queries (built once, on first use).
+
+    pyparsing is only imported here: requests are parsed by `parse_query`,
+    so processes don't pay for importing it at startup.
+
+    Returns
+    -------
+    tuple
+        Query and filter (pyparsing elements), and ParseException.
+
+    """
+    # pylint: disable=import-outside-toplevel
+    from pyparsing import (
+        alphanums,
+        alphas,
+        Combine,
+        delimitedList,
+        oneOf,
+        ParseException,
+        Word,
+        )
+
+    search_operators = oneOf(" ".join(OPERATORS_MAP.keys()))
+    search_filter = (
+        Word(alphas + "_") + search_operators
+        + Word(alphanums + "_" + " "))
+    search_query = delimitedList(Combine(search_filter), delim=",")
+    return search_query, search_filter, ParseException
+
+
+def parse_query_reference(raw_query: str) -> Iterator[List[str]]:
+    """
+    Get valid params from query string (pyparsing implementation).
+
+    Kept as reference for `parse_query`, which must produce the same output.
 
+    Parameters
+    ----------
+    raw_query : str
+        String to be parsed.
+
+    Returns
+    -------
+    iterator(list(str))
+
+    """
+    search_query, search_filter, parse_exception = get_search_grammar()
     try:
-        return map(
-            list,
-            map(SEARCH_FILTER.parseString, SEARCH_QUERY.parseString(raw_query))
-            )
-    except ParseException:
+        return iter([
+            list(search_filter.parseString(raw_filter))
+            for raw_filter in search_query.parseString(raw_query)])
+    except parse_exception:
         return (_ for _ in [])  # empty iterator
 
 
@@ -134,11 +235,13 @@ def filter_to_lookup(data: List[str]) -> Dict[str, Union[str, int]]:
     return {f"{field}{lookup}": value}
 
 
-def includes_excludes(
-        data: str, allowed: Optional[List[str]] = None
-        ) -> Tuple[Dict[str, Union[str, int]], Dict[str, Union[str, int]]]:
+def parse_fields(
+        data: str, allowed: Optional[Sequence[str]] = None
+        ) -> Tuple[str, ...]:
     """
-    Convert query string into a dict of includes and excludes.
+    Get field names from a comma separated list (ie: "fields" parameter).
+
+    Synonyms are resolved, not allowed fields are ignored.
 
     Parameters
     ----------
@@ -149,21 +252,150 @@ def includes_excludes(
 
     Returns
     -------
-    tuple(dict, dict)
+    tuple(str)
 
     Examples
     --------
     input:
-        "gold=5,energy!=5"
+        "n,au, gold,bad", allowed=["name", "gold"]
 
     output:
-        ({"gold__icontains": "5:}, {"energy__icontains": "5"})
+        ("name", "gold")
 
     """
-    includes = {}
-    excludes = {}
-    ignored = {}
-    for raw_filter in parse_query(data):
+    fields: List[str] = []
+    for raw_field in data.split(","):
+        field = raw_field.strip()
+        field = SYNONYMS_MAP.get(field) or field
+        if field and field not in fields and (
+                not allowed or field in allowed):
+            fields.append(field)
+    return tuple(fields)
+
+
+def parse_aggregates(
+        data: str, allowed: Optional[Sequence[str]] = None
+        ) -> Dict[str, Tuple[str, Optional[str]]]:
+    """
+    Get aggregates from a comma separated list (ie: "aggregates" parameter).
+
+    Each aggregate is "function:field" (field shortcuts allowed) or just
+    "count". Invalid functions and not allowed fields are ignored.
+
+    Parameters
+    ----------
+    data : str
+        String to be parsed.
+    allowed : list(str), optional
+        List of fields to consider. If not provided, allow all.
+
+    Returns
+    -------
+    dict(str, tuple(str, str or None))
+        Output name to (function, field).
+
+    Examples
+    --------
+    input:
+        "count,avg:x,max:gold,bad:gold"
+
+    output:
+        {
+            "count": ("count", None),
+            "avg_attack": ("avg", "attack"),
+            "max_gold": ("max", "gold"),
+            }
+
+    """
+    aggregates: Dict[str, Tuple[str, Optional[str]]] = {}
+    for raw_aggregate in data.split(","):
+        function, _, field = raw_aggregate.strip().partition(":")
+        function = function.strip().lower()
+        field = field.strip()
+        field = SYNONYMS_MAP.get(field) or field
+        if function not in AGGREGATE_FUNCTIONS:
+            continue
+        if not field:
+            if function == "count":
+                aggregates["count"] = (function, None)
+            continue
+        if not allowed or field in allowed:
+            aggregates[f"{function}_{field}"] = (function, field)
+    return aggregates
+
+
+class QueryPlan(NamedTuple):
+    """ Compiled filters for a query string. """
+    includes: Dict[str, Union[str, int]]
+    excludes: Dict[str, Union[str, int]]
+    ignored: Dict[str, Union[str, int]]
+    normalized: str
+    # False when part of the query couldn't be parsed (and was dropped)
+    complete: bool = True
+
+
+_QUERY_CACHE: Optional[LRUCache] = None
+
+
+def get_query_cache() -> LRUCache:
+    """
+    Get process wide cache of compiled query plans.
+
+    Size is taken from UNITS_QUERY_CACHE_SIZE setting on first use.
+
+    Returns
+    -------
+    LRUCache
+
+    """
+    global _QUERY_CACHE  # pylint: disable=global-statement
+    if _QUERY_CACHE is None:
+        _QUERY_CACHE = LRUCache(
+            getattr(settings, "UNITS_QUERY_CACHE_SIZE", 256))
+    return _QUERY_CACHE
+
+
+def normalize_lookups(
+        includes: Dict[str, Union[str, int]],
+        excludes: Dict[str, Union[str, int]]) -> str:
+    """
+    Get canonical string representation for includes and excludes.
+
+    Equivalent queries (different order, synonyms, spacing, duplicates)
+    share the same representation.
+
+    Parameters
+    ----------
+    includes : dict
+        Lookups to filter by.
+    excludes : dict
+        Lookups to exclude by.
+
+    Returns
+    -------
+    str
+
+    Examples
+    --------
+    input:
+        {"gold": 5}, {"name__icontains": "drone"}
+
+    output:
+        "gold=5,!name__icontains='drone'"
+
+    """
+    return ",".join(
+        [f"{key}={value!r}" for key, value in sorted(includes.items())]
+        + [f"!{key}={value!r}" for key, value in sorted(excludes.items())])
+
+
+def _build_plan(data: str, allowed: Optional[Sequence[str]]) -> QueryPlan:
+    """ Parse query string into a QueryPlan (no caching). """
+    includes: Dict[str, Union[str, int]] = {}
+    excludes: Dict[str, Union[str, int]] = {}
+    ignored: Dict[str, Union[str, int]] = {}
+    filters, complete = scan_query(data)
+    for raw_filter in filters:
         negative_operators = ["!=", "<>"]
         lookup = filter_to_lookup(raw_filter)
         field = SYNONYMS_MAP.get(raw_filter[0]) or raw_filter[0]
@@ -175,4 +407,83 @@ def includes_excludes(
             excludes.update(lookup)
         else:
             includes.update(lookup)
-    return includes, excludes
+    return QueryPlan(
+        includes, excludes, ignored, normalize_lookups(includes, excludes),
+        complete)
+
+
+def compile_query(
+        data: str, allowed: Optional[Sequence[str]] = None) -> QueryPlan:
+    """
+    Convert query string into a QueryPlan, reusing previous results.
+
+    Plans are cached by raw query string and allowed fields, so repeated
+    queries skip parsing completely. Controlled by UNITS_QUERY_CACHE_ENABLED
+    and UNITS_QUERY_CACHE_SIZE settings.
+
+    Returned plans are shared between threads, don't modify them.
+
+    Parameters
+    ----------
+    data : str
+        String to be parsed.
+    allowed : list(str), optional
+        List of fields to consider. If not provided, allow all.
+
+    Returns
+    -------
+    QueryPlan
+
+    Examples
+    --------
+    input:
+        "gold=5,energy!=5,bad=1", allowed=["gold", "energy"]
+
+    output:
+        QueryPlan(
+            includes={"gold": 5},
+            excludes={"energy": 5},
+            ignored={"bad": 1},
+            normalized="gold=5,!energy=5")
+
+    """
+    if not getattr(settings, "UNITS_QUERY_CACHE_ENABLED", True):
+        return _build_plan(data, allowed)
+
+    cache = get_query_cache()
+    key = (data, tuple(allowed) if allowed else None)
+    plan = cache.get(key)
+    if plan is None:
+        plan = _build_plan(data, allowed)
+        cache.set(key, plan)
+    return plan  # type: ignore
+
+
+def includes_excludes(
+        data: str, allowed: Optional[Sequence[str]] = None
+        ) -> Tuple[Dict[str, Union[str, int]], Dict[str, Union[str, int]]]:
+    """
+    Convert query string into a dict of includes and excludes.
+
+    Parameters
+    ----------
+    data : str
+        String to be parsed.
+    allowed : list(str), optional
+        List of fields to consider. If not provided, allow all.
+
+    Returns
+    -------
+    tuple(dict, dict)
+
+    Examples
+    --------
+    input:
+        "gold=5,energy!=5"
+
+    output:
+        ({"gold__icontains": "5:}, {"energy__icontains": "5"})
+
+    """
+    plan = compile_query(data, allowed=allowed)
+    return dict(plan.includes), dict(plan.excludes)
@@ -0,0 +1,134 @@
+""" Data version tracking for papi.units """
+import hashlib
+import time
+
+from datetime import datetime
+from threading import Lock
+from typing import (
+    NamedTuple,
+    Optional,
+    )
+
+from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+
+from units.models import get_unit_model
+
+
+class DataVersion(NamedTuple):
+    """
+    Identifier of the unit data currently in the database.
+
+    Unit rows have no modification time, `modified` is when this process
+    first saw the token: workers (and restarts) may send different
+    Last-Modified values for the same data. ETags (token) are the same.
+
+    """
+    token: str
+    modified: datetime
+
+
+# Sent with a `version` argument when the unit data changes.
+data_version_changed = Signal()  # pylint: disable=invalid-name
+
+_LOCK = Lock()
+# Held by the thread computing the token (one at a time), not by readers
+_REFRESH_LOCK = Lock()
+_CURRENT: Optional[DataVersion] = None
+_CHECKED_AT = 0.0
+
+
+def compute_data_version() -> str:
+    """
+    Get token identifying the unit data: a checksum of every column of
+    every row, read with a single query.
+
+    Any change (text, flags, numbers that add up to the same totals...)
+    gets a new token. The unit table is small and this runs at most once
+    every UNITS_DATA_VERSION_TTL seconds.
+
+    Data is read from UNITS_SOURCE (see units.models.get_unit_model), each
+    source has its own tokens.
+
+    Returns
+    -------
+    str
+
+    """
+    # pylint: disable=no-member,protected-access
+    model = get_unit_model()
+    digest = hashlib.sha1(model._meta.db_table.encode())
+    rows = model.objects.order_by("pk").values_list(
+        *(column.name for column in model._meta.concrete_fields))
+    for row in rows.iterator():
+        digest.update(f"{row!r}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def get_data_version() -> DataVersion:
+    """
+    Get current data version.
+
+    The database is checked at most once every UNITS_DATA_VERSION_TTL
+    seconds, so this is cheap enough to call on every request. While a
+    thread checks it, others keep getting the previous version (they only
+    wait for the first one).
+
+    Returns
+    -------
+    DataVersion
+
+    """
+    ttl = getattr(settings, "UNITS_DATA_VERSION_TTL", 60)
+    with _LOCK:
+        current, checked_at = _CURRENT, _CHECKED_AT
+    if current is not None and time.monotonic() - checked_at < ttl:
+        return current
+    # pylint: disable=consider-using-with
+    if current is not None and not _REFRESH_LOCK.acquire(blocking=False):
+        return current  # Being checked by another thread
+    if current is None:
+        _REFRESH_LOCK.acquire()  # Nothing to serve yet: wait for it
+    try:
+        with _LOCK:
+            current, checked_at = _CURRENT, _CHECKED_AT
+        if current is not None and time.monotonic() - checked_at < ttl:
+            return current  # Checked while waiting
+        return _refresh()
+    finally:
+        _REFRESH_LOCK.release()
+
+
+def _refresh() -> DataVersion:
+    """ Compute token (with _REFRESH_LOCK held), update current version. """
+    global _CURRENT, _CHECKED_AT  # pylint: disable=global-statement
+    token = compute_data_version()
+    changed = None
+    with _LOCK:
+        if _CURRENT is None or _CURRENT.token != token:
+            _CURRENT = changed = DataVersion(token, timezone.now())
+        _CHECKED_AT = time.monotonic()
+        current = _CURRENT
+
+    if changed:
+        data_version_changed.send(sender=DataVersion, version=changed)
+    return current
+
+
+def invalidate_data_version() -> DataVersion:
+    """
+    Check data version right away (ie: after loading a new game patch).
+
+    Waits for a check already running, then checks again.
+
+    Returns
+    -------
+    DataVersion
+
+    """
+    global _CHECKED_AT  # pylint: disable=global-statement
+    with _LOCK:
+        _CHECKED_AT = float("-inf")
+    with _REFRESH_LOCK:
+        return _refresh()
@@ -1,11 +1,118 @@
 """ Views for papi.units """
-# pylint: disable=too-many-ancestors
-from django.db.models import QuerySet
-from rest_framework import viewsets
+# pylint: disable=too-many-ancestors,too-many-public-methods
+import calendar
+import hashlib
 
-from units.models import LatestUnitVersionView
-from units.serializers import LatestUnitVersionViewSerializer
-from units.utils import includes_excludes
+from contextlib import nullcontext
+from typing import (
+    Any,
+    Callable,
+    cast,
+    ContextManager,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    )
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import (
+    Aggregate,
+    Avg,
+    Count,
+    FloatField,
+    IntegerField,
+    Max,
+    Min,
+    QuerySet,
+    Sum,
+    )
+from django.http import (
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+    )
+from django.utils.cache import get_conditional_response
+from django.utils.http import (
+    http_date,
+    parse_http_date,
+    quote_etag,
+    )
+from rest_framework import (
+    exceptions,
+    viewsets,
+    )
+from rest_framework.decorators import action
+from rest_framework.renderers import (
+    BaseRenderer,
+    BrowsableAPIRenderer,
+    JSONRenderer,
+    )
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from units.cache import (
+    cache_response,
+    cached_response,
+    get_response_cache,
+    response_cache_key,
+    )
+from units.catalog import (
+    get_catalog,
+    UnitCatalog,
+    )
+from units.metrics import inc
+from units.models import (
+    get_unit_model,
+    LatestUnitVersionView,
+    )
+from units.pagination import UnitCursorPagination
+from units.renderers import (
+    binary_renderers,
+    NDJSONRenderer,
+    stream_json,
+    )
+from units.search import (
+    has_text_index,
+    text_search_q,
+    )
+from units.serializers import (
+    BatchQuerySerializer,
+    LatestUnitVersionViewFastSerializer,
+    LatestUnitVersionViewSerializer,
+    )
+from units.timing import (
+    start_timer,
+    Timer,
+    )
+from units.utils import (
+    compile_query,
+    parse_aggregates,
+    parse_fields,
+    QueryPlan,
+    )
+from units.versions import (
+    DataVersion,
+    get_data_version,
+    )
+
+
+# pylint: disable=no-member,protected-access
+UNIT_META = LatestUnitVersionView._meta
+# pylint: enable=no-member,protected-access
+COLUMNS = UNIT_META.concrete_fields
+UNIT_FIELDS = tuple(column.name for column in COLUMNS)
+# Fields that can be aggregated and grouped by (see aggregate).
+AGGREGATE_FIELDS = tuple(
+    column.name for column in COLUMNS
+    if isinstance(column, IntegerField) and not column.primary_key)
+GROUP_BY_FIELDS = tuple(
+    column.name for column in COLUMNS if not column.primary_key)
+# Fields that can be requested with "fields" parameter.
+OUTPUT_FIELDS = ("url",) + GROUP_BY_FIELDS
 
 
 class LatestUnitVersionViewSet(viewsets.ReadOnlyModelViewSet):  # type: ignore
@@ -18,6 +125,38 @@ class LatestUnitVersionViewSet(viewsets.ReadOnlyModelViewSet):  # type: ignore
 
     Invalid queries will be ignored.
 
+    Only return some fields (same shortcuts, unknown fields are ignored):
+
+        /api/latest/units/?fields=name,au,g,b,r,e,abilities
+
+    Paginate with a cursor (opt-in, ordering can be id, name, -id or -name):
+
+        /api/latest/units/?page_size=50&ordering=name
+
+    Follow "next"/"previous" links to get other pages.
+
+    MessagePack instead of JSON (needs msgpack installed), optionally as
+    columns ({"name": [...], "gold": [...]}) instead of a list of objects:
+
+        /api/latest/units/?q=gold>3&format=msgpack
+        /api/latest/units/?q=gold>3&format=msgpack-columns
+
+    Or with "Accept: application/x-msgpack" (or application/x-msgpack-columns).
+
+    Only ids or names of matching units (as a plain list):
+
+        /api/latest/units/?q=gold>3&ids_only=true
+        /api/latest/units/?q=gold>3&names_only=true
+
+    Count and aggregate matching units (see aggregate):
+
+        /api/latest/units/aggregate/?q=fl=1&aggregates=count,avg:x
+            &group_by=pos
+
+    Many queries in one request (see batch):
+
+        POST /api/latest/units/batch/ {"queries": ["gold>3", "a=gain XXXX"]}
+
     Operators:
 
         =, :, <, <=, >, >=, !=, <>
@@ -50,19 +189,502 @@ class LatestUnitVersionViewSet(viewsets.ReadOnlyModelViewSet):  # type: ignore
     # pylint: disable=no-member
     queryset = LatestUnitVersionView.objects.filter()
     serializer_class = LatestUnitVersionViewSerializer
+    pagination_class = UnitCursorPagination
+    # Set for sampled requests (see dispatch)
+    timer: Optional[Timer] = None
+
+    def dispatch(self, request: Any, *args: Any, **kwargs: Any) -> Any:
+        """
+        Time stages of sampled requests (see UNITS_TIMING_SAMPLE_RATE).
+
+        Sampled responses are rendered here, time spent parsing filters
+        (parse), building the queryset or filtering the catalog (query), in
+        the database (db, with query count), serializing (serialize) and
+        rendering (render) is logged ("units.timing" logger), and sent in a
+        Server-Timing header with DEBUG or UNITS_SERVER_TIMING. Streamed
+        bodies are produced after the response is returned, so they are
+        not timed.
+
+        """
+        self.timer = start_timer()
+        if self.timer is None:
+            return super().dispatch(request, *args, **kwargs)
+        with connection.execute_wrapper(self.timer.execute):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, "render") and not response.is_rendered:
+                with self.stage("render"):
+                    response.render()
+        self.timer.finish(request, response)
+        return response
+
+    def initial(self, request: Request, *args: Any, **kwargs: Any) -> None:
+        """ Count invalid and ignored filters (see units.metrics). """
+        super().initial(request, *args, **kwargs)
+        if request.GET.get("q"):
+            self.count_plan(self.get_plan())
+
+    @staticmethod
+    def count_plan(plan: QueryPlan) -> None:
+        """ Count query with invalid filters, and ignored filters. """
+        if not plan.complete:
+            inc("units_query_parse_failures_total")
+        if plan.ignored:
+            inc("units_ignored_filters_total", len(plan.ignored))
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """ Time block as a stage of the request (when sampled). """
+        if self.timer is None:
+            return nullcontext()
+        return self.timer.stage(name)
+
+    def get_plan(self) -> QueryPlan:
+        """ Get compiled filters for the current request. """
+        with self.stage("parse"):
+            return compile_query(
+                self.request.GET.get("q") or "", allowed=UNIT_FIELDS)
+
+    def get_fields(self) -> Tuple[str, ...]:
+        """ Get fields requested with "fields" parameter (empty for all). """
+        with self.stage("parse"):
+            return parse_fields(
+                self.request.GET.get("fields") or "", allowed=OUTPUT_FIELDS)
+
+    def get_source_queryset(self) -> QuerySet:
+        """ Get unfiltered rows from UNITS_SOURCE. """
+        model = get_unit_model()
+        if model is LatestUnitVersionView:
+            return self.queryset
+        return model.objects.all()
+
+    def get_database_queryset(self) -> QuerySet:
+        """ Get rows matching filters from the database (any backend). """
+        plan = self.get_plan()
+        queryset = self.get_source_queryset()
+        if has_text_index(queryset.model):
+            queryset = queryset.filter(text_search_q(plan.includes))
+            if plan.excludes:
+                queryset = queryset.exclude(text_search_q(plan.excludes))
+            return queryset
+        return queryset.filter(**plan.includes).exclude(**plan.excludes)
 
-    def get_queryset(self) -> QuerySet:
+    def get_queryset(self) -> Union[QuerySet, List[LatestUnitVersionView]]:
         """
         Custom filtering.
 
         Split filters into includes and excludes depeding on the operator
 
+        With UNITS_BACKEND = "catalog", filters are evaluated against the
+        in-memory catalog (units.catalog) and a list is returned.
+
+        With UNITS_SOURCE = "snapshot", rows are read from the materialized
+        table (see refresh_units_snapshot command) instead of the view, and
+        text lookups use its full text index (see units.search).
+
+        Only requested fields (and pagination keys) are selected from the
+        database.
+
+        """
+        with self.stage("query"):
+            return self.build_queryset()
+
+    def build_queryset(
+            self) -> Union[QuerySet, List[LatestUnitVersionView]]:
+        """ Get filtered rows (see get_queryset). """
+        if getattr(settings, "UNITS_BACKEND", "orm") == "catalog":
+            plan = self.get_plan()
+            return get_catalog().instances(plan.includes, plan.excludes)
+        queryset = self.get_database_queryset()
+        fields = self.get_fields()
+        if fields:
+            names = ["pk", *(name for name in fields if name != "url")]
+            paginator = self.paginator
+            if paginator is not None:
+                names.extend(
+                    order.lstrip("-") for order in paginator.get_ordering(
+                        self.request, queryset, self))
+            queryset = queryset.only(*names)
+        return queryset
+
+    @property
+    def paginator(self) -> Any:
+        """ Paginator, only when a page is requested (see pagination). """
+        paginator = super().paginator
+        request = getattr(self, "request", None)
+        if paginator is None or getattr(self, "swagger_fake_view", False):
+            return paginator
+        if request is None or not paginator.requested(request):
+            return None
+        return paginator
+
+    def get_serializer(self, *args: Any, **kwargs: Any) -> Any:
+        """ Restrict output to requested fields. """
+        fields = self.get_fields()
+        if fields:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def use_fast_serializer(self) -> bool:
+        """
+        Whether to use LatestUnitVersionViewFastSerializer.
+
+        Enabled with UNITS_FAST_SERIALIZER setting, or per request with
+        "serializer=fast" query parameter. Never for the browsable API or
+        schema generation.
+
+        """
+        request = getattr(self, "request", None)
+        if request is None or getattr(self, "swagger_fake_view", False):
+            return False
+        if isinstance(
+                getattr(request, "accepted_renderer", None),
+                BrowsableAPIRenderer):
+            return False
+        return bool(
+            request.GET.get("serializer") == "fast"
+            or getattr(settings, "UNITS_FAST_SERIALIZER", False))
+
+    def get_serializer_class(self) -> Any:
+        """ Use fast serializer when requested. """
+        if self.use_fast_serializer():
+            return LatestUnitVersionViewFastSerializer
+        return super().get_serializer_class()
+
+    def get_renderers(self) -> List[BaseRenderer]:
+        """
+        Default renderers plus NDJSON ("format=ndjson") and, with msgpack
+        installed, MessagePack ("format=msgpack" or "format=msgpack-columns").
+
+        """
+        return [
+            *super().get_renderers(),
+            NDJSONRenderer(),
+            *(renderer() for renderer in binary_renderers()),
+            ]
+
+    def get_object(self) -> LatestUnitVersionView:
+        """ Support lists returned by the catalog backend. """
+        queryset = self.get_queryset()
+        if isinstance(queryset, QuerySet):
+            return super().get_object()  # type: ignore
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            pk = UNIT_META.pk.to_python(
+                self.kwargs[lookup_url_kwarg])
+        except ValidationError as error:
+            raise Http404 from error
+        for obj in queryset:
+            if obj.pk == pk:
+                self.check_object_permissions(self.request, obj)
+                return obj
+        raise Http404
+
+    def get_cache_key(self, version: str) -> str:
+        """
+        Get response cache key for current request.
+
+        Depends on data version, accepted renderer, action, normalized
+        filters and fields, host (for hyperlinks) and any other query
+        parameter.
+
+        """
+        request = self.request
+        params = sorted(
+            (key, value)
+            for key, values in request.GET.lists()
+            if key not in ("q", "fields")
+            for value in values)
+        return response_cache_key(
+            version,
+            request.accepted_media_type,
+            [
+                self.action,
+                self.kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+                self.get_plan().normalized,
+                self.get_fields(),
+                request.scheme,
+                request.get_host(),
+                params,
+                ])
+
+    @staticmethod
+    def get_validators(version: DataVersion, key: str) -> Dict[str, str]:
+        """
+        Get ETag and Last-Modified headers for a response.
+
+        ETag is strong, derived from the response cache key (data version,
+        renderer, normalized filters...).
+
+        """
+        last_modified = calendar.timegm(version.modified.utctimetuple())
+        return {
+            "ETag": quote_etag(hashlib.sha1(key.encode()).hexdigest()),
+            "Last-Modified": http_date(last_modified),
+            }
+
+    def cached(
+            self, handler: Callable[..., HttpResponse], request: Request,
+            *args: Any, **kwargs: Any) -> HttpResponse:
         """
-        # pylint: disable=protected-access
-        includes, excludes = includes_excludes(
-            self.request.GET.get("q") or "",
-            allowed=[
-                column.name
-                for column in LatestUnitVersionView._meta.concrete_fields]
-            )
-        return self.queryset.filter(**includes).exclude(**excludes)
+        Serve response with conditional GET and response cache support.
+
+        With UNITS_CONDITIONAL_GET, responses get ETag (from the cache key)
+        and Last-Modified (from the data version) headers, and 304 is
+        returned without running the queryset or serializer when the client
+        copy is still valid.
+
+        With UNITS_RESPONSE_CACHE, successful responses are rendered right
+        away and stored (except streams).
+
+        """
+        if isinstance(request.accepted_renderer, BrowsableAPIRenderer):
+            return handler(request, *args, **kwargs)
+
+        version = get_data_version()
+        key = self.get_cache_key(version.token)
+        validators = {}
+        response = None
+        if getattr(settings, "UNITS_CONDITIONAL_GET", True):
+            validators = self.get_validators(version, key)
+            response = get_conditional_response(
+                request,
+                etag=validators["ETag"],
+                last_modified=parse_http_date(validators["Last-Modified"]))
+
+        cached = None if response else cached_response(key)
+        if response is None and get_response_cache():
+            inc(
+                "units_response_cache_total",
+                labels=("miss" if cached is None else "hit",))
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        elif response is None:
+            with self.stage("serialize"):
+                response = handler(request, *args, **kwargs)
+            if (response.status_code == 200 and not response.streaming
+                    and get_response_cache()):
+                response = self.finalize_response(
+                    request, response, *args, **kwargs)
+                with self.stage("render"):
+                    response.render()
+                cache_response(
+                    key, response.content, response["Content-Type"])
+
+        if response.status_code in (200, 304):
+            for header, value in validators.items():
+                response[header] = value
+        return response
+
+    def stream_requested(self) -> bool:
+        """
+        Whether list should be streamed.
+
+        Always for NDJSON, for JSON with "stream=true" (not indented).
+        Never for paginated lists.
+
+        """
+        # pylint: disable=unidiomatic-typecheck
+        request = self.request
+        if self.paginator is not None:
+            return False
+        renderer = request.accepted_renderer
+        if isinstance(renderer, NDJSONRenderer):
+            return True
+        return (
+            request.GET.get("stream", "").lower() in ("1", "true")
+            and type(renderer) is JSONRenderer
+            and renderer.get_indent(request.accepted_media_type, {}) is None)
+
+    def stream(
+            self, request: Request, *args: Any, **kwargs: Any
+            ) -> StreamingHttpResponse:
+        """
+        List units as a stream of encoded chunks.
+
+        Rows are read with a database cursor (`iterator()`) in chunks of
+        UNITS_STREAM_CHUNK_SIZE and serialized with
+        LatestUnitVersionViewFastSerializer, so memory use doesn't depend
+        on the amount of rows.
+
+        """
+        # pylint: disable=unused-argument
+        chunk_size = getattr(settings, "UNITS_STREAM_CHUNK_SIZE", 500)
+        serializer = LatestUnitVersionViewFastSerializer(
+            self.filter_queryset(self.get_queryset()),
+            many=True,
+            context=self.get_serializer_context(),
+            fields=self.get_fields())
+        items = serializer.iter_representation(
+            serializer.rows(chunk_size=chunk_size))
+
+        renderer = request.accepted_renderer
+        if isinstance(renderer, NDJSONRenderer):
+            chunks = renderer.stream(items, chunk_size)
+        else:
+            chunks = stream_json(renderer, items, chunk_size)
+        return StreamingHttpResponse(
+            chunks, content_type=request.accepted_media_type)
+
+    def get_compact_field(self) -> Optional[str]:
+        """
+        Get column for compact lists, None for regular lists.
+
+        "ids_only=true" lists ids, "names_only=true" lists names.
+
+        """
+        for param, name in (("ids_only", "id"), ("names_only", "name")):
+            if self.request.GET.get(param, "").lower() in ("1", "true"):
+                return name
+        return None
+
+    def compact(
+            self, request: Request, *args: Any, **kwargs: Any
+            ) -> Response:
+        """
+        List a single column of matching units (see get_compact_field).
+
+        Values are read with `values_list` (or from catalog columns),
+        without creating model instances or using a serializer.
+        Compact lists are not paginated.
+
+        """
+        # pylint: disable=unused-argument
+        name = self.get_compact_field() or "id"
+        if getattr(settings, "UNITS_BACKEND", "orm") == "catalog":
+            plan = self.get_plan()
+            catalog = get_catalog()
+            column = catalog.columns[name]
+            values = [
+                column[position]
+                for position in catalog.filter(plan.includes, plan.excludes)]
+        else:
+            queryset = cast(QuerySet, self.get_queryset())
+            values = list(queryset.values_list(name, flat=True))
+        return Response(values)
+
+    def list(
+            self, request: Request, *args: Any, **kwargs: Any
+            ) -> HttpResponse:
+        """ List units, served from response cache when possible. """
+        if self.get_compact_field():
+            return self.cached(self.compact, request, *args, **kwargs)
+        if self.stream_requested():
+            return self.cached(self.stream, request, *args, **kwargs)
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def get_aggregates(self) -> Dict[str, Aggregate]:
+        """
+        Get aggregates from "aggregates" parameter (count when empty).
+
+        Functions: count, min, max, avg and sum, over integer columns.
+
+        """
+        functions = {
+            "count": Count, "min": Min, "max": Max, "avg": Avg, "sum": Sum}
+        aggregates = parse_aggregates(
+            self.request.GET.get("aggregates") or "",
+            allowed=AGGREGATE_FIELDS)
+        result = {}
+        for name, (function, field) in aggregates.items():
+            if function == "avg":
+                result[name] = Avg(field, output_field=FloatField())
+            else:
+                result[name] = functions[function](field or "pk")
+        return result or {"count": Count("pk")}
+
+    def aggregates(
+            self, request: Request, *args: Any, **kwargs: Any
+            ) -> Response:
+        """ Compute aggregates in the database (see aggregate). """
+        # pylint: disable=unused-argument
+        queryset = self.get_database_queryset()
+        aggregates = self.get_aggregates()
+        group_by = parse_fields(
+            self.request.GET.get("group_by") or "", allowed=GROUP_BY_FIELDS)
+        if not group_by:
+            return Response(queryset.aggregate(**aggregates))
+        return Response(list(
+            queryset.order_by().values(*group_by).annotate(**aggregates)
+            .order_by(*group_by)))
+
+    @action(detail=False)  # type: ignore
+    def aggregate(
+            self, request: Request, *args: Any, **kwargs: Any
+            ) -> HttpResponse:
+        """
+        Count and aggregate units matching "q", in the database.
+
+        Aggregates are "function:field" (count, min, max, avg, sum over
+        integer fields, shortcuts allowed), optionally grouped by fields:
+
+            /api/latest/units/aggregate/?q=fl=1,au>=3&aggregates=count
+
+            /api/latest/units/aggregate/?aggregates=count,avg:x,max:au
+                &group_by=unit_spell
+
+        Response without grouping:
+
+            {"count": 12, "avg_attack": 2.5, "max_gold": 20}
+
+        Grouped, one item per group (ordered by group):
+
+            [{"unit_spell": "Spell", "count": 4, ...}, ...]
+
+        """
+        return self.cached(self.aggregates, request, *args, **kwargs)
+
+    @action(detail=False, methods=["post"])  # type: ignore
+    def batch(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        """
+        Evaluate many queries in one request.
+
+        Rows are loaded once (or taken from the catalog backend) and every
+        query is evaluated against them in memory.
+
+        Body (same grammar as "q" parameter):
+
+            {"queries": ["gold>3,frontline=1", "a=gain XXXX"]}
+
+        Response, one list of units per query (in the same order):
+
+            {"results": [[...], [...]]}
+
+        """
+        # pylint: disable=unused-argument
+        serializer = BatchQuerySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with self.stage("query"):
+            if getattr(settings, "UNITS_BACKEND", "orm") == "catalog":
+                catalog = get_catalog()
+            else:
+                catalog = UnitCatalog.load(self.get_source_queryset())
+
+        results = []
+        errors = {}
+        for index, query in enumerate(serializer.validated_data["queries"]):
+            with self.stage("parse"):
+                plan = compile_query(query, allowed=UNIT_FIELDS)
+            self.count_plan(plan)
+            try:
+                with self.stage("query"):
+                    instances = catalog.instances(
+                        plan.includes, plan.excludes)
+            except (ValueError, ValidationError) as error:
+                # Invalid value for the field type
+                errors[str(index)] = [str(error)]
+                continue
+            with self.stage("serialize"):
+                results.append(
+                    self.get_serializer(instances, many=True).data)
+
+        if errors:
+            raise exceptions.ValidationError({"queries": errors})
+        return Response({"results": results})
+
+    def retrieve(
+            self, request: Request, *args: Any, **kwargs: Any
+            ) -> HttpResponse:
+        """ Get unit, served from response cache when possible. """
+        return self.cached(super().retrieve, request, *args, **kwargs)
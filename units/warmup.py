@@ -0,0 +1,153 @@
+"""
+Warm-up of per process caches for papi.units.
+
+Run from the WSGI/ASGI entry points (papi.wsgi, papi.asgi) when
+UNITS_WARMUP_ENABLED is set, so the first requests of a worker don't pay
+for URL/view imports, the data version (ETags, cache keys), loading the
+catalog (UNITS_BACKEND = "catalog"), parsing and running popular queries
+(query plan and response caches) and building the OpenAPI schema (drf-yasg
+is only imported then, see papi.urls).
+
+With preforking servers (ie: gunicorn --preload) it runs once in the
+master process and workers get the warm caches on fork: database
+connections are closed when done, so they are never shared by workers.
+"""
+import logging
+
+from functools import partial
+from time import perf_counter
+from typing import (
+    Callable,
+    Dict,
+    )
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.urls import (
+    get_resolver,
+    resolve,
+    reverse,
+    )
+
+from units.catalog import get_catalog
+from units.versions import get_data_version
+
+
+LOGGER = logging.getLogger("units.warmup")
+
+
+def get(path: str) -> HttpResponse:
+    """
+    Run view for a GET request to path (without middleware), rendered.
+
+    Host is UNITS_WARMUP_HOST, as cached responses depend on it.
+
+    Parameters
+    ----------
+    path : str
+        Path with query string.
+
+    Returns
+    -------
+    HttpResponse
+
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.test import RequestFactory
+
+    request = RequestFactory().get(
+        path,
+        HTTP_HOST=getattr(settings, "UNITS_WARMUP_HOST", "localhost"),
+        HTTP_ACCEPT="application/json")
+    match = resolve(request.path_info)
+    request.resolver_match = match
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+    if response.status_code != 200:
+        raise ValueError(f"GET {path} returned {response.status_code}")
+    return response
+
+
+def load_urls() -> None:
+    """ Import URLconf (views, serializers, renderers...). """
+    get_resolver().url_patterns  # pylint: disable=expression-not-assigned
+
+
+def preload_units() -> None:
+    """
+    Compute data version and load catalog (UNITS_BACKEND = "catalog").
+
+    The data version is one pass over the unit table (which also opens the
+    database connection). The ORM backend keeps no rows in memory, so
+    nothing else is loaded for it.
+
+    """
+    get_data_version()
+    if getattr(settings, "UNITS_BACKEND", "orm") == "catalog":
+        get_catalog()
+
+
+def run_query(query: str) -> None:
+    """ Parse, run, serialize and cache a unit list for `q`. """
+    get(f"{reverse('latestunitversionview-list')}?{urlencode({'q': query})}")
+
+
+def build_schema() -> None:
+    """ Build OpenAPI schema (when docs are installed). """
+    if apps.is_installed("drf_yasg"):
+        get(reverse("schema-json", kwargs={"format": ".json"}))
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Run warm-up steps enabled in settings (nothing unless
+    UNITS_WARMUP_ENABLED).
+
+    Failing steps are logged and skipped, so a worker always starts.
+
+    Returns
+    -------
+    dict(str, float)
+        Seconds per step that ran.
+
+    Examples
+    --------
+    output:
+        {"urls": 0.41, "preload": 0.05, "q=gold<=3": 0.02, "schema": 0.3}
+
+    """
+    if not getattr(settings, "UNITS_WARMUP_ENABLED", False):
+        return {}
+
+    steps: Dict[str, Callable[[], None]] = {"urls": load_urls}
+    if getattr(settings, "UNITS_WARMUP_PRELOAD", True):
+        steps["preload"] = preload_units
+    for query in getattr(settings, "UNITS_WARMUP_QUERIES", []):
+        steps[f"q={query}"] = partial(run_query, query)
+    if getattr(settings, "UNITS_WARMUP_SCHEMA", True):
+        steps["schema"] = build_schema
+
+    timings = {}
+    try:
+        for name, step in steps.items():
+            start = perf_counter()
+            try:
+                step()
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception("Warm-up step %s failed", name)
+                continue
+            timings[name] = perf_counter() - start
+    finally:
+        # Never share connections with forked workers
+        connections.close_all()
+
+    LOGGER.info(
+        "Warm-up done in %.3fs: %s", sum(timings.values()),
+        " ".join(
+            f"{name}={seconds * 1000:.1f}ms"
+            for name, seconds in timings.items()))
+    return timings